@@ -0,0 +1,172 @@
+"""
+Content encodings shared by response compression and the output store
+"""
+
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+
+# Content-Encoding token -> sidecar file suffix in the output store
+ENCODING_SUFFIXES: Dict[str, str] = {
+    "zstd": ".zst",
+    "br": ".br",
+    "gzip": ".gz",
+}
+
+# Fast levels: responses are compressed on the request path
+DEFAULT_LEVELS: Dict[str, int] = {
+    "zstd": 3,
+    "br": 4,
+    "gzip": 6,
+}
+
+# Media types worth compressing; everything else (PNG, JPEG, GLB, ZIP, ...) is
+# either already compressed or binary data that does not shrink enough to pay
+# for the CPU time.
+COMPRESSIBLE_MEDIA_TYPES = (
+    "application/json",
+    "application/problem+json",
+    "application/javascript",
+    "application/x-ply",
+    "model/obj",
+    "model/stl",
+    "text/",
+)
+
+
+def is_available(encoding: str) -> bool:
+    """Check whether the codec for a content encoding is installed"""
+    if encoding == "zstd":
+        return zstandard is not None
+    if encoding == "br":
+        return brotli is not None
+    return encoding == "gzip"
+
+
+def is_compressible(media_type: Optional[str]) -> bool:
+    """Check whether a media type benefits from compression"""
+    if not media_type:
+        return False
+    media_type = media_type.split(";")[0].strip().lower()
+    return any(media_type.startswith(prefix) for prefix in COMPRESSIBLE_MEDIA_TYPES)
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {encoding: q-value}"""
+    accepted: Dict[str, float] = {}
+    if not header:
+        return accepted
+
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    return accepted
+
+
+def negotiate(header: Optional[str], preferences: List[str]) -> Optional[str]:
+    """Pick the first server-preferred encoding the client accepts"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+
+    for encoding in preferences:
+        if not is_available(encoding):
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+
+    return None
+
+
+class StreamCompressor:
+    """Incremental compressor with a uniform interface across codecs"""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        if not is_available(encoding):
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+        self.encoding = encoding
+        level = DEFAULT_LEVELS[encoding] if level is None else level
+
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk, returning whatever output is ready"""
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        """Flush and terminate the stream"""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class StreamDecompressor:
+    """Incremental decompressor with a uniform interface across codecs"""
+
+    def __init__(self, encoding: str):
+        if not is_available(encoding):
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        elif encoding == "br":
+            self._decompressor = brotli.Decompressor()
+        else:
+            self._decompressor = zlib.decompressobj(47)
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress a chunk"""
+        if self.encoding == "br":
+            return self._decompressor.process(data)
+        return self._decompressor.decompress(data)
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress a complete buffer"""
+    if encoding == "zstd" and is_available(encoding):
+        # One-shot frames record the content size, which stream frames cannot
+        level = DEFAULT_LEVELS[encoding] if level is None else level
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    compressor = StreamCompressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def zstd_content_size(header: bytes) -> Optional[int]:
+    """Read the decompressed size recorded in a zstd frame header, if any"""
+    if zstandard is None:
+        return None
+    try:
+        size = zstandard.frame_content_size(header)
+    except zstandard.ZstdError:
+        return None
+    return size if size >= 0 else None
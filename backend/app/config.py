@@ -3,7 +3,7 @@ Configuration management for the Step1X-3D backend
 """
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -16,6 +16,7 @@ class Settings(BaseSettings):
     hf_cache_dir: str = Field("./cache", env="HF_CACHE_DIR")
     
     # Backend Configuration
+    admin_token: Optional[str] = Field(None, env="ADMIN_TOKEN")  # unset disables admin endpoints
     backend_host: str = Field("0.0.0.0", env="BACKEND_HOST")
     backend_port: int = Field(8000, env="BACKEND_PORT")
     backend_workers: int = Field(1, env="BACKEND_WORKERS")
@@ -24,15 +25,78 @@ class Settings(BaseSettings):
     cuda_visible_devices: str = Field("0,1,2,3", env="CUDA_VISIBLE_DEVICES")
     gpu_memory_fraction: float = Field(0.8, env="GPU_MEMORY_FRACTION")
     max_concurrent_requests: int = Field(4, env="MAX_CONCURRENT_REQUESTS")
+    scheduler_policy: str = Field("fifo", env="SCHEDULER_POLICY")  # fifo, sjf (shortest expected job first)
+    scheduler_aging: float = Field(1.0, env="SCHEDULER_AGING")  # sjf: seconds of priority gained per second queued
+    cost_history_size: int = Field(5000, env="COST_HISTORY_SIZE")  # job timings kept for the cost model
+    gpu_reservation_timeout: float = Field(300.0, env="GPU_RESERVATION_TIMEOUT")  # wait for GPU memory before 503
+    gpu_memory_priors: str = Field("", env="GPU_MEMORY_PRIORS")  # kind=bytes per unit, overrides built-in estimates
+    pipeline_preprocess_workers: int = Field(2, env="PIPELINE_PREPROCESS_WORKERS")  # threads decoding uploads
+    pipeline_postprocess_workers: int = Field(2, env="PIPELINE_POSTPROCESS_WORKERS")  # threads encoding/exporting outputs
+    pipeline_write_workers: int = Field(2, env="PIPELINE_WRITE_WORKERS")  # concurrent output writes
+    pipeline_queue_size: int = Field(8, env="PIPELINE_QUEUE_SIZE")  # items buffered per stage before submitters wait
+    batch_max_items: int = Field(500, env="BATCH_MAX_ITEMS")  # images accepted in one batch submission
+    batch_max_archive_mb: int = Field(2048, env="BATCH_MAX_ARCHIVE_MB")  # uncompressed size limit of a batch ZIP
+    batch_concurrency: int = Field(2, env="BATCH_CONCURRENCY")  # items of one batch in flight at once
+    max_variants: int = Field(8, env="MAX_VARIANTS")  # seed variants generated in one batched call
+    gpu_telemetry_backend: str = Field("auto", env="GPU_TELEMETRY_BACKEND")  # auto, nvml, torch, fake, none
+    gpu_telemetry_interval: float = Field(2.0, env="GPU_TELEMETRY_INTERVAL")
+    gpu_telemetry_history: int = Field(300, env="GPU_TELEMETRY_HISTORY")
+    memory_budget_mb: float = Field(0.0, env="MEMORY_BUDGET_MB")  # host memory budget, 0 disables admission
+    memory_estimate_margin: float = Field(1.5, env="MEMORY_ESTIMATE_MARGIN")
+    memory_admission_timeout: float = Field(300.0, env="MEMORY_ADMISSION_TIMEOUT")
+    memory_sample_interval: float = Field(0.01, env="MEMORY_SAMPLE_INTERVAL")
+    memory_tracemalloc: bool = Field(False, env="MEMORY_TRACEMALLOC")  # adds allocation overhead
+    health_cache_ttl: float = Field(2.0, env="HEALTH_CACHE_TTL")
+    metrics_enabled: bool = Field(True, env="METRICS_ENABLED")
+    tracing_enabled: bool = Field(True, env="TRACING_ENABLED")  # persist per-job traces
+    profile_sample_rate: float = Field(0.0, env="PROFILE_SAMPLE_RATE")  # fraction of jobs to profile
+    profile_interval: float = Field(0.005, env="PROFILE_INTERVAL")
     
     # Model Configuration
     model_cache_dir: str = Field("./models", env="MODEL_CACHE_DIR")
     step1x3d_model_id: str = Field("stepfun-ai/Step1X-3D", env="STEP1X3D_MODEL_ID")
     sdxl_model_id: str = Field("stabilityai/stable-diffusion-xl-base-1.0", env="SDXL_MODEL_ID")
+    model_ready_timeout: float = Field(600.0, env="MODEL_READY_TIMEOUT")  # queue requests until models load
+    model_verify: str = Field("size", env="MODEL_VERIFY")  # none, size, hash (checked against manifest)
+    model_load_workers: int = Field(4, env="MODEL_LOAD_WORKERS")  # concurrent component loads
+    model_allow_download: bool = Field(True, env="MODEL_ALLOW_DOWNLOAD")  # False: local snapshots only
+    inference_backend: str = Field("diffusers", env="INFERENCE_BACKEND")  # diffusers, stub
+    stub_latency_base: float = Field(0.05, env="STUB_LATENCY_BASE")
+    stub_latency_per_step: float = Field(0.01, env="STUB_LATENCY_PER_STEP")
+    stub_work: str = Field("sleep", env="STUB_WORK")  # sleep, compute
+    stub_load_time: float = Field(0.0, env="STUB_LOAD_TIME")  # seconds per model
+    stub_model_size_mb: float = Field(0.0, env="STUB_MODEL_SIZE_MB")  # reported footprint per model
+    model_memory_budget_mb: float = Field(0.0, env="MODEL_MEMORY_BUDGET_MB")  # device memory for models, 0 keeps all resident
+    model_evict_policy: str = Field("offload", env="MODEL_EVICT_POLICY")  # offload (to CPU), unload
+    model_usage_half_life: float = Field(300.0, env="MODEL_USAGE_HALF_LIFE")  # seconds for a use to count half
+    model_pinned: str = Field("", env="MODEL_PINNED")  # models never evicted, e.g. "sdxl"
+    warmup_enabled: bool = Field(True, env="WARMUP_ENABLED")  # run warm-up inferences before reporting ready
+    warmup_resolutions: str = Field("1024x1024", env="WARMUP_RESOLUTIONS")  # text-to-image WIDTHxHEIGHT list
+    warmup_modes: str = Field("geometry,textured", env="WARMUP_MODES")  # image-to-3D modes
+    warmup_steps: int = Field(2, env="WARMUP_STEPS")
+    torch_compile: bool = Field(False, env="TORCH_COMPILE")  # compile the SDXL UNet with torch.compile
+    compile_cache_dir: str = Field("./models/compile_cache", env="COMPILE_CACHE_DIR")  # persisted inductor caches
     
     # Output Configuration
     output_dir: str = Field("./output", env="OUTPUT_DIR")
     log_level: str = Field("INFO", env="LOG_LEVEL")
+    output_fsync_policy: str = Field("file", env="OUTPUT_FSYNC_POLICY")  # none, file, always
+    output_precompress: bool = Field(False, env="OUTPUT_PRECOMPRESS")  # write compressed sidecars
+    output_compress_at_rest: bool = Field(False, env="OUTPUT_COMPRESS_AT_REST")  # store zstd only
+    output_compress_formats: str = Field("obj,ply,stl,glb", env="OUTPUT_COMPRESS_FORMATS")
+    output_compression_level: int = Field(3, env="OUTPUT_COMPRESSION_LEVEL")
+    
+    # Compression Configuration
+    compression_enabled: bool = Field(True, env="COMPRESSION_ENABLED")
+    compression_min_size: int = Field(1000, env="COMPRESSION_MIN_SIZE")
+    compression_encodings: str = Field("zstd,br,gzip", env="COMPRESSION_ENCODINGS")
+    
+    # Retention Configuration
+    retention_enabled: bool = Field(True, env="RETENTION_ENABLED")
+    retention_interval_seconds: int = Field(300, env="RETENTION_INTERVAL_SECONDS")
+    output_quota_mb: int = Field(0, env="OUTPUT_QUOTA_MB")  # 0 disables the quota
+    output_max_age_hours: float = Field(0.0, env="OUTPUT_MAX_AGE_HOURS")  # 0 disables age expiry
+    temp_max_age_minutes: float = Field(60.0, env="TEMP_MAX_AGE_MINUTES")
     
     # Development Configuration
     debug: bool = Field(False, env="DEBUG")
@@ -51,6 +115,46 @@ class Settings(BaseSettings):
         except ValueError:
             return [0]  # Default to GPU 0 if parsing fails
     
+    @property
+    def compression_preferences(self) -> List[str]:
+        """Parse COMPRESSION_ENCODINGS into server-preferred encoding order"""
+        return [x.strip().lower() for x in self.compression_encodings.split(",") if x.strip()]
+    
+    @property
+    def compress_at_rest_extensions(self) -> List[str]:
+        """Parse OUTPUT_COMPRESS_FORMATS into file extensions eligible for at-rest compression"""
+        return [f".{x.strip().lower().lstrip('.')}" for x in self.output_compress_formats.split(",") if x.strip()]
+    
+    @property
+    def warmup_resolution_list(self) -> List[Tuple[int, int]]:
+        """Parse WARMUP_RESOLUTIONS ("1024x1024,768x1344") into (width, height) pairs"""
+        resolutions = []
+        for item in self.warmup_resolutions.split(","):
+            if item.strip():
+                width, _, height = item.strip().lower().partition("x")
+                resolutions.append((int(width), int(height or width)))
+        return resolutions
+    
+    @property
+    def gpu_memory_prior_overrides(self) -> Dict[str, float]:
+        """Parse GPU_MEMORY_PRIORS ("generate-3d/textured=6e9,text-to-image=3000") into bytes per unit by kind"""
+        priors = {}
+        for item in self.gpu_memory_priors.split(","):
+            if item.strip():
+                kind, _, value = item.partition("=")
+                priors[kind.strip().lower()] = float(value)
+        return priors
+    
+    @property
+    def warmup_mode_list(self) -> List[str]:
+        """Parse WARMUP_MODES into image-to-3D generation modes"""
+        return [x.strip().lower() for x in self.warmup_modes.split(",") if x.strip()]
+    
+    @property
+    def pinned_models(self) -> List[str]:
+        """Parse MODEL_PINNED into model names"""
+        return [x.strip().lower() for x in self.model_pinned.split(",") if x.strip()]
+    
     @property
     def backend_url(self) -> str:
         """Construct backend URL"""
@@ -65,6 +169,7 @@ class Settings(BaseSettings):
             os.path.join(self.output_dir, "models"),
             os.path.join(self.output_dir, "logs"),
             os.path.join(self.output_dir, "temp"),
+            os.path.join(self.output_dir, "jobs"),
         ]
         
         for directory in directories:
@@ -0,0 +1,8 @@
+"""
+ASGI middleware for the Step1X-3D backend
+"""
+
+from .compression import CompressionMiddleware
+from .metrics import MetricsMiddleware
+
+__all__ = ["CompressionMiddleware", "MetricsMiddleware"]
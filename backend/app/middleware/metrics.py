@@ -0,0 +1,49 @@
+"""
+Request metrics middleware
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.metrics_service import MetricsService
+
+
+class MetricsMiddleware:
+    """Record request counts, errors and latency per route template
+
+    Routes are labelled by their path template (``/api/v1/download/{filename}``)
+    rather than the raw path so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: MetricsService):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.metrics.requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.requests_in_flight.dec()
+
+            # The router stores the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            self.metrics.requests_total.inc(method=method, route=route, status=str(status_code))
+            if status_code >= 500:
+                self.metrics.request_errors_total.inc(method=method, route=route)
+            self.metrics.request_duration.observe(time.perf_counter() - start, method=method, route=route)
@@ -11,6 +11,7 @@ from .generation import (
     ConvertMeshResponse,
 )
 from .health import HealthResponse, ModelStatus
+from .storage import BundleRequest
 
 __all__ = [
     "GenerationRequest",
@@ -21,4 +22,5 @@ __all__ = [
     "ConvertMeshResponse",
     "HealthResponse",
     "ModelStatus",
+    "BundleRequest",
 ]
@@ -2,7 +2,7 @@
 Pydantic models for generation requests and responses
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 
 
@@ -14,6 +14,13 @@ class GenerationRequest(BaseModel):
     seed: int = Field(2025, ge=0, le=999999, description="Random seed for reproducibility")
 
 
+class VariantResult(BaseModel):
+    """One seed variant of a generation, stored as its own file"""
+    seed: int = Field(description="Random seed of this variant")
+    filename: str = Field(description="Generated filename")
+    file_size: int = Field(description="File size in bytes")
+
+
 class GenerationResponse(BaseModel):
     """Response model for 3D generation"""
     success: bool = Field(description="Whether generation was successful")
@@ -21,6 +28,7 @@ class GenerationResponse(BaseModel):
     file_size: int = Field(description="File size in bytes")
     generation_time: float = Field(description="Generation time in seconds")
     mode: str = Field(description="Generation mode used")
+    variants: List[VariantResult] = Field(default_factory=list, description="Every seed variant, when several were requested")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
 
@@ -40,6 +48,48 @@ class TextToImageResponse(BaseModel):
     filename: str = Field(description="Generated image filename")
     file_size: int = Field(description="File size in bytes")
     generation_time: float = Field(description="Generation time in seconds")
+    variants: List[VariantResult] = Field(default_factory=list, description="Every seed variant, when several were requested")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
+
+
+class TextTo3DResponse(BaseModel):
+    """Response model for chained text-to-3D generation"""
+    success: bool = Field(description="Whether generation was successful")
+    filename: str = Field(description="Generated 3D model filename")
+    file_size: int = Field(description="File size in bytes")
+    image_filename: Optional[str] = Field(None, description="Intermediate image filename, if it was saved")
+    generation_time: float = Field(description="Generation time in seconds, both stages included")
+    mode: str = Field(description="Generation mode used")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one image in a batch 3D generation"""
+    index: int = Field(description="Position of the image in the submission")
+    name: str = Field(description="Uploaded filename or archive member name")
+    status: str = Field(description="queued, running, completed or failed")
+    mode: str = Field(description="Generation mode used")
+    guidance_scale: float = Field(description="Guidance scale used")
+    num_steps: int = Field(description="Number of inference steps used")
+    seed: int = Field(description="Random seed used")
+    filename: Optional[str] = Field(None, description="Generated filename")
+    file_size: Optional[int] = Field(None, description="File size in bytes")
+    generation_time: Optional[float] = Field(None, description="Generation time in seconds")
+    duplicate_of: Optional[int] = Field(None, description="Index of the identical item whose result this reuses")
+    error: Optional[str] = Field(None, description="Why the item failed")
+    status_code: Optional[int] = Field(None, description="HTTP status the item would have failed with on its own")
+
+
+class BatchGenerationResponse(BaseModel):
+    """Response model for batch 3D generation"""
+    success: bool = Field(description="Whether every item was generated")
+    job_id: str = Field(description="Handle for the batch manifest and bundle download")
+    bundle_url: str = Field(description="URL downloading every generated model as one ZIP")
+    total: int = Field(description="Number of images submitted")
+    completed: int = Field(description="Items generated")
+    failed: int = Field(description="Items that failed")
+    generation_time: float = Field(description="Time to process the whole batch in seconds")
+    items: List[BatchItemResult] = Field(default_factory=list, description="Per-item outcomes, in submission order")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
 
@@ -60,3 +110,30 @@ class ConvertMeshResponse(BaseModel):
     target_format: str = Field(description="Target file format")
     mesh_info: Dict[str, Any] = Field(default_factory=dict, description="Mesh statistics")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
+
+
+class ConvertMeshItemResult(BaseModel):
+    """Outcome of converting one input file to every requested format"""
+    index: int = Field(description="Position of the file in the submission")
+    name: str = Field(description="Uploaded filename")
+    status: str = Field(description="completed or failed")
+    outputs: Dict[str, str] = Field(default_factory=dict, description="Output filename per target format")
+    file_sizes: Dict[str, int] = Field(default_factory=dict, description="Output size in bytes per target format")
+    conversion_time: Optional[float] = Field(None, description="Load and export time in seconds")
+    mesh_info: Dict[str, Any] = Field(default_factory=dict, description="Mesh statistics")
+    error: Optional[str] = Field(None, description="Why the conversion failed")
+    status_code: Optional[int] = Field(None, description="HTTP status the file would have failed with on its own")
+
+
+class ConvertMeshBatchResponse(BaseModel):
+    """Response model for multi-file, multi-format mesh conversion"""
+    success: bool = Field(description="Whether every file was converted")
+    job_id: str = Field(description="Handle for the manifest and bundle download")
+    bundle_url: str = Field(description="URL downloading every converted file as one ZIP")
+    target_formats: List[str] = Field(description="Formats each file was converted to")
+    total: int = Field(description="Number of files submitted")
+    completed: int = Field(description="Files converted")
+    failed: int = Field(description="Files that failed")
+    conversion_time: float = Field(description="Time to convert every file in seconds")
+    items: List[ConvertMeshItemResult] = Field(default_factory=list, description="Per-file outcomes, in submission order")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
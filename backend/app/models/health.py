@@ -20,6 +20,7 @@ class HealthResponse(BaseModel):
     status: str = Field(description="Overall service status")
     version: str = Field(description="Application version")
     uptime: float = Field(description="Service uptime in seconds")
+    ready: bool = Field(False, description="Whether models are loaded and requests can be served")
     models: Dict[str, ModelStatus] = Field(description="Model status information")
     gpu_info: Dict[str, Any] = Field(default_factory=dict, description="GPU information")
     system_info: Dict[str, Any] = Field(default_factory=dict, description="System information")
@@ -0,0 +1,13 @@
+"""
+Pydantic models for output storage requests
+"""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class BundleRequest(BaseModel):
+    """Request model for downloading several outputs as one ZIP archive"""
+    filenames: List[str] = Field(default_factory=list, description="Output filenames to include")
+    job_id: Optional[str] = Field(None, description="Include every output recorded for this job or batch")
+    archive_name: Optional[str] = Field(None, max_length=100, description="Name of the downloaded archive")
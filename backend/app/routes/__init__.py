@@ -4,5 +4,9 @@ API routes for the Step1X-3D backend
 
 from .generation import router as generation_router
 from .health import router as health_router
+from .storage import router as storage_router
+from .jobs import router as jobs_router
+from .metrics import router as metrics_router
+from .admin import router as admin_router
 
-__all__ = ["generation_router", "health_router"]
+__all__ = ["generation_router", "health_router", "storage_router", "jobs_router", "metrics_router", "admin_router"]
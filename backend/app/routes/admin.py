@@ -0,0 +1,135 @@
+"""
+Admin routes for diagnostics such as job profiles, and model residency
+"""
+
+import hmac
+import random
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from ..services.storage_service import storage_service, is_valid_job_id, PROFILE_FORMATS
+from ..services.model_service import model_service
+from ..config import settings
+
+
+def _check_admin_token(token: Optional[str]) -> None:
+    """Raise unless the token matches the configured admin token"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not token or not hmac.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dependency restricting a route to callers presenting the admin token"""
+    _check_admin_token(x_admin_token)
+
+
+async def profile_requested(
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+) -> bool:
+    """Decide whether to profile this job: on admin request, or by random sampling"""
+    if x_profile is not None and x_profile.lower() not in ("", "0", "false", "no"):
+        _check_admin_token(x_admin_token)
+        return True
+
+    return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List jobs with a recorded profile, newest first"""
+
+    try:
+        profiles = storage_service.list_profiles()
+
+        return {
+            "profiles": profiles,
+            "count": len(profiles),
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list profiles: {str(e)}")
+
+
+@router.get("/profiles/{job_id}")
+async def get_profile(
+    job_id: str,
+    format: str = Query("speedscope", description="speedscope (JSON) or collapsed (folded stacks)")
+):
+    """Download a job's profile"""
+
+    try:
+        if not is_valid_job_id(job_id):
+            raise HTTPException(status_code=400, detail="Invalid job ID")
+
+        if format not in PROFILE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(PROFILE_FORMATS)}")
+
+        path = storage_service.get_profile_path(job_id, format)
+        if path is None:
+            raise HTTPException(status_code=404, detail="No profile recorded for this job")
+
+        filename, media_type = PROFILE_FORMATS[format]
+        return FileResponse(path=path, filename=f"{job_id}_{filename}", media_type=media_type)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get profile: {str(e)}")
+
+
+@router.get("/models")
+async def get_model_residency():
+    """Model memory budget, footprints, usage scores and residency"""
+    return model_service.residency.get_status()
+
+
+@router.post("/models/{name}/pin")
+async def pin_model(name: str):
+    """Load a model if needed and keep it resident until unpinned"""
+
+    try:
+        if name not in model_service.residency.entries:
+            raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+
+        await model_service.residency.pin(name)
+
+        return {
+            "success": True,
+            "model": name,
+            **model_service.residency.get_status()["models"][name],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to pin model: {str(e)}")
+
+
+@router.post("/models/{name}/unpin")
+async def unpin_model(name: str):
+    """Let a pinned model be evicted again"""
+
+    try:
+        if name not in model_service.residency.entries:
+            raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+
+        await model_service.residency.unpin(name)
+
+        return {
+            "success": True,
+            "model": name,
+            **model_service.residency.get_status()["models"][name],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to unpin model: {str(e)}")
@@ -2,28 +2,182 @@
 Generation routes for 3D model and image generation
 """
 
+import asyncio
+import json
+import math
+import random
 import os
+import re
 import time
 from pathlib import Path
-from typing import Optional
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from fastapi import APIRouter, Depends, File, UploadFile, Form, Header, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
 
 from ..models.generation import (
     GenerationRequest,
     GenerationResponse,
     TextToImageRequest,
     TextToImageResponse,
+    VariantResult,
+    TextTo3DResponse,
+    BatchGenerationResponse,
     ConvertMeshRequest,
     ConvertMeshResponse,
+    ConvertMeshBatchResponse,
+    ConvertMeshItemResult,
 )
-from ..services.model_service import model_service
+from ..models.storage import BundleRequest
+from ..services.model_service import model_service, ModelsNotReady, ProgressCallback
 from ..services.mesh_service import mesh_service
+from ..services.retention_service import retention_service
+from ..services.memory_service import memory_service, MemoryAdmissionTimeout, MemoryBudgetExceeded
+from ..services.gpu_service import GPUMemoryExceeded, GPUReservationTimeout
+from ..services.cost_service import JobSpec, cost_service
+from ..services.pipeline import generation_pipeline
+from ..services.batch_service import BatchError, BatchItem, build_items, schedule_order, spool_uploads
+from ..services.metrics_service import metrics_service
+from ..services.profiling import SamplingProfiler, profile
+from ..services.tracing import Trace, span, start_trace
+from ..services.storage_service import storage_service, media_type_for, is_valid_filename, is_valid_job_id
+from ..compression import negotiate
+from .admin import profile_requested
 from ..config import settings
 
 router = APIRouter(prefix="/api/v1", tags=["generation"])
 
 
+async def _finalize_job(
+    trace: Trace,
+    filenames: List[str],
+    route: str,
+    metadata: Dict[str, Any],
+    profiler: Optional[SamplingProfiler] = None
+) -> None:
+    """Record the job's outputs and attach its id and per-stage timings to the response metadata"""
+    info: Dict[str, Any] = {"route": route}
+    if profiler is not None:
+        await storage_service.save_profile(profiler)
+        info["profile"] = metadata["profile"] = profiler.summary()
+    await storage_service.record_job(trace.job_id, filenames, info)
+    
+    if "memory" in trace.args:
+        # Host and GPU memory reports of the job's inference calls, by route
+        metadata["memory"] = trace.args["memory"]
+    trace.finish()
+    trace.args["route"] = route
+    metadata["job_id"] = trace.job_id
+    metadata["stage_timings"] = trace.stage_timings()
+    metadata["total_time"] = trace.duration
+    if "deadline" in metadata.get("eta", {}):
+        metadata["eta"]["deadline_met"] = trace.duration <= metadata["eta"]["deadline"]
+    await storage_service.save_trace(trace)
+
+
+# Errors raised when a job cannot be admitted yet (or at all)
+ADMISSION_ERRORS = (
+    MemoryBudgetExceeded, MemoryAdmissionTimeout, ModelsNotReady, GPUMemoryExceeded, GPUReservationTimeout
+)
+
+# Formats convert-mesh can export
+MESH_TARGET_FORMATS = ["glb", "obj", "stl", "ply"]
+
+# Largest accepted random seed
+MAX_SEED = 999999
+
+# Suggested retry delay while models are still loading
+MODELS_LOADING_RETRY_AFTER = 30
+
+
+async def requested_deadline(x_deadline: Optional[float] = Header(None)) -> Optional[float]:
+    """Seconds the client expects the job to finish within, from the X-Deadline header"""
+    return x_deadline
+
+
+def _submission_eta(
+    spec: JobSpec,
+    deadline: Optional[float],
+    followed_by: Optional[JobSpec] = None,
+    route: Optional[str] = None
+) -> Dict[str, Any]:
+    """Predicted timing of a job being submitted, flagged if it is expected to miss its deadline
+    
+    ``followed_by`` adds the service time of a chained second inference;
+    ``route`` labels the at-risk metric (defaults to the spec's route).
+    """
+    if spec.route == "convert-mesh":
+        # Runs on the CPU pipeline stages, not the inference scheduler
+        service = cost_service.predict(spec, "cpu")
+        eta: Dict[str, Any] = {"service": round(service, 3), "queue": 0.0, "eta": round(service, 3)}
+    else:
+        eta = model_service.estimate(spec)
+    
+    if followed_by is not None:
+        then = model_service.estimate(followed_by)
+        eta["service"] = round(eta["service"] + then["service"], 3)
+        eta["eta"] = round(eta["eta"] + then["service"], 3)
+    
+    if deadline is not None:
+        eta["deadline"] = deadline
+        eta["at_risk"] = eta["eta"] > deadline
+        if eta["at_risk"]:
+            metrics_service.deadline_at_risk_total.inc(route=route or spec.route)
+    return eta
+
+
+def _retry_after() -> str:
+    """Seconds until the queued and running work is expected to drain"""
+    return str(max(1, math.ceil(model_service.scheduler.drain_time())))
+
+
+def _admission_error(error: Exception) -> HTTPException:
+    """Map an admission failure to an HTTP error"""
+    if isinstance(error, (MemoryBudgetExceeded, GPUMemoryExceeded)):
+        return HTTPException(status_code=413, detail=str(error))
+    if isinstance(error, ModelsNotReady):
+        headers = {"Retry-After": str(MODELS_LOADING_RETRY_AFTER)} if error.state == "loading" else None
+        return HTTPException(status_code=503, detail=str(error), headers=headers)
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": _retry_after()})
+
+
+def _variant_seeds(num_variants: Optional[int], seeds: Optional[str], seed: Optional[int]) -> Optional[List[int]]:
+    """Seeds of the requested variants, or None for a single ordinary generation
+    
+    An explicit comma-separated seed list wins; otherwise ``num_variants``
+    consecutive seeds start at ``seed``, or at a random seed that is
+    reported back with the results.
+    """
+    if num_variants is not None and num_variants < 1:
+        raise HTTPException(status_code=400, detail="Number of variants must be at least 1")
+    
+    if seeds:
+        try:
+            variant_seeds = [int(value) for value in seeds.split(",") if value.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Seeds must be a comma-separated list of integers")
+        if num_variants is not None and num_variants != len(variant_seeds):
+            raise HTTPException(
+                status_code=400, detail=f"{num_variants} variants requested but {len(variant_seeds)} seeds given"
+            )
+    elif num_variants is None or num_variants == 1:
+        return None
+    else:
+        start = seed if seed is not None else random.randint(0, MAX_SEED + 1 - num_variants)
+        variant_seeds = list(range(start, start + num_variants))
+    
+    if len(variant_seeds) > settings.max_variants:
+        raise HTTPException(status_code=400, detail=f"At most {settings.max_variants} variants per request")
+    
+    if len(set(variant_seeds)) != len(variant_seeds):
+        raise HTTPException(status_code=400, detail="Seeds must be distinct")
+    
+    if not all(0 <= variant_seed <= MAX_SEED for variant_seed in variant_seeds):
+        raise HTTPException(status_code=400, detail=f"Seeds must be between 0 and {MAX_SEED}")
+    
+    return variant_seeds
+
+
 @router.post("/text-to-image", response_model=TextToImageResponse)
 async def text_to_image(
     prompt: str = Form(...),
@@ -31,40 +185,87 @@ async def text_to_image(
     height: int = Form(1024),
     num_inference_steps: int = Form(20),
     guidance_scale: float = Form(7.5),
-    seed: Optional[int] = Form(None)
+    seed: Optional[int] = Form(None),
+    num_variants: Optional[int] = Form(None, description="Images to generate in one batched call, from consecutive seeds"),
+    seeds: Optional[str] = Form(None, description="Comma-separated seeds, one variant each"),
+    profiling: bool = Depends(profile_requested),
+    deadline: Optional[float] = Depends(requested_deadline)
 ):
-    """Generate image from text prompt using Stable Diffusion XL"""
+    """Generate image from text prompt using Stable Diffusion XL
+    
+    With ``num_variants`` or ``seeds``, every variant comes from one
+    batched pipeline call and is stored as its own file.
+    """
     
     try:
+        trace = start_trace(storage_service.new_job_id())
+        
         # Validate parameters
         if not prompt.strip():
             raise HTTPException(status_code=400, detail="Prompt cannot be empty")
         
-        # Generate image
-        image_bytes, metadata = await model_service.generate_text_to_image(
-            prompt=prompt,
-            width=width,
-            height=height,
-            num_inference_steps=num_inference_steps,
-            guidance_scale=guidance_scale,
-            seed=seed
+        variant_seeds = _variant_seeds(num_variants, seeds, seed)
+        
+        spec = JobSpec(
+            "text-to-image", width=width, height=height, steps=num_inference_steps,
+            count=len(variant_seeds) if variant_seeds else None
         )
+        eta = _submission_eta(spec, deadline)
         
-        # Save image to output directory
+        # Generate image; the pipeline starts loading while the job waits for admission
+        model_service.preload("sdxl")
+        with metrics_service.track_job("text-to-image"), profile(trace.job_id, profiling) as profiler:
+            if variant_seeds is None:
+                image_bytes, metadata = await model_service.generate_text_to_image(
+                    prompt=prompt,
+                    width=width,
+                    height=height,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale,
+                    seed=seed
+                )
+                outputs = [image_bytes]
+            else:
+                outputs, metadata = await model_service.generate_text_to_image_variants(
+                    prompt=prompt,
+                    seeds=variant_seeds,
+                    width=width,
+                    height=height,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale
+                )
+        metadata["eta"] = eta
+        
+        # Save image to output directory, one file per variant
         timestamp = int(time.time())
-        filename = f"generated_image_{timestamp}.png"
-        output_path = Path(settings.output_dir) / "models" / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_bytes(image_bytes)
+        if variant_seeds is None:
+            filenames = [f"generated_image_{timestamp}.png"]
+        else:
+            filenames = [f"generated_image_{timestamp}_{variant_seed}.png" for variant_seed in variant_seeds]
+        write_results = await asyncio.gather(*(
+            generation_pipeline.run("write", storage_service.write_output, filename, data)
+            for filename, data in zip(filenames, outputs)
+        ))
+        metadata["stored_size"] = sum(result["stored_size"] for result in write_results)
+        
+        await _finalize_job(trace, filenames, "text-to-image", metadata, profiler)
         
         return TextToImageResponse(
             success=True,
-            filename=filename,
-            file_size=len(image_bytes),
+            filename=filenames[0],
+            file_size=len(outputs[0]),
             generation_time=metadata["generation_time"],
+            variants=[
+                VariantResult(seed=variant_seed, filename=filename, file_size=len(data))
+                for variant_seed, filename, data in zip(variant_seeds or [], filenames, outputs)
+            ],
             metadata=metadata
         )
         
+    except HTTPException:
+        raise
+    except ADMISSION_ERRORS as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text-to-image generation failed: {str(e)}")
 
@@ -75,68 +276,443 @@ async def generate_3d_from_image(
     mode: str = Form("geometry"),
     guidance_scale: float = Form(7.5),
     num_steps: int = Form(50),
-    seed: int = Form(2025)
+    seed: int = Form(2025),
+    num_variants: Optional[int] = Form(None, description="Models to generate from consecutive seeds"),
+    seeds: Optional[str] = Form(None, description="Comma-separated seeds, one variant each"),
+    profiling: bool = Depends(profile_requested),
+    deadline: Optional[float] = Depends(requested_deadline)
 ):
-    """Generate 3D model from uploaded image"""
+    """Generate 3D model from uploaded image
+    
+    With ``num_variants`` or ``seeds``, the image is decoded once and every
+    variant comes from one backend call; each is stored as its own file.
+    """
     
     try:
-        # Validate parameters
-        if mode not in ["geometry", "textured"]:
-            raise HTTPException(status_code=400, detail="Mode must be 'geometry' or 'textured'")
-        
-        if not (1.0 <= guidance_scale <= 15.0):
-            raise HTTPException(status_code=400, detail="Guidance scale must be between 1.0 and 15.0")
+        trace = start_trace(storage_service.new_job_id())
         
-        if not (10 <= num_steps <= 100):
-            raise HTTPException(status_code=400, detail="Number of steps must be between 10 and 100")
+        # Validate parameters
+        _validate_3d_params(mode, guidance_scale, num_steps)
+        variant_seeds = _variant_seeds(num_variants, seeds, seed)
         
         # Read image file
-        image_bytes = await image.read()
+        with span("upload_read"):
+            image_bytes = await image.read()
         
         if len(image_bytes) == 0:
             raise HTTPException(status_code=400, detail="Image file is empty")
         
-        # Generate 3D model
-        model_bytes, metadata = await model_service.generate_3d_from_image(
-            image_bytes=image_bytes,
-            mode=mode,
-            guidance_scale=guidance_scale,
-            num_steps=num_steps,
-            seed=seed
-        )
+        spec = JobSpec("generate-3d", mode=mode, steps=num_steps, count=len(variant_seeds) if variant_seeds else None)
+        eta = _submission_eta(spec, deadline)
+        
+        # Generate 3D model; the pipeline starts loading while the job waits for admission
+        model_service.preload("step1x3d")
+        with metrics_service.track_job("generate-3d"), profile(trace.job_id, profiling) as profiler:
+            if variant_seeds is None:
+                model_bytes, metadata = await model_service.generate_3d_from_image(
+                    image_bytes=image_bytes,
+                    mode=mode,
+                    guidance_scale=guidance_scale,
+                    num_steps=num_steps,
+                    seed=seed
+                )
+                outputs = [model_bytes]
+            else:
+                outputs, metadata = await model_service.generate_3d_variants(
+                    image_bytes=image_bytes,
+                    seeds=variant_seeds,
+                    mode=mode,
+                    guidance_scale=guidance_scale,
+                    num_steps=num_steps
+                )
+        metadata["eta"] = eta
         
-        # Save model to output directory
+        # Save model to output directory, one file per variant
         timestamp = int(time.time())
-        filename = f"{mode}_{seed}_{timestamp}.glb"
-        output_path = Path(settings.output_dir) / "models" / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_bytes(model_bytes)
+        filenames = [f"{mode}_{model_seed}_{timestamp}.glb" for model_seed in (variant_seeds or [seed])]
+        write_results = await asyncio.gather(*(
+            generation_pipeline.run("write", storage_service.write_output, filename, data)
+            for filename, data in zip(filenames, outputs)
+        ))
+        metadata["stored_size"] = sum(result["stored_size"] for result in write_results)
+        
+        await _finalize_job(trace, filenames, "generate-3d", metadata, profiler)
         
         return GenerationResponse(
             success=True,
-            filename=filename,
-            file_size=len(model_bytes),
+            filename=filenames[0],
+            file_size=len(outputs[0]),
             generation_time=metadata["generation_time"],
             mode=mode,
+            variants=[
+                VariantResult(seed=variant_seed, filename=filename, file_size=len(data))
+                for variant_seed, filename, data in zip(variant_seeds or [], filenames, outputs)
+            ],
             metadata=metadata
         )
         
+    except HTTPException:
+        raise
+    except ADMISSION_ERRORS as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"3D generation failed: {str(e)}")
 
 
+def _validate_3d_params(mode: str, guidance_scale: float, num_steps: int, item: Optional[str] = None) -> None:
+    """Raise a 400 unless image-to-3D parameters are in range, naming the batch item if given"""
+    prefix = f"{item}: " if item else ""
+    
+    if mode not in ["geometry", "textured"]:
+        raise HTTPException(status_code=400, detail=f"{prefix}Mode must be 'geometry' or 'textured'")
+    
+    if not (1.0 <= guidance_scale <= 15.0):
+        raise HTTPException(status_code=400, detail=f"{prefix}Guidance scale must be between 1.0 and 15.0")
+    
+    if not (10 <= num_steps <= 100):
+        raise HTTPException(status_code=400, detail=f"{prefix}Number of steps must be between 10 and 100")
+
+
+def _ndjson(event: Dict[str, Any]) -> bytes:
+    return (json.dumps(event) + "\n").encode()
+
+
+async def _progress_stream(
+    job: Callable[[ProgressCallback], Awaitable[BaseModel]],
+    accepted: Dict[str, Any],
+    failure: str
+) -> AsyncIterator[bytes]:
+    """Run a job, streaming its progress events and then its result as newline-delimited JSON
+    
+    Errors after the stream has started cannot change the status code, so
+    they are sent as a final ``error`` event carrying the status the
+    non-streaming response would have had. A client disconnecting cancels the job.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(job(events.put_nowait))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    
+    try:
+        yield _ndjson({"event": "accepted", **accepted})
+        while (event := await events.get()) is not None:
+            yield _ndjson(event)
+        
+        try:
+            result = task.result()
+        except HTTPException as e:
+            yield _ndjson({"event": "error", "status": e.status_code, "detail": e.detail})
+        except ADMISSION_ERRORS as e:
+            error = _admission_error(e)
+            yield _ndjson({"event": "error", "status": error.status_code, "detail": error.detail, "headers": error.headers})
+        except Exception as e:
+            yield _ndjson({"event": "error", "status": 500, "detail": f"{failure}: {str(e)}"})
+        else:
+            yield _ndjson({"event": "result", "result": result.model_dump()})
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@router.post("/text-to-3d", response_model=TextTo3DResponse)
+async def text_to_3d(
+    prompt: str = Form(...),
+    width: int = Form(1024),
+    height: int = Form(1024),
+    num_inference_steps: int = Form(20),
+    image_guidance_scale: float = Form(7.5),
+    image_seed: Optional[int] = Form(None),
+    mode: str = Form("geometry"),
+    guidance_scale: float = Form(7.5),
+    num_steps: int = Form(50),
+    seed: int = Form(2025),
+    save_image: bool = Form(False),
+    stream: bool = Form(False),
+    profiling: bool = Depends(profile_requested),
+    deadline: Optional[float] = Depends(requested_deadline)
+):
+    """Generate a 3D model from a text prompt, handing the generated image to the 3D model in memory
+    
+    With ``save_image`` the intermediate image is stored alongside the
+    model. With ``stream`` the response is newline-delimited JSON: an
+    ``accepted`` event, ``started``, ``step`` and ``completed`` events for
+    each stage, then a ``result`` (the usual response body) or ``error`` event.
+    """
+    
+    try:
+        trace = start_trace(storage_service.new_job_id())
+        
+        # Validate parameters
+        if not prompt.strip():
+            raise HTTPException(status_code=400, detail="Prompt cannot be empty")
+        
+        _validate_3d_params(mode, guidance_scale, num_steps)
+        
+        eta = _submission_eta(
+            JobSpec("text-to-image", width=width, height=height, steps=num_inference_steps),
+            deadline,
+            followed_by=JobSpec("generate-3d", mode=mode, steps=num_steps),
+            route="text-to-3d",
+        )
+        
+        async def run(progress: Optional[ProgressCallback] = None) -> TextTo3DResponse:
+            # Both pipelines start loading while the job waits for admission
+            model_service.preload("sdxl")
+            model_service.preload("step1x3d")
+            with metrics_service.track_job("text-to-3d"), profile(trace.job_id, profiling) as profiler:
+                model_bytes, image_bytes, metadata = await model_service.generate_text_to_3d(
+                    prompt=prompt,
+                    width=width,
+                    height=height,
+                    num_inference_steps=num_inference_steps,
+                    image_guidance_scale=image_guidance_scale,
+                    image_seed=image_seed,
+                    mode=mode,
+                    guidance_scale=guidance_scale,
+                    num_steps=num_steps,
+                    seed=seed,
+                    keep_image=save_image,
+                    progress=progress
+                )
+            metadata["eta"] = eta
+            
+            # Save the model, and the intermediate image if requested
+            timestamp = int(time.time())
+            filename = f"{mode}_{seed}_{timestamp}.glb"
+            filenames = [filename]
+            writes = [generation_pipeline.run("write", storage_service.write_output, filename, model_bytes)]
+            image_filename = None
+            if image_bytes is not None:
+                image_filename = f"generated_image_{timestamp}.png"
+                filenames.append(image_filename)
+                writes.append(generation_pipeline.run("write", storage_service.write_output, image_filename, image_bytes))
+            write_results = await asyncio.gather(*writes)
+            metadata["stored_size"] = sum(result["stored_size"] for result in write_results)
+            
+            await _finalize_job(trace, filenames, "text-to-3d", metadata, profiler)
+            
+            return TextTo3DResponse(
+                success=True,
+                filename=filename,
+                file_size=len(model_bytes),
+                image_filename=image_filename,
+                generation_time=metadata["generation_time"],
+                mode=mode,
+                metadata=metadata
+            )
+        
+        if stream:
+            return StreamingResponse(
+                _progress_stream(run, {"job_id": trace.job_id, "eta": eta}, "Text-to-3D generation failed"),
+                media_type="application/x-ndjson"
+            )
+        
+        return await run()
+        
+    except HTTPException:
+        raise
+    except ADMISSION_ERRORS as e:
+        raise _admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Text-to-3D generation failed: {str(e)}")
+
+
+async def _generate_batch_item(job_id: str, item: BatchItem) -> Dict[str, Any]:
+    """Generate and store one batch item, returning its result fields"""
+    with metrics_service.track_job("generate-3d"):
+        image_bytes = await asyncio.to_thread(item.upload.read)
+        model_bytes, metadata = await model_service.generate_3d_from_image(image_bytes=image_bytes, **item.params)
+    
+    stem = re.sub(r"[^A-Za-z0-9_-]", "_", Path(item.name).stem)[:40]
+    filename = f"batch_{job_id[:8]}_{item.index:04d}_{stem}_{item.params['mode']}.glb"
+    write_result = await generation_pipeline.run("write", storage_service.write_output, filename, model_bytes)
+    
+    return {
+        "filename": filename,
+        "file_size": len(model_bytes),
+        "stored_size": write_result["stored_size"],
+        "generation_time": metadata["generation_time"],
+        "image_size": metadata["image_size"],
+    }
+
+
+@router.post("/generate-3d/batch", response_model=BatchGenerationResponse)
+async def generate_3d_batch(
+    images: List[UploadFile] = File([]),
+    archive: Optional[UploadFile] = File(None),
+    mode: str = Form("geometry"),
+    guidance_scale: float = Form(7.5),
+    num_steps: int = Form(50),
+    seed: int = Form(2025),
+    items: Optional[str] = Form(None, description="Per-item overrides: JSON list by position or object by image name"),
+    stream: bool = Form(False),
+    profiling: bool = Depends(profile_requested)
+):
+    """Generate 3D models from many images, uploaded as files and/or one ZIP archive, as a single job
+    
+    The form parameters apply to every image unless overridden per item.
+    Uploads are spooled to temporary files and each image is read back
+    only when its item runs, so memory holds the items in flight rather
+    than the whole batch. Identical images with identical parameters run
+    once. Distinct items are grouped by mode and step count and run
+    BATCH_CONCURRENCY at a time, so a batch keeps the pipeline busy
+    without crowding out other requests. The manifest at ``/api/v1/jobs/{job_id}`` is updated as
+    items finish, and ``/api/v1/jobs/{job_id}/bundle`` downloads every
+    model. With ``stream`` the response is newline-delimited JSON: an
+    ``accepted`` event, an ``item`` event per image as it finishes, then a
+    ``result`` event with the batch manifest.
+    """
+    
+    try:
+        trace = start_trace(storage_service.new_job_id())
+        
+        # Spool uploads and the archive to disk; images are read back as their items run
+        with span("upload_read"):
+            spool = await asyncio.to_thread(
+                spool_uploads,
+                [(image.filename or f"image_{index}", image.file) for index, image in enumerate(images)],
+                archive.file if archive is not None else None,
+            )
+        
+        try:
+            empty = [upload.name for upload in spool.uploads if not upload.size]
+            if empty:
+                raise HTTPException(status_code=400, detail=f"Empty image files: {empty}")
+            
+            shared = {"mode": mode, "guidance_scale": guidance_scale, "num_steps": num_steps, "seed": seed}
+            batch = build_items(spool.uploads, shared, items)
+            for item in batch:
+                params = item.params
+                _validate_3d_params(params["mode"], params["guidance_scale"], params["num_steps"], item.name)
+                metrics_service.record_cache("batch_dedup", hit=item.duplicate_of is not None)
+        except Exception:
+            spool.close()
+            raise
+        order = schedule_order(batch)
+        
+        # Distinct items run a few at a time behind whatever is already queued
+        specs = [JobSpec("generate-3d", mode=item.params["mode"], steps=item.params["num_steps"]) for item in order]
+        service = sum(cost_service.predict(spec, model_service.cost_device) for spec in specs)
+        queue = model_service.scheduler.expected_wait()
+        parallel = max(1, min(settings.batch_concurrency, model_service.scheduler.slots))
+        eta = {
+            "service": round(service, 3),
+            "queue": round(queue, 3),
+            "eta": round(queue + service / parallel, 3),
+            "models_ready": model_service.models_loaded,
+        }
+        
+        bundle_url = f"/api/v1/jobs/{trace.job_id}/bundle"
+        
+        async def run(progress: Optional[ProgressCallback] = None) -> BatchGenerationResponse:
+            emit = progress or (lambda event: None)
+            start_time = time.time()
+            slots = asyncio.Semaphore(max(1, settings.batch_concurrency))
+            manifest_lock = asyncio.Lock()
+            filenames: List[str] = []
+            counts = {"completed": 0, "failed": 0}
+            
+            def manifest(status: str) -> Dict[str, Any]:
+                return {
+                    "route": "generate-3d/batch",
+                    "status": status,
+                    "total": len(batch),
+                    **counts,
+                    "bundle_url": bundle_url,
+                    "items": [item.to_dict() for item in batch],
+                }
+            
+            async def finish(finished: List[BatchItem]) -> None:
+                async with manifest_lock:
+                    for item in finished:
+                        counts[item.status] += 1
+                        emit({"event": "item", **item.to_dict(), **counts, "total": len(batch)})
+                    await storage_service.record_job(trace.job_id, filenames, manifest("running"))
+            
+            async def process(item: BatchItem) -> None:
+                async with slots:
+                    item.status = "running"
+                    try:
+                        item.result = await _generate_batch_item(trace.job_id, item)
+                        item.status = "completed"
+                        filenames.append(item.result["filename"])
+                    except Exception as e:
+                        error = _admission_error(e) if isinstance(e, ADMISSION_ERRORS) else None
+                        item.status = "failed"
+                        item.result = {"error": str(e), "status_code": error.status_code if error else 500}
+                
+                duplicates = [other for other in batch if other.duplicate_of is item]
+                for other in duplicates:
+                    other.status, other.result = item.status, dict(item.result)
+                await finish([item, *duplicates])
+            
+            model_service.preload("step1x3d")
+            try:
+                with metrics_service.track_job("generate-3d/batch"), profile(trace.job_id, profiling) as profiler:
+                    await storage_service.record_job(trace.job_id, [], manifest("running"))
+                    await asyncio.gather(*(process(item) for item in order))
+            finally:
+                spool.close()
+            
+            status = "completed" if not counts["failed"] else "completed_with_errors"
+            await storage_service.record_job(trace.job_id, filenames, manifest(status))
+            
+            metadata: Dict[str, Any] = {
+                "eta": eta,
+                "distinct": len(order),
+                "groups": sorted({f"{item.params['mode']}/{item.params['num_steps']}" for item in order}),
+            }
+            await _finalize_job(trace, filenames, "generate-3d/batch", metadata, profiler)
+            
+            return BatchGenerationResponse(
+                success=counts["failed"] == 0,
+                job_id=trace.job_id,
+                bundle_url=bundle_url,
+                total=len(batch),
+                completed=counts["completed"],
+                failed=counts["failed"],
+                generation_time=time.time() - start_time,
+                items=[item.to_dict() for item in batch],
+                metadata=metadata
+            )
+        
+        if stream:
+            return StreamingResponse(
+                _progress_stream(
+                    run,
+                    {"job_id": trace.job_id, "bundle_url": bundle_url, "total": len(batch), "eta": eta},
+                    "Batch 3D generation failed"
+                ),
+                media_type="application/x-ndjson"
+            )
+        
+        return await run()
+        
+    except HTTPException:
+        raise
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ADMISSION_ERRORS as e:
+        raise _admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch 3D generation failed: {str(e)}")
+
+
 @router.post("/convert-mesh", response_model=ConvertMeshResponse)
 async def convert_mesh(
     file: UploadFile = File(...),
     prompt: Optional[str] = Form(None),
     target_format: str = Form("glb"),
-    quality: str = Form("high")
+    quality: str = Form("high"),
+    profiling: bool = Depends(profile_requested),
+    deadline: Optional[float] = Depends(requested_deadline)
 ):
     """Convert uploaded 3D file to mesh format"""
     
     try:
+        trace = start_trace(storage_service.new_job_id())
+        
         # Validate parameters
-        if target_format not in ["glb", "obj", "stl", "ply"]:
+        if target_format not in MESH_TARGET_FORMATS:
             raise HTTPException(status_code=400, detail="Target format must be one of: glb, obj, stl, ply")
         
         if quality not in ["low", "medium", "high"]:
@@ -150,27 +726,37 @@ async def convert_mesh(
             )
         
         # Read file
-        file_bytes = await file.read()
+        with span("upload_read"):
+            file_bytes = await file.read()
         
         if len(file_bytes) == 0:
             raise HTTPException(status_code=400, detail="File is empty")
         
+        spec = JobSpec("convert-mesh", mode=target_format, size=len(file_bytes))
+        eta = _submission_eta(spec, deadline)
+        
         # Convert mesh
-        converted_bytes, metadata = await mesh_service.convert_to_mesh(
-            file_bytes=file_bytes,
-            filename=file.filename,
-            prompt=prompt,
-            target_format=target_format,
-            quality=quality
-        )
+        with metrics_service.track_job("convert-mesh"), profile(trace.job_id, profiling) as profiler:
+            async with memory_service.track("convert-mesh", len(file_bytes)) as memory:
+                converted_bytes, metadata = await mesh_service.convert_to_mesh(
+                    file_bytes=file_bytes,
+                    filename=file.filename,
+                    prompt=prompt,
+                    target_format=target_format,
+                    quality=quality
+                )
+        metadata["memory"] = memory.result
+        metadata["eta"] = eta
+        await cost_service.observe(spec, "cpu", metadata["conversion_time"])
         
         # Save converted file
         timestamp = int(time.time())
         original_name = Path(file.filename).stem
         filename = f"{original_name}_{target_format}_{timestamp}.{target_format}"
-        output_path = Path(settings.output_dir) / "models" / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_bytes(converted_bytes)
+        write_result = await generation_pipeline.run("write", storage_service.write_output, filename, converted_bytes)
+        metadata["stored_size"] = write_result["stored_size"]
+        
+        await _finalize_job(trace, [filename], "convert-mesh", metadata, profiler)
         
         return ConvertMeshResponse(
             success=True,
@@ -183,37 +769,246 @@ async def convert_mesh(
             metadata=metadata
         )
         
+    except HTTPException:
+        raise
+    except ADMISSION_ERRORS as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mesh conversion failed: {str(e)}")
 
 
+@router.post("/convert-mesh/batch", response_model=ConvertMeshBatchResponse)
+async def convert_mesh_batch(
+    files: List[UploadFile] = File(...),
+    target_formats: str = Form("glb", description="Comma-separated list of glb, obj, stl, ply"),
+    prompt: Optional[str] = Form(None),
+    quality: str = Form("high"),
+    output: str = Form("manifest", description="manifest (JSON) or bundle (the converted files as a streamed ZIP)"),
+    profiling: bool = Depends(profile_requested)
+):
+    """Convert several 3D files to several formats in one request
+    
+    Each file is loaded (or meshed) once and every format is exported from
+    the same in-memory mesh in parallel; files are converted
+    BATCH_CONCURRENCY at a time. All outputs are recorded as one job. The
+    response is its manifest, or with ``output=bundle`` the converted files
+    streamed as a ZIP, with any failed inputs listed in ``X-Batch-Failed``.
+    """
+    
+    try:
+        trace = start_trace(storage_service.new_job_id())
+        
+        # Validate parameters
+        formats = list(dict.fromkeys(fmt.strip().lower() for fmt in target_formats.split(",") if fmt.strip()))
+        if not formats or any(fmt not in MESH_TARGET_FORMATS for fmt in formats):
+            raise HTTPException(status_code=400, detail="Target formats must be drawn from: glb, obj, stl, ply")
+        
+        if quality not in ["low", "medium", "high"]:
+            raise HTTPException(status_code=400, detail="Quality must be one of: low, medium, high")
+        
+        if output not in ["manifest", "bundle"]:
+            raise HTTPException(status_code=400, detail="Output must be 'manifest' or 'bundle'")
+        
+        if len(files) > settings.batch_max_items:
+            raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_items} files per request")
+        
+        unsupported = [file.filename for file in files if not mesh_service.validate_format(file.filename, "input")]
+        if unsupported:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file formats {unsupported}. Supported formats: {mesh_service.get_supported_formats()['input']}"
+            )
+        
+        # Read files
+        with span("upload_read"):
+            uploads = [(file.filename, await file.read()) for file in files]
+        
+        empty = [name for name, data in uploads if not data]
+        if empty:
+            raise HTTPException(status_code=400, detail=f"Empty files: {empty}")
+        
+        timestamp = int(time.time())
+        slots = asyncio.Semaphore(max(1, settings.batch_concurrency))
+        
+        async def convert(index: int, name: str, data: bytes) -> ConvertMeshItemResult:
+            try:
+                async with slots:
+                    with metrics_service.track_job("convert-mesh"):
+                        async with memory_service.track("convert-mesh", len(data)):
+                            outputs, metadata = await mesh_service.convert_to_formats(data, name, formats, prompt, quality)
+                    
+                    # Save every format
+                    stem = Path(name).stem
+                    filenames = {fmt: f"{stem}_{index}_{fmt}_{timestamp}.{fmt}" for fmt in formats}
+                    await asyncio.gather(*(
+                        generation_pipeline.run("write", storage_service.write_output, filenames[fmt], outputs[fmt])
+                        for fmt in formats
+                    ))
+                
+                return ConvertMeshItemResult(
+                    index=index,
+                    name=name,
+                    status="completed",
+                    outputs=filenames,
+                    file_sizes={fmt: len(outputs[fmt]) for fmt in formats},
+                    conversion_time=metadata["conversion_time"],
+                    mesh_info=metadata["mesh_info"]
+                )
+            
+            except Exception as e:
+                error = _admission_error(e) if isinstance(e, ADMISSION_ERRORS) else None
+                return ConvertMeshItemResult(
+                    index=index, name=name, status="failed", error=str(e), status_code=error.status_code if error else 500
+                )
+        
+        start_time = time.time()
+        with profile(trace.job_id, profiling) as profiler:
+            items = await asyncio.gather(*(convert(index, name, data) for index, (name, data) in enumerate(uploads)))
+        conversion_time = time.time() - start_time
+        
+        filenames = [filename for item in items for filename in item.outputs.values()]
+        failed = [item for item in items if item.status == "failed"]
+        
+        await storage_service.record_job(trace.job_id, filenames, {
+            "route": "convert-mesh/batch",
+            "status": "completed_with_errors" if failed else "completed",
+            "target_formats": formats,
+            "total": len(items),
+            "completed": len(items) - len(failed),
+            "failed": len(failed),
+            "items": [item.model_dump() for item in items],
+        })
+        metadata = {"quality": quality, "modification_prompt": prompt}
+        await _finalize_job(trace, filenames, "convert-mesh/batch", metadata, profiler)
+        
+        if output == "bundle":
+            if not filenames:
+                raise HTTPException(
+                    status_code=failed[0].status_code,
+                    detail=f"Every conversion failed: {'; '.join(f'{item.name}: {item.error}' for item in failed)}"
+                )
+            return StreamingResponse(
+                storage_service.iter_bundle(filenames),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f'attachment; filename="converted_{trace.job_id}.zip"',
+                    "X-Job-Id": trace.job_id,
+                    "X-Batch-Failed": ",".join(item.name for item in failed),
+                }
+            )
+        
+        return ConvertMeshBatchResponse(
+            success=not failed,
+            job_id=trace.job_id,
+            bundle_url=f"/api/v1/jobs/{trace.job_id}/bundle",
+            target_formats=formats,
+            total=len(items),
+            completed=len(items) - len(failed),
+            failed=len(failed),
+            conversion_time=conversion_time,
+            items=items,
+            metadata=metadata
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Mesh conversion failed: {str(e)}")
+
+
+@router.get("/estimate")
+async def estimate_job(
+    route: str = Query(..., description="text-to-image, generate-3d or convert-mesh"),
+    mode: Optional[str] = Query(None, description="3D mode, or target format for convert-mesh"),
+    width: Optional[int] = Query(None, ge=1),
+    height: Optional[int] = Query(None, ge=1),
+    steps: Optional[int] = Query(None, ge=1),
+    size: Optional[int] = Query(None, ge=0, description="Upload size in bytes for convert-mesh"),
+    deadline: Optional[float] = Query(None, gt=0, description="Seconds the job should finish within")
+):
+    """Predict how long a job would take if submitted now, without running it"""
+    
+    if route not in ("text-to-image", "generate-3d", "convert-mesh"):
+        raise HTTPException(status_code=400, detail="Route must be one of: text-to-image, generate-3d, convert-mesh")
+    
+    spec = JobSpec(route, mode=mode, width=width, height=height, steps=steps, size=size)
+    return {
+        "job": spec.to_dict(),
+        **_submission_eta(spec, deadline),
+        "scheduler": model_service.scheduler.get_status(),
+    }
+
+
 @router.get("/download/{filename}")
-async def download_file(filename: str):
-    """Download generated file"""
+async def download_file(filename: str, request: Request):
+    """Download generated file
+
+    Byte ranges apply to the representation actually sent: a client that
+    accepts zstd can resume an output stored compressed at rest against the
+    stored bytes, while ranges over the decompressed stream are refused with
+    416. Range requests skip precompressed sidecars so they resolve against
+    the raw file.
+    """
     
     try:
         # Security check - prevent directory traversal
         if ".." in filename or "/" in filename or "\\" in filename:
             raise HTTPException(status_code=400, detail="Invalid filename")
         
-        file_path = Path(settings.output_dir) / "models" / filename
+        stored = storage_service.locate(filename)
         
-        if not file_path.exists():
+        if stored is None:
             raise HTTPException(status_code=404, detail="File not found")
         
+        file_path, stored_encoding = stored
+        accept_encoding = request.headers.get("accept-encoding")
+        range_requested = "range" in request.headers
+        
         # Determine media type based on file extension
-        file_ext = file_path.suffix.lower()
-        media_types = {
-            ".glb": "model/gltf-binary",
-            ".obj": "model/obj",
-            ".stl": "model/stl",
-            ".ply": "application/octet-stream",
-            ".png": "image/png",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-        }
+        media_type = media_type_for(filename)
+        
+        # Record the download for least-recently-used eviction
+        retention_service.touch(filename)
         
-        media_type = media_types.get(file_ext, "application/octet-stream")
+        if stored_encoding is not None:
+            # Stored compressed: pass the bytes through if the client accepts the encoding
+            if negotiate(accept_encoding, [stored_encoding]):
+                return FileResponse(
+                    path=str(file_path),
+                    filename=filename,
+                    media_type=media_type,
+                    headers={"Content-Encoding": stored_encoding, "Vary": "Accept-Encoding"}
+                )
+            
+            logical_size = storage_service.logical_size(file_path, stored_encoding)
+            if range_requested:
+                # Seeking into the decompressed stream would mean decompressing everything before it
+                raise HTTPException(
+                    status_code=416,
+                    detail="Range requests are not supported for outputs decompressed on the fly",
+                    headers={"Content-Range": f"bytes */{logical_size}"} if logical_size is not None else None
+                )
+            
+            headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Accept-Ranges": "none"}
+            if logical_size is not None:
+                headers["Content-Length"] = str(logical_size)
+            
+            return StreamingResponse(
+                storage_service.iter_decompressed(file_path, stored_encoding),
+                media_type=media_type,
+                headers=headers
+            )
+        
+        # Serve a precompressed sidecar when the client accepts its encoding
+        sidecar = None if range_requested else storage_service.find_sidecar(filename, accept_encoding)
+        if sidecar is not None:
+            sidecar_path, encoding = sidecar
+            return FileResponse(
+                path=str(sidecar_path),
+                filename=filename,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
         
         return FileResponse(
             path=str(file_path),
@@ -227,6 +1022,58 @@ async def download_file(filename: str):
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 
+@router.post("/bundle")
+async def download_bundle(request: BundleRequest):
+    """Download several outputs, or every output of a job, as one streamed ZIP archive"""
+    
+    try:
+        filenames = list(request.filenames)
+        
+        if request.job_id:
+            if not is_valid_job_id(request.job_id):
+                raise HTTPException(status_code=400, detail="Invalid job ID")
+            
+            job = storage_service.get_job(request.job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            filenames.extend(name for name in job["files"] if name not in filenames)
+        
+        if not filenames:
+            raise HTTPException(status_code=400, detail="No filenames or job ID given")
+        
+        # Security check - prevent directory traversal
+        invalid = [name for name in filenames if not is_valid_filename(name)]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid filenames: {invalid}")
+        
+        available = [name for name in filenames if storage_service.locate(name) is not None]
+        if not available:
+            raise HTTPException(status_code=404, detail="None of the requested files exist")
+        
+        for name in available:
+            retention_service.touch(name)
+        
+        archive_name = request.archive_name or f"bundle_{request.job_id or int(time.time())}"
+        if not is_valid_filename(archive_name):
+            raise HTTPException(status_code=400, detail="Invalid archive name")
+        if not archive_name.endswith(".zip"):
+            archive_name += ".zip"
+        
+        return StreamingResponse(
+            storage_service.iter_bundle(available),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f'attachment; filename="{archive_name}"',
+                "X-Bundle-Missing": ",".join(name for name in filenames if name not in available),
+            }
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bundle download failed: {str(e)}")
+
+
 @router.get("/files")
 async def list_generated_files():
     """List all generated files"""
@@ -237,17 +1084,7 @@ async def list_generated_files():
         if not models_dir.exists():
             return {"files": [], "total": 0}
         
-        files = []
-        for file_path in models_dir.iterdir():
-            if file_path.is_file():
-                stat = file_path.stat()
-                files.append({
-                    "filename": file_path.name,
-                    "size": stat.st_size,
-                    "created": stat.st_ctime,
-                    "modified": stat.st_mtime,
-                    "extension": file_path.suffix.lower()
-                })
+        files = await asyncio.to_thread(storage_service.list_outputs)
         
         # Sort by creation time (newest first)
         files.sort(key=lambda x: x["created"], reverse=True)
@@ -255,6 +1092,8 @@ async def list_generated_files():
         return {
             "files": files,
             "total": len(files),
+            "total_size": sum(f["size"] or 0 for f in files),
+            "total_stored_size": sum(f["stored_size"] for f in files),
             "directory": str(models_dir)
         }
         
@@ -271,12 +1110,14 @@ async def delete_file(filename: str):
         if ".." in filename or "/" in filename or "\\" in filename:
             raise HTTPException(status_code=400, detail="Invalid filename")
         
-        file_path = Path(settings.output_dir) / "models" / filename
+        stored = storage_service.locate(filename)
         
-        if not file_path.exists():
+        if stored is None:
             raise HTTPException(status_code=404, detail="File not found")
         
-        file_path.unlink()
+        stored[0].unlink()
+        storage_service.remove_sidecars(filename)
+        retention_service.forget(filename)
         
         return {
             "status": "success",
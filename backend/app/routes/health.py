@@ -3,13 +3,18 @@ Health check and status routes
 """
 
 import time
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
 
 from ..models.health import HealthResponse, ModelStatus
 from ..services.gpu_service import gpu_service
 from ..services.model_service import model_service
+from ..services.memory_service import memory_service
+from ..services.cost_service import cost_service
+from ..services.pipeline import generation_pipeline
+from ..services.metrics_service import metrics_service
 from ..config import settings
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -18,48 +23,113 @@ router = APIRouter(prefix="/health", tags=["health"])
 startup_time = time.time()
 
 
+class _SnapshotCache:
+    """Time-bounded cache so frequent polling does not recompute diagnostics"""
+    
+    def __init__(self):
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+    
+    def get(self, key: str, factory: Callable[[], Any], ttl: float) -> Any:
+        """Return the cached value for key, recomputing it once older than ttl seconds"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] < ttl:
+            metrics_service.record_cache("health_snapshot", hit=True)
+            return entry[1]
+        
+        metrics_service.record_cache("health_snapshot", hit=False)
+        value = factory()
+        self._entries[key] = (now, value)
+        return value
+
+
+snapshot_cache = _SnapshotCache()
+
+
+def _build_health(verbose: bool) -> HealthResponse:
+    """Build the health payload, including system information only when verbose"""
+    
+    # Get model status
+    model_status = model_service.get_model_status()
+    readiness = model_service.get_readiness()
+    
+    # Get GPU information from the latest telemetry snapshot
+    gpu_info = gpu_service.get_gpu_info()
+    
+    # Get system information
+    system_info = gpu_service.get_system_info() if verbose else {}
+    
+    # Build model status dict
+    devices = gpu_info.get("devices") or [{}]
+    models = {}
+    for model_name, status in model_status.items():
+        if model_name not in ("models_loaded", "backend"):
+            loaded_at = status.get("loaded_at")
+            models[model_name] = ModelStatus(
+                model_id=status["model_id"],
+                loaded=status["loaded"],
+                gpu_memory_used=devices[0].get("memory_allocated"),
+                gpu_memory_total=devices[0].get("memory_total"),
+                last_loaded=datetime.fromtimestamp(loaded_at, timezone.utc).isoformat() if loaded_at else None
+            )
+    
+    health_status = {"ready": "healthy", "failed": "degraded"}.get(readiness["state"], "starting")
+    
+    return HealthResponse(
+        status=health_status,
+        version="2.0.0",
+        uptime=time.time() - startup_time,
+        ready=readiness["ready"],
+        models=models,
+        gpu_info=gpu_info,
+        system_info=system_info
+    )
+
+
 @router.get("/", response_model=HealthResponse)
 async def health_check():
-    """Comprehensive health check endpoint"""
+    """Health summary served from a short-lived cached snapshot"""
     
     try:
-        # Get model status
-        model_status = model_service.get_model_status()
+        health = snapshot_cache.get("summary", lambda: _build_health(verbose=False), settings.health_cache_ttl)
         
-        # Get GPU information
-        gpu_info = gpu_service.get_gpu_info()
+        # Uptime is free to compute, keep it exact
+        return health.model_copy(update={"uptime": time.time() - startup_time})
         
-        # Get system information
-        system_info = gpu_service.get_system_info()
-        
-        # Calculate uptime
-        uptime = time.time() - startup_time
-        
-        # Build model status dict
-        models = {}
-        for model_name, status in model_status.items():
-            if model_name != "models_loaded":
-                models[model_name] = ModelStatus(
-                    model_id=status["model_id"],
-                    loaded=status["loaded"],
-                    gpu_memory_used=gpu_info.get("devices", [{}])[0].get("memory_allocated") if gpu_info.get("devices") else None,
-                    gpu_memory_total=gpu_info.get("devices", [{}])[0].get("memory_total") if gpu_info.get("devices") else None,
-                    last_loaded=None  # TODO: Track when models were loaded
-                )
-        
-        return HealthResponse(
-            status="healthy",
-            version="2.0.0",
-            uptime=uptime,
-            models=models,
-            gpu_info=gpu_info,
-            system_info=system_info
-        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
+
+
+@router.get("/verbose", response_model=HealthResponse)
+async def health_check_verbose():
+    """Full diagnostic health payload including system information"""
+    
+    try:
+        health = snapshot_cache.get("verbose", lambda: _build_health(verbose=True), settings.health_cache_ttl)
+        return health.model_copy(update={"uptime": time.time() - startup_time})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
 
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: models are loaded and generation requests can be served"""
+    
+    readiness_info = model_service.get_readiness()
+    
+    return JSONResponse(
+        status_code=200 if readiness_info["ready"] else 503,
+        content={"status": "ready" if readiness_info["ready"] else "not_ready", **readiness_info}
+    )
+
+
 @router.get("/models")
 async def get_model_status():
     """Get detailed model status"""
@@ -87,6 +157,7 @@ async def get_gpu_status():
         
         return {
             "gpu_info": gpu_info,
+            "reservations": gpu_service.get_reservation_status(),
             "timestamp": time.time()
         }
         
@@ -94,6 +165,62 @@ async def get_gpu_status():
         raise HTTPException(status_code=500, detail=f"Failed to get GPU status: {str(e)}")
 
 
+@router.get("/gpu/history")
+async def get_gpu_history(limit: Optional[int] = Query(None, ge=1, description="Most recent snapshots to return")):
+    """Get sampled GPU telemetry history (utilization, memory, temperature, power)"""
+    
+    try:
+        history = gpu_service.telemetry.get_history(limit)
+        
+        return {
+            "backend": gpu_service.telemetry.backend.name,
+            "interval": gpu_service.telemetry.interval,
+            "capacity": gpu_service.telemetry.history.maxlen,
+            "running": gpu_service.telemetry.running,
+            "samples": history,
+            "count": len(history),
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get GPU history: {str(e)}")
+
+
+@router.get("/memory")
+async def get_memory_status():
+    """Get the memory budget, admitted reservations and learned per-route peak estimates"""
+    
+    try:
+        return memory_service.get_status()
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get memory status: {str(e)}")
+
+
+@router.get("/cost")
+async def get_cost_model_status():
+    """Get the learned job latency model and the inference scheduler's queue"""
+    
+    try:
+        return {
+            **cost_service.get_status(),
+            "scheduler": model_service.scheduler.get_status(),
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get cost model status: {str(e)}")
+
+
+@router.get("/pipeline")
+async def get_pipeline_status():
+    """Get each generation stage's workers, queue depth, throughput and utilization"""
+    
+    try:
+        return generation_pipeline.get_status()
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get pipeline status: {str(e)}")
+
+
 @router.post("/models/load")
 async def load_models():
     """Manually trigger model loading"""
@@ -0,0 +1,65 @@
+"""
+Job routes for inspecting and downloading the outputs of a request or batch
+"""
+
+from fastapi import APIRouter, HTTPException
+
+from ..models.storage import BundleRequest
+from ..services.storage_service import storage_service, is_valid_job_id
+from .generation import download_bundle
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+
+def _get_job_or_404(job_id: str) -> dict:
+    """Load a job manifest or raise the matching HTTP error"""
+    if not is_valid_job_id(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+
+    job = storage_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Get the manifest of a job"""
+
+    try:
+        job = _get_job_or_404(job_id)
+        job["available"] = [name for name in job["files"] if storage_service.locate(name) is not None]
+        return job
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job: {str(e)}")
+
+
+@router.get("/{job_id}/bundle")
+async def download_job_bundle(job_id: str):
+    """Download every output of a job as one streamed ZIP archive"""
+
+    _get_job_or_404(job_id)
+    return await download_bundle(BundleRequest(job_id=job_id))
+
+
+@router.get("/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """Get a job's stage timings as Chrome/Perfetto trace-event JSON"""
+
+    try:
+        _get_job_or_404(job_id)
+
+        trace = storage_service.get_trace(job_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail="No trace recorded for this job")
+
+        return trace
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job trace: {str(e)}")
@@ -0,0 +1,19 @@
+"""
+Prometheus metrics route
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics_service import metrics_service
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Export metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(
+        metrics_service.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
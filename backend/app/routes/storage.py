@@ -0,0 +1,37 @@
+"""
+Storage routes for output retention and disk usage
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..services.retention_service import retention_service
+from .admin import require_admin
+
+router = APIRouter(prefix="/api/v1/storage", tags=["storage"])
+
+
+@router.get("/retention")
+async def get_retention_status():
+    """Get retention policy, last run report and cumulative reclaimed space"""
+
+    try:
+        return retention_service.get_status()
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get retention status: {str(e)}")
+
+
+@router.post("/retention/run", dependencies=[Depends(require_admin)])
+async def run_retention():
+    """Trigger a retention pass immediately (evicts outputs, so admin only)"""
+
+    try:
+        report = await retention_service.run_once()
+
+        return {
+            "status": "success",
+            "report": report
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retention run failed: {str(e)}")
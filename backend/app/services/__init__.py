@@ -5,5 +5,6 @@ Services for model inference and business logic
 from .model_service import ModelService
 from .gpu_service import GPUService
 from .mesh_service import MeshService
+from .retention_service import RetentionService
 
-__all__ = ["ModelService", "GPUService", "MeshService"]
+__all__ = ["ModelService", "GPUService", "MeshService", "RetentionService"]
@@ -0,0 +1,242 @@
+"""
+Batch image-to-3D submissions: unpacking uploads, per-item parameters and grouping
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from functools import partial
+from pathlib import PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+# Archive members treated as input images
+BATCH_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+
+# Parameters an item may override, and their types
+BATCH_PARAMS = {"mode": str, "guidance_scale": float, "num_steps": int, "seed": int}
+
+MB = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+class BatchError(ValueError):
+    """A batch submission is malformed"""
+
+
+class BatchUpload:
+    """An input image of a batch, spooled to disk and read back when its item is scheduled"""
+
+    def __init__(self, name: str, size: int, digest: bytes, reader: Callable[[], bytes]):
+        self.name = name
+        self.size = size
+        self.digest = digest
+        self._reader = reader
+
+    def read(self) -> bytes:
+        """Load the image bytes (blocking; run it in a worker thread)"""
+        return self._reader()
+
+
+class BatchSpool:
+    """Batch uploads held in anonymous temporary files instead of memory
+
+    Images uploaded as files are appended to one spool file; a ZIP upload
+    is copied to another and its members are only decompressed when read.
+    Each image is hashed while it is spooled so duplicates can be found
+    without keeping its bytes, and only the items in flight are ever held
+    in memory. Close the spool once the batch has finished.
+    """
+
+    def __init__(self):
+        self.uploads: List[BatchUpload] = []
+        self._files = tempfile.TemporaryFile()
+        self._files_lock = threading.Lock()
+        self._archive_file: Optional[BinaryIO] = None
+        self._archive: Optional[zipfile.ZipFile] = None
+
+    def add_file(self, name: str, source: BinaryIO) -> None:
+        """Append an uploaded image to the spool"""
+        digest = hashlib.sha256()
+        with self._files_lock:
+            self._files.seek(0, os.SEEK_END)
+            offset = self._files.tell()
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                self._files.write(chunk)
+            size = self._files.tell() - offset
+
+        self.uploads.append(BatchUpload(name, size, digest.digest(), partial(self._read_file, offset, size)))
+
+    def add_archive(self, source: BinaryIO) -> None:
+        """Spool a ZIP upload and register its images, in archive order
+
+        Directories, hidden files and macOS resource forks are skipped. The
+        declared uncompressed size is checked against BATCH_MAX_ARCHIVE_MB
+        before anything is decompressed.
+        """
+        if self._archive is not None:
+            raise BatchError("Only one archive can be uploaded per batch")
+
+        self._archive_file = tempfile.TemporaryFile()
+        shutil.copyfileobj(source, self._archive_file, CHUNK_SIZE)
+        try:
+            self._archive = zipfile.ZipFile(self._archive_file)
+        except zipfile.BadZipFile as e:
+            raise BatchError(f"Archive is not a valid ZIP file: {e}")
+
+        members = [
+            info for info in self._archive.infolist()
+            if not info.is_dir()
+            and "__MACOSX" not in PurePosixPath(info.filename).parts
+            and not PurePosixPath(info.filename).name.startswith(".")
+            and PurePosixPath(info.filename).suffix.lower() in BATCH_IMAGE_EXTENSIONS
+        ]
+        total = sum(info.file_size for info in members)
+        if total > settings.batch_max_archive_mb * MB:
+            raise BatchError(
+                f"Archive expands to {total / MB:.0f} MB, over the {settings.batch_max_archive_mb} MB limit"
+            )
+
+        for info in members:
+            digest = hashlib.sha256()
+            try:
+                with self._archive.open(info) as member:
+                    for chunk in iter(lambda: member.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+            except (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, EOFError) as e:
+                raise BatchError(f"Cannot extract {info.filename} from the archive: {e}")
+            self.uploads.append(
+                BatchUpload(info.filename, info.file_size, digest.digest(), partial(self._archive.read, info))
+            )
+
+    def _read_file(self, offset: int, size: int) -> bytes:
+        with self._files_lock:
+            self._files.seek(offset)
+            return self._files.read(size)
+
+    def close(self) -> None:
+        """Delete the spooled uploads"""
+        if self._archive is not None:
+            self._archive.close()
+        if self._archive_file is not None:
+            self._archive_file.close()
+        self._files.close()
+
+
+def spool_uploads(files: List[Tuple[str, BinaryIO]], archive: Optional[BinaryIO] = None) -> BatchSpool:
+    """Spool uploaded images and an optional ZIP of images to disk
+
+    Blocking; run it in a worker thread.
+    """
+    spool = BatchSpool()
+    try:
+        for name, source in files:
+            spool.add_file(name, source)
+        if archive is not None:
+            spool.add_archive(archive)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+class BatchItem:
+    """One image of a batch, its effective parameters and its outcome"""
+
+    def __init__(self, index: int, upload: BatchUpload, params: Dict[str, Any]):
+        self.index = index
+        self.name = upload.name
+        self.upload = upload
+        self.params = params
+        self.key = hashlib.sha256(upload.digest + json.dumps(params, sort_keys=True).encode()).hexdigest()
+        self.duplicate_of: Optional["BatchItem"] = None
+        self.status = "queued"
+        self.result: Dict[str, Any] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "name": self.name,
+            "status": self.status,
+            **self.params,
+            **({"duplicate_of": self.duplicate_of.index} if self.duplicate_of is not None else {}),
+            **self.result,
+        }
+
+
+def _parse_overrides(overrides: Optional[str], names: List[str]) -> List[Dict[str, Any]]:
+    """Per-item parameter overrides from a JSON list (by position) or object (by image name)"""
+    if not overrides:
+        return [{} for _ in names]
+
+    try:
+        parsed = json.loads(overrides)
+    except json.JSONDecodeError as e:
+        raise BatchError(f"Item parameters are not valid JSON: {e}")
+
+    if isinstance(parsed, list):
+        if len(parsed) > len(names):
+            raise BatchError(f"Parameters given for {len(parsed)} items but the batch has {len(names)}")
+        entries = parsed + [{} for _ in range(len(names) - len(parsed))]
+    elif isinstance(parsed, dict):
+        unknown = set(parsed) - set(names)
+        if unknown:
+            raise BatchError(f"Parameters given for unknown images: {sorted(unknown)}")
+        entries = [parsed.get(name, {}) for name in names]
+    else:
+        raise BatchError("Item parameters must be a JSON list or object")
+
+    result = []
+    for name, entry in zip(names, entries):
+        if not isinstance(entry, dict):
+            raise BatchError(f"Parameters for {name} must be a JSON object")
+        unknown = set(entry) - set(BATCH_PARAMS)
+        if unknown:
+            raise BatchError(f"Unknown parameters for {name}: {sorted(unknown)}")
+        try:
+            result.append({key: BATCH_PARAMS[key](value) for key, value in entry.items()})
+        except (TypeError, ValueError) as e:
+            raise BatchError(f"Invalid parameter for {name}: {e}")
+    return result
+
+
+def build_items(uploads: List[BatchUpload], shared: Dict[str, Any], overrides: Optional[str]) -> List[BatchItem]:
+    """Create batch items with shared parameters, per-item overrides applied
+
+    Items with the same image bytes and parameters are linked to the first
+    of them, so each distinct job runs once.
+    """
+    if not uploads:
+        raise BatchError("No images in the batch")
+    if len(uploads) > settings.batch_max_items:
+        raise BatchError(f"Batch has {len(uploads)} images, over the limit of {settings.batch_max_items}")
+
+    names = [upload.name for upload in uploads]
+    items = [
+        BatchItem(index, upload, {**shared, **override})
+        for index, (upload, override) in enumerate(zip(uploads, _parse_overrides(overrides, names)))
+    ]
+
+    first: Dict[str, BatchItem] = {}
+    for item in items:
+        if item.key in first:
+            item.duplicate_of = first[item.key]
+        else:
+            first[item.key] = item
+    return items
+
+
+def schedule_order(items: List[BatchItem]) -> List[BatchItem]:
+    """Distinct items grouped by mode and step count, keeping submission order within a group
+
+    Consecutive jobs then share the same model configuration and similar
+    predicted cost, which keeps the model resident and the cost model warm.
+    """
+    distinct = [item for item in items if item.duplicate_of is None]
+    return sorted(distinct, key=lambda item: (item.params["mode"], item.params["num_steps"], item.index))
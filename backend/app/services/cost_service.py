@@ -0,0 +1,235 @@
+"""
+Learned latency cost model for generation and conversion jobs
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+from .metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+MEGAPIXEL = 1024 * 1024
+
+# (intercept seconds, seconds per unit of work) used for a route until it has been observed
+COST_PRIORS: Dict[str, Tuple[float, float]] = {
+    "text-to-image": (1.0, 0.25),  # work: steps x output megapixels
+    "generate-3d": (2.0, 0.5),  # work: steps
+    "convert-mesh": (0.1, 0.2),  # work: input megabytes
+}
+
+
+class JobSpec:
+    """The parameters of a job that its latency depends on"""
+
+    def __init__(
+        self,
+        route: str,
+        mode: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        steps: Optional[int] = None,
+        size: Optional[int] = None,
+        count: Optional[int] = None,
+    ):
+        self.route = route
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.steps = steps
+        self.size = size
+        self.count = count  # outputs generated together in one batched call
+
+    @property
+    def work(self) -> float:
+        """Size of the job in the route's unit of work"""
+        if self.route == "text-to-image":
+            return (self.steps or 1) * (self.width or 1024) * (self.height or 1024) / MEGAPIXEL * (self.count or 1)
+        if self.route == "generate-3d":
+            return float(self.steps or 1) * (self.count or 1)
+        if self.size is not None:
+            return self.size / MEGAPIXEL
+        return 1.0
+
+    def key(self, device: str) -> str:
+        # Batched calls cost less per output than single ones, so they are fitted separately
+        batch = f"/x{self.count}" if self.count and self.count > 1 else ""
+        return f"{self.route}/{self.mode or '-'}{batch}/{device}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            name: value for name, value in (
+                ("route", self.route), ("mode", self.mode), ("width", self.width),
+                ("height", self.height), ("steps", self.steps), ("size", self.size), ("count", self.count),
+            ) if value is not None
+        }
+
+
+class LinearCost:
+    """Least-squares fit of seconds = intercept + slope * work, with exponential forgetting
+
+    Older observations are down-weighted by ``decay`` per new observation so
+    the fit follows driver, model or hardware changes.
+    """
+
+    def __init__(self, decay: float = 0.99):
+        self.decay = decay
+        self.weight = 0.0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+        self.count = 0
+        self.error = 0.0  # EWMA of absolute relative error of predictions made before each observation
+
+    def observe(self, work: float, seconds: float) -> None:
+        if self.count:
+            predicted = self.predict(work)
+            relative = abs(predicted - seconds) / max(seconds, 1e-3)
+            self.error = relative if self.count == 1 else 0.9 * self.error + 0.1 * relative
+
+        self.weight = self.weight * self.decay + 1.0
+        self.sx = self.sx * self.decay + work
+        self.sy = self.sy * self.decay + seconds
+        self.sxx = self.sxx * self.decay + work * work
+        self.sxy = self.sxy * self.decay + work * seconds
+        self.count += 1
+
+    def coefficients(self) -> Optional[Tuple[float, float]]:
+        if not self.count:
+            return None
+        mean_x = self.sx / self.weight
+        mean_y = self.sy / self.weight
+        variance = self.sxx / self.weight - mean_x * mean_x
+        if variance <= 1e-9 * max(mean_x * mean_x, 1.0):
+            # Every job had the same size: scale the mean time proportionally
+            return 0.0, mean_y / mean_x if mean_x > 0 else 0.0
+        slope = (self.sxy / self.weight - mean_x * mean_y) / variance
+        if slope < 0:
+            # Noise can invert the trend on a narrow range of sizes; fall back to the mean
+            return mean_y, 0.0
+        return mean_y - slope * mean_x, slope
+
+    def predict(self, work: float) -> float:
+        intercept, slope = self.coefficients() or (0.0, 0.0)
+        return max(intercept + slope * work, 0.0)
+
+
+class CostService:
+    """Predicts how long a job will run from the recorded history of similar jobs
+
+    Each observation is the service time (excluding queueing) of a job,
+    keyed by route, mode and device, and fitted linearly against the job's
+    work (steps x megapixels, steps, or input size). A key without history
+    falls back to the route's fit on any device and mode, then to built-in
+    priors. History is appended to a JSON-lines file and replayed by
+    ``load()`` at startup, so estimates survive restarts.
+    """
+
+    def __init__(self):
+        self.models: Dict[str, LinearCost] = {}
+        self.history_path = Path(settings.output_dir) / "logs" / "cost_history.jsonl"
+        self._loaded = False
+        self._lines = 0
+        self._lock = threading.Lock()
+        self.prediction_error = metrics_service.histogram(
+            "job_duration_prediction_error_ratio", "Observed over predicted job service time", ["route"],
+            (0.25, 0.5, 0.8, 0.9, 1.0, 1.1, 1.25, 2.0, 4.0),
+        )
+
+    async def load(self) -> None:
+        """Replay recorded history into the models at startup, off the event loop"""
+        await asyncio.to_thread(self._load)
+
+    def _load(self) -> None:
+        """Replay recorded history into fresh models (runs in a worker thread)
+
+        The history file already holds every observation appended so far,
+        so the replayed models replace whatever was fitted in memory.
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.history_path.exists():
+                return
+
+            try:
+                with self.history_path.open() as f:
+                    records = deque(f, maxlen=settings.cost_history_size)
+                models: Dict[str, LinearCost] = {}
+                for line in records:
+                    record = json.loads(line)
+                    spec = JobSpec(**{k: v for k, v in record.items() if k not in ("device", "seconds", "time")})
+                    self._fit(models, spec, record["device"], record["seconds"])
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cost history {self.history_path}: {e}")
+                return
+
+            self.models = models
+            self._lines = len(records)
+            logger.info(f"Loaded {len(records)} cost model observations")
+
+    @staticmethod
+    def _fit(models: Dict[str, LinearCost], spec: JobSpec, device: str, seconds: float) -> None:
+        for key in (spec.key(device), spec.route):
+            models.setdefault(key, LinearCost()).observe(spec.work, seconds)
+
+    def predict(self, spec: JobSpec, device: str) -> float:
+        """Expected service time of a job in seconds"""
+        for key in (spec.key(device), spec.route):
+            model = self.models.get(key)
+            if model is not None and model.count:
+                return model.predict(spec.work)
+
+        intercept, slope = COST_PRIORS.get(spec.route, (1.0, 0.0))
+        return intercept + slope * spec.work
+
+    async def observe(self, spec: JobSpec, device: str, seconds: float) -> None:
+        """Record a job's measured service time"""
+        predicted = self.predict(spec, device)
+        if predicted > 0:
+            self.prediction_error.observe(seconds / predicted, route=spec.route)
+        self._fit(self.models, spec, device, seconds)
+
+        record = {**spec.to_dict(), "device": device, "seconds": seconds, "time": time.time()}
+        await asyncio.to_thread(self._append, record)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.history_path.open("a") as f:
+                f.write(json.dumps(record) + "\n")
+            self._lines += 1
+            if self._lines > 2 * settings.cost_history_size:
+                self._compact()
+
+    def _compact(self) -> None:
+        """Keep only the most recent observations on disk"""
+        with self.history_path.open() as f:
+            records = deque(f, maxlen=settings.cost_history_size)
+        tmp_path = self.history_path.with_suffix(".partial")
+        tmp_path.write_text("".join(records))
+        tmp_path.replace(self.history_path)
+        self._lines = len(records)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Fitted coefficients and accuracy per key"""
+        models = {}
+        for key, model in sorted(self.models.items()):
+            intercept, slope = model.coefficients() or (0.0, 0.0)
+            models[key] = {
+                "observations": model.count,
+                "intercept": round(intercept, 4),
+                "per_unit": round(slope, 4),
+                "error": round(model.error, 3),
+            }
+        return {"models": models, "priors": COST_PRIORS, "history": str(self.history_path)}
+
+
+# Global cost service instance
+cost_service = CostService()
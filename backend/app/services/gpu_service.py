@@ -2,17 +2,54 @@
 GPU management service for handling GPU resources and monitoring
 """
 
+import asyncio
 import torch
 import psutil
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator
 from contextlib import asynccontextmanager
 import logging
 
 from ..config import settings
+from .gpu_telemetry import GPUTelemetrySampler, TelemetryBackend, create_backend
+from .metrics_service import metrics_service
 
 logger = logging.getLogger(__name__)
 
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# Peak working memory of a job per unit of its size feature, used until a job of the kind
+# has run alone and been measured (GPU_MEMORY_PRIORS overrides them). Step count changes
+# duration, not peak memory.
+GPU_MEMORY_PRIORS = {
+    "text-to-image": 4096.0,  # per output pixel: ~4 GB at 1024x1024 in fp16 with VAE slicing
+    "generate-3d/geometry": 6.0 * GB,
+    "generate-3d/textured": 10.0 * GB,
+}
+
+
+class GPUMemoryExceeded(Exception):
+    """A job is estimated to need more GPU memory than the device can ever provide"""
+
+    def __init__(self, kind: str, estimate: int, available: int):
+        self.kind = kind
+        self.estimate = estimate
+        self.available = available
+        super().__init__(
+            f"{kind} job needs an estimated {estimate / MB:.0f} MB of GPU memory, "
+            f"more than the {available / MB:.0f} MB available to jobs"
+        )
+
+
+class GPUReservationTimeout(Exception):
+    """A job waited too long for GPU memory to become free"""
+
+    def __init__(self, kind: str, waited: float):
+        self.kind = kind
+        self.waited = waited
+        super().__init__(f"Timed out after {waited:.0f}s waiting for GPU memory for a {kind} job")
+
 
 class GPUService:
     """Service for managing GPU resources"""
@@ -22,6 +59,44 @@ class GPUService:
         self.gpu_count = torch.cuda.device_count() if torch.cuda.is_available() else 0
         self.memory_fraction = settings.gpu_memory_fraction
         self._memory_cache: Dict[int, Dict[str, Any]] = {}
+        self._system_info_cache: Optional[Dict[str, Any]] = None
+        self.telemetry = GPUTelemetrySampler(
+            self._create_telemetry_backend(),
+            interval=settings.gpu_telemetry_interval,
+            history_size=settings.gpu_telemetry_history,
+        )
+        metrics_service.set_gpu_snapshot_source(lambda: self.telemetry.latest)
+        
+        # Reservation accounting, per device
+        self._reservations: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._baseline: Dict[int, int] = {}
+        self._fraction_set: set = set()
+        self._ratios: Dict[str, float] = {}
+        self._priors: Dict[str, float] = {**GPU_MEMORY_PRIORS, **settings.gpu_memory_prior_overrides}
+        self._next_ticket = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self.reservation_waits = metrics_service.counter(
+            "gpu_reservation_waits_total", "Jobs queued until enough GPU memory was free", ["kind"]
+        )
+        self.cache_trims = metrics_service.counter(
+            "gpu_cache_trims_total", "Allocator cache releases forced by memory pressure"
+        )
+        metrics_service.gauge(
+            "gpu_reserved_estimate_bytes", "GPU memory reserved by running jobs' estimates", ["device"],
+            collect=lambda: {
+                (str(device_id),): float(sum(r["estimate"] for r in reservations.values()))
+                for device_id, reservations in self._reservations.items()
+            },
+        )
+    
+    @staticmethod
+    def _create_telemetry_backend() -> TelemetryBackend:
+        """Create the configured telemetry backend, degrading to no telemetry"""
+        try:
+            return create_backend(settings.gpu_telemetry_backend)
+        except Exception as e:
+            logger.warning(f"GPU telemetry disabled: {e}")
+            return TelemetryBackend()
         
     def _get_best_device(self) -> str:
         """Get the best available device"""
@@ -46,35 +121,31 @@ class GPUService:
         return "CPU"
     
     def get_gpu_info(self) -> Dict[str, Any]:
-        """Get comprehensive GPU information"""
-        if not torch.cuda.is_available():
+        """Get comprehensive GPU information from the latest telemetry snapshot"""
+        snapshot = self.get_latest_snapshot()
+        if snapshot is None or not snapshot["devices"]:
             return {"available": False, "count": 0}
         
-        gpu_info = {
+        return {
             "available": True,
-            "count": self.gpu_count,
-            "devices": []
+            "count": len(snapshot["devices"]),
+            "devices": snapshot["devices"],
+            "backend": snapshot["backend"],
+            "timestamp": snapshot["timestamp"],
         }
-        
-        for i in range(self.gpu_count):
-            device_info = {
-                "index": i,
-                "name": torch.cuda.get_device_name(i),
-                "memory_total": torch.cuda.get_device_properties(i).total_memory,
-                "memory_allocated": torch.cuda.memory_allocated(i),
-                "memory_reserved": torch.cuda.memory_reserved(i),
-                "memory_free": torch.cuda.get_device_properties(i).total_memory - torch.cuda.memory_allocated(i),
-                "utilization": self._get_gpu_utilization(i)
-            }
-            gpu_info["devices"].append(device_info)
-        
-        return gpu_info
+    
+    def get_latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Get the latest telemetry snapshot, sampling once if the sampler has not run yet"""
+        snapshot = self.telemetry.latest
+        if snapshot is None and self.telemetry.backend.device_count() > 0:
+            snapshot = self.telemetry.sample_now()
+        return snapshot
     
     def _get_gpu_utilization(self, device_id: int) -> float:
         """Get GPU utilization percentage"""
         try:
-            # This is a simplified version - in production you might want to use nvidia-ml-py
-            return 0.0  # Placeholder
+            snapshot = self.telemetry.latest
+            return float(snapshot["devices"][device_id]["utilization"] or 0.0)
         except Exception:
             return 0.0
     
@@ -92,9 +163,136 @@ class GPUService:
             "total": torch.cuda.get_device_properties(device_id).total_memory
         }
     
+    def _capacity(self, device_id: int) -> int:
+        """Device memory this process may use"""
+        return int(torch.cuda.get_device_properties(device_id).total_memory * self.memory_fraction)
+    
+    def _allocated(self, device_id: int) -> int:
+        return torch.cuda.memory_allocated(device_id)
+    
+    def estimate(self, kind: str, feature: float = 1.0) -> int:
+        """Predicted peak GPU working memory of a job, learned per kind from measured peaks"""
+        ratio = self._ratios.get(kind, self._priors.get(kind, 0.0))
+        return int(ratio * max(feature, 1.0) * settings.memory_estimate_margin)
+    
+    def _observe(self, kind: str, feature: float, peak: int) -> None:
+        """Fold a measured peak into the kind's ratio (EWMA, biased towards growth)"""
+        ratio = max(peak, 0) / max(feature, 1.0)
+        previous = self._ratios.get(kind)
+        if previous is None or ratio > previous:
+            self._ratios[kind] = ratio
+        else:
+            self._ratios[kind] = 0.8 * previous + 0.2 * ratio
+    
+    def available(self, device_id: int = 0) -> int:
+        """GPU memory not held by idle-state allocations or reserved by running jobs"""
+        if not torch.cuda.is_available():
+            return 0
+        reservations = self._reservations.get(device_id, {})
+        baseline = self._baseline.get(device_id)
+        if baseline is None or not reservations:
+            baseline = self._allocated(device_id)
+        return self._capacity(device_id) - baseline - sum(r["estimate"] for r in reservations.values())
+    
+    def _trim_if_pressed(self, device_id: int, estimate: int) -> None:
+        """Return cached blocks to the driver only when the device is short of free memory"""
+        free, _ = torch.cuda.mem_get_info(device_id)
+        if free < estimate:
+            torch.cuda.empty_cache()
+            self.cache_trims.inc()
+            logger.debug(f"Trimmed allocator cache on GPU {device_id} ({free / MB:.0f} MB free)")
+    
+    async def _reserve(self, device_id: int, kind: str, feature: float) -> int:
+        """Reserve a job's estimated memory, waiting until it fits
+        
+        A kind that has never been measured and whose prior exceeds what the
+        device can hold waits for the device to be idle and runs alone with
+        all of it, so its real peak is learned; only a measured estimate that
+        cannot fit is rejected up front.
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        if device_id not in self._fraction_set:
+            # Once per device: a cap set on every call only adds overhead
+            torch.cuda.set_per_process_memory_fraction(self.memory_fraction, device_id)
+            self._fraction_set.add(device_id)
+        
+        estimate = self.estimate(kind, feature)
+        reservations = self._reservations.setdefault(device_id, {})
+        
+        async with self._condition:
+            if not reservations:
+                # Idle: what is allocated now is model weights and other long-lived state
+                self._baseline[device_id] = self._allocated(device_id)
+            
+            limit = self._capacity(device_id) - self._baseline[device_id]
+            exclusive = False
+            if estimate > limit:
+                if kind in self._ratios:
+                    raise GPUMemoryExceeded(kind, estimate, max(0, limit))
+                exclusive = True
+                estimate = max(0, limit)
+            
+            def fits() -> bool:
+                return not reservations if exclusive else self.available(device_id) >= estimate
+            
+            if not fits():
+                self.reservation_waits.inc(kind=kind)
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(
+                        self._condition.wait_for(fits),
+                        timeout=settings.gpu_reservation_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise GPUReservationTimeout(kind, time.monotonic() - started)
+            
+            alone = not reservations
+            for other in reservations.values():
+                other["alone"] = False
+            if alone:
+                torch.cuda.reset_peak_memory_stats(device_id)
+            
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            reservations[ticket] = {
+                "kind": kind,
+                "feature": feature,
+                "estimate": estimate,
+                "alone": alone,
+                "start_allocated": self._allocated(device_id),
+            }
+        
+        self._trim_if_pressed(device_id, estimate)
+        return ticket
+    
+    async def _release(self, device_id: int, ticket: int) -> None:
+        async with self._condition:
+            reservations = self._reservations[device_id]
+            reservation = reservations.pop(ticket)
+            if reservation["alone"]:
+                # Only a job that ran alone has a peak attributable to it
+                peak = torch.cuda.max_memory_allocated(device_id) - reservation["start_allocated"]
+                self._observe(reservation["kind"], reservation["feature"], peak)
+            if not reservations:
+                self._baseline[device_id] = self._allocated(device_id)
+            self._condition.notify_all()
+    
     @asynccontextmanager
-    async def gpu_context(self, device_id: Optional[int] = None):
-        """Context manager for GPU operations with memory management"""
+    async def gpu_context(
+        self,
+        kind: Optional[str] = None,
+        feature: float = 1.0,
+        device_id: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Run a job on a GPU, holding a reservation for its estimated memory
+        
+        ``kind`` and ``feature`` (e.g. "text-to-image" and the output pixel
+        count) select the estimate; without a kind nothing is reserved, as
+        for model loading. Jobs wait while the device's free memory, net of
+        other reservations, is less than their estimate. The allocator's
+        cache is left alone unless the device is actually short of memory.
+        """
         if not torch.cuda.is_available():
             yield "cpu"
             return
@@ -102,21 +300,35 @@ class GPUService:
         if device_id is None:
             device_id = 0
         
-        device = f"cuda:{device_id}"
+        if kind is None:
+            yield f"cuda:{device_id}"
+            return
         
+        ticket = await self._reserve(device_id, kind, feature)
         try:
-            # Set memory fraction
-            torch.cuda.set_per_process_memory_fraction(self.memory_fraction, device_id)
-            
-            # Clear cache before operation
-            torch.cuda.empty_cache()
-            
-            logger.info(f"Using GPU {device_id} with memory fraction {self.memory_fraction}")
-            yield device
-            
+            yield f"cuda:{device_id}"
         finally:
-            # Clean up after operation
-            torch.cuda.empty_cache()
+            await self._release(device_id, ticket)
+    
+    def get_reservation_status(self) -> Dict[str, Any]:
+        """Per-device reservations and learned per-kind estimates"""
+        return {
+            "devices": {
+                device_id: {
+                    "baseline": self._baseline.get(device_id),
+                    "reserved": sum(r["estimate"] for r in reservations.values()),
+                    "available": self.available(device_id),
+                    "jobs": len(reservations),
+                }
+                for device_id, reservations in self._reservations.items()
+            },
+            "bytes_per_unit": {
+                kind: self._ratios.get(kind, self._priors.get(kind, 0.0))
+                for kind in sorted(set(self._priors) | set(self._ratios))
+            },
+            "measured": sorted(self._ratios),
+            "timeout": settings.gpu_reservation_timeout,
+        }
     
     def clear_cache(self, device_id: Optional[int] = None):
         """Clear GPU memory cache"""
@@ -128,30 +340,35 @@ class GPUService:
     
     def get_system_info(self) -> Dict[str, Any]:
         """Get system information"""
+        memory = psutil.virtual_memory()
         return {
-            "cpu_count": psutil.cpu_count(),
-            "memory_total": psutil.virtual_memory().total,
-            "memory_available": psutil.virtual_memory().available,
-            "memory_used_percent": psutil.virtual_memory().percent,
-            "python_version": torch.__version__,
-            "cuda_version": torch.version.cuda if torch.cuda.is_available() else None,
-            "cudnn_version": torch.backends.cudnn.version() if torch.cuda.is_available() else None,
+            **self._static_system_info,
+            "memory_total": memory.total,
+            "memory_available": memory.available,
+            "memory_used_percent": memory.percent,
         }
     
+    @property
+    def _static_system_info(self) -> Dict[str, Any]:
+        """System information that does not change while the process runs"""
+        if self._system_info_cache is None:
+            self._system_info_cache = {
+                "cpu_count": psutil.cpu_count(),
+                "python_version": torch.__version__,
+                "cuda_version": torch.version.cuda if torch.cuda.is_available() else None,
+                "cudnn_version": torch.backends.cudnn.version() if torch.cuda.is_available() else None,
+            }
+        return self._system_info_cache
+    
     def is_memory_available(self, required_memory_mb: int, device_id: Optional[int] = None) -> bool:
-        """Check if sufficient GPU memory is available"""
+        """Check if sufficient GPU memory is free, net of running jobs' reservations"""
         if not torch.cuda.is_available():
             return False
         
         if device_id is None:
             device_id = 0
         
-        memory_info = self.get_memory_usage(device_id)
-        available_memory = memory_info["total"] - memory_info["reserved"]
-        required_bytes = required_memory_mb * 1024 * 1024
-        
-        return available_memory >= required_bytes
-
+        return self.available(device_id) >= required_memory_mb * MB
 
 # Global GPU service instance
 gpu_service = GPUService()
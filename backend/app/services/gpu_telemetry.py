@@ -0,0 +1,275 @@
+"""
+Background GPU telemetry sampling with pluggable backends
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+import torch
+
+try:
+    import pynvml
+except ImportError:  # pragma: no cover - optional dependency
+    pynvml = None
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryBackend:
+    """Source of per-device GPU readings"""
+
+    name = "none"
+
+    def device_count(self) -> int:
+        """Number of devices this backend reports on"""
+        return 0
+
+    def static_info(self, index: int) -> Dict[str, Any]:
+        """Readings that never change (name, total memory)"""
+        return {}
+
+    def sample(self, index: int) -> Dict[str, Any]:
+        """Current readings for one device"""
+        return {}
+
+    def shutdown(self) -> None:
+        """Release backend resources"""
+
+
+class NVMLBackend(TelemetryBackend):
+    """Readings from NVIDIA's management library (nvidia-ml-py)
+
+    NVML enumerates physical devices, so torch device ``i`` is mapped to the
+    ``i``-th entry of ``CUDA_VISIBLE_DEVICES``. Set ``CUDA_DEVICE_ORDER=PCI_BUS_ID``
+    so that CUDA and NVML agree on physical ordering.
+    """
+
+    name = "nvml"
+
+    def __init__(self):
+        if pynvml is None:
+            raise RuntimeError("nvidia-ml-py is not installed")
+
+        pynvml.nvmlInit()
+        physical_count = pynvml.nvmlDeviceGetCount()
+        visible = [i for i in settings.gpu_devices if i < physical_count] or list(range(physical_count))
+        if torch.cuda.is_available():
+            visible = visible[:torch.cuda.device_count()]
+        self._handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in visible]
+        self._physical = visible
+
+    def device_count(self) -> int:
+        return len(self._handles)
+
+    def static_info(self, index: int) -> Dict[str, Any]:
+        handle = self._handles[index]
+        name = pynvml.nvmlDeviceGetName(handle)
+        return {
+            "name": name.decode() if isinstance(name, bytes) else name,
+            "physical_index": self._physical[index],
+            "memory_total": pynvml.nvmlDeviceGetMemoryInfo(handle).total,
+        }
+
+    def sample(self, index: int) -> Dict[str, Any]:
+        handle = self._handles[index]
+        memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
+        reading = {
+            "utilization": float(pynvml.nvmlDeviceGetUtilizationRates(handle).gpu),
+            "memory_used": memory.used,
+            "memory_free": memory.free,
+            "temperature": None,
+            "power_watts": None,
+        }
+
+        # Not every board exposes sensors; missing readings stay None
+        try:
+            reading["temperature"] = float(
+                pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
+            )
+        except pynvml.NVMLError:
+            pass
+        try:
+            reading["power_watts"] = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
+        except pynvml.NVMLError:
+            pass
+
+        return reading
+
+    def shutdown(self) -> None:
+        try:
+            pynvml.nvmlShutdown()
+        except pynvml.NVMLError:
+            pass
+
+
+class TorchBackend(TelemetryBackend):
+    """Memory-only readings from the CUDA runtime when NVML is unavailable"""
+
+    name = "torch"
+
+    def device_count(self) -> int:
+        return torch.cuda.device_count() if torch.cuda.is_available() else 0
+
+    def static_info(self, index: int) -> Dict[str, Any]:
+        properties = torch.cuda.get_device_properties(index)
+        return {
+            "name": properties.name,
+            "memory_total": properties.total_memory,
+        }
+
+    def sample(self, index: int) -> Dict[str, Any]:
+        free, total = torch.cuda.mem_get_info(index)
+        return {
+            "utilization": None,
+            "memory_used": total - free,
+            "memory_free": free,
+            "temperature": None,
+            "power_watts": None,
+        }
+
+
+class FakeBackend(TelemetryBackend):
+    """Deterministic synthetic readings for tests and benchmarks"""
+
+    name = "fake"
+
+    def __init__(self, device_count: int = 1, memory_total: int = 48 * 1024 ** 3):
+        self._device_count = device_count
+        self._memory_total = memory_total
+        self._ticks = 0
+
+    def device_count(self) -> int:
+        return self._device_count
+
+    def static_info(self, index: int) -> Dict[str, Any]:
+        return {
+            "name": f"Fake GPU {index}",
+            "memory_total": self._memory_total,
+        }
+
+    def sample(self, index: int) -> Dict[str, Any]:
+        self._ticks += 1
+        load = 0.5 + 0.5 * math.sin(self._ticks / 10.0 + index)
+        used = int(self._memory_total * 0.25 * (1 + load))
+        return {
+            "utilization": round(100.0 * load, 1),
+            "memory_used": used,
+            "memory_free": self._memory_total - used,
+            "temperature": round(40.0 + 30.0 * load, 1),
+            "power_watts": round(80.0 + 220.0 * load, 1),
+        }
+
+
+def create_backend(name: str) -> TelemetryBackend:
+    """Create a telemetry backend by name ('auto', 'nvml', 'torch', 'fake' or 'none')"""
+    name = name.lower()
+
+    if name == "auto":
+        if pynvml is not None and torch.cuda.is_available():
+            try:
+                return NVMLBackend()
+            except Exception as e:
+                logger.warning(f"NVML unavailable, falling back to torch telemetry: {e}")
+        return TorchBackend() if torch.cuda.is_available() else TelemetryBackend()
+
+    if name == "nvml":
+        return NVMLBackend()
+    if name == "torch":
+        return TorchBackend()
+    if name == "fake":
+        return FakeBackend()
+    if name == "none":
+        return TelemetryBackend()
+
+    raise ValueError(f"Unknown GPU telemetry backend: {name}")
+
+
+class GPUTelemetrySampler:
+    """Polls a telemetry backend at a fixed interval into a ring buffer"""
+
+    def __init__(self, backend: TelemetryBackend, interval: float = 2.0, history_size: int = 300):
+        self.backend = backend
+        self.interval = interval
+        self.history: deque = deque(maxlen=history_size)
+        self._static: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent snapshot, if any"""
+        return self.history[-1] if self.history else None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def sample_now(self) -> Dict[str, Any]:
+        """Take a snapshot synchronously and append it to the history"""
+        if not self._static:
+            self._static = [self.backend.static_info(i) for i in range(self.backend.device_count())]
+
+        devices = []
+        for index, static in enumerate(self._static):
+            device = {"index": index, **static}
+            try:
+                device.update(self.backend.sample(index))
+            except Exception as e:
+                device["error"] = str(e)
+
+            if torch.cuda.is_available() and index < torch.cuda.device_count():
+                # Caching-allocator counters are host-side and do not synchronize
+                device["memory_allocated"] = torch.cuda.memory_allocated(index)
+                device["memory_reserved"] = torch.cuda.memory_reserved(index)
+
+            devices.append(device)
+
+        snapshot = {
+            "timestamp": time.time(),
+            "backend": self.backend.name,
+            "devices": devices,
+        }
+        self.history.append(snapshot)
+        return snapshot
+
+    def get_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the most recent snapshots, oldest first"""
+        snapshots = list(self.history)
+        if limit is not None:
+            snapshots = snapshots[-limit:] if limit > 0 else []
+        return snapshots
+
+    async def start(self) -> None:
+        """Start background sampling"""
+        if self.running or self.backend.device_count() == 0:
+            return
+
+        await asyncio.to_thread(self.sample_now)
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"GPU telemetry sampling every {self.interval}s via {self.backend.name}")
+
+    async def stop(self) -> None:
+        """Stop background sampling and release the backend"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self.backend.shutdown()
+
+    async def _run_loop(self) -> None:
+        """Sample until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.sample_now)
+            except Exception as e:
+                logger.warning(f"GPU telemetry sample failed: {e}")
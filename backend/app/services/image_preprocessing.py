@@ -0,0 +1,70 @@
+"""
+Decoding uploaded images straight to model input at reduced scale
+"""
+
+import io
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# Largest side of the image handed to image-to-3D models
+MAX_INPUT_SIZE = 1024
+
+
+def _target_size(size: Tuple[int, int], max_size: int) -> Tuple[int, int]:
+    width, height = size
+    if max(width, height) <= max_size:
+        return width, height
+    ratio = max_size / max(width, height)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def prepare_image(data: bytes, max_size: int = MAX_INPUT_SIZE) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Decode an upload into an HxWxC uint8 array no larger than max_size on its longest side
+
+    JPEGs are decoded in draft mode, letting libjpeg scale by 1/2, 1/4 or
+    1/8 during decoding, so a 24 MP photo is never materialized at full
+    size. Any remaining reduction is done with ``Image.reduce`` (a fast box
+    filter, via ``reducing_gap``) down to twice the target before the final
+    LANCZOS pass. EXIF orientation is applied. Alpha is kept; everything
+    else becomes RGB. Blocking; run it in a worker thread.
+    """
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    original_format = image.format
+
+    # Orientation swaps width and height, but the longest side (all the target depends on) is the same
+    target = _target_size(image.size, max_size)
+    if image.format == "JPEG" and target != image.size:
+        image.draft("RGB", target)
+    decoded_size = image.size
+
+    pixels, info = prepare_pil_image(ImageOps.exif_transpose(image), max_size)
+    return pixels, {**info, "format": original_format, "original_size": original_size, "decoded_size": decoded_size}
+
+
+def prepare_pil_image(image: Image.Image, max_size: int = MAX_INPUT_SIZE) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Convert an in-memory image (e.g. a generated one) into an HxWxC uint8 model input array
+
+    Downscales to max_size on the longest side and normalizes the mode the
+    same way as uploads, without any encode/decode round trip.
+    """
+    original_size = image.size
+    target = _target_size(image.size, max_size)
+    if image.size != target:
+        image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    mode = "RGBA" if has_alpha else "RGB"
+    if image.mode != mode:
+        image = image.convert(mode)
+
+    pixels = np.asarray(image)
+    return pixels, {
+        "format": None,
+        "original_size": original_size,
+        "decoded_size": original_size,
+        "image_size": (pixels.shape[1], pixels.shape[0]),
+        "channels": pixels.shape[2],
+    }
@@ -0,0 +1,445 @@
+"""
+Pluggable inference backends behind the model service
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import torch
+import trimesh
+from PIL import Image
+
+from ..config import settings
+from .gpu_service import gpu_service
+from .weight_loader import create_weight_loader
+
+logger = logging.getLogger(__name__)
+
+# Called from the inference thread with (completed steps, total steps)
+StepCallback = Callable[[int, int], None]
+
+# torch.compile cache artifacts saved after warm-up, relative to COMPILE_CACHE_DIR
+COMPILE_ARTIFACTS = "artifacts.bin"
+
+
+def configure_compile_cache(cache_dir: str) -> Dict[str, Any]:
+    """Point inductor's on-disk caches at cache_dir and load previously saved artifacts
+
+    Must run before the first compilation. The FX graph and autograd caches
+    skip recompiling graphs seen before; the saved artifacts also carry
+    autotuning results, so warm-ups after a restart mostly hit the cache.
+    """
+    path = Path(cache_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(path / "inductor"))
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    os.environ.setdefault("TORCHINDUCTOR_AUTOGRAD_CACHE", "1")
+
+    report: Dict[str, Any] = {"dir": str(path), "artifacts_loaded": False}
+    artifacts = path / COMPILE_ARTIFACTS
+    if artifacts.exists() and hasattr(torch.compiler, "load_cache_artifacts"):
+        try:
+            torch.compiler.load_cache_artifacts(artifacts.read_bytes())
+            report["artifacts_loaded"] = True
+        except Exception as e:
+            # Stale artifacts (other torch version or GPU) only cost a recompile
+            logger.warning(f"Ignoring compile cache artifacts in {artifacts}: {e}")
+    return report
+
+
+def save_compile_cache(cache_dir: str) -> Dict[str, Any]:
+    """Persist the compile cache artifacts gathered so far"""
+    if not hasattr(torch.compiler, "save_cache_artifacts"):
+        return {"artifacts_saved": False}
+
+    artifacts = torch.compiler.save_cache_artifacts()
+    if artifacts is None:
+        return {"artifacts_saved": False}
+
+    data, _ = artifacts
+    path = Path(cache_dir) / COMPILE_ARTIFACTS
+    tmp_path = path.with_suffix(".partial")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return {"artifacts_saved": True, "artifacts_bytes": len(data)}
+
+
+class InferenceBackend:
+    """Loads models and runs text-to-image and image-to-3D inference
+
+    Model names are ``"sdxl"`` and ``"step1x3d"``. Inference methods are
+    synchronous and may block; the model service decides where they run.
+    Loaded pipelines are not thread-safe (scheduler state, callbacks and
+    offload hooks are shared), so callers hold ``model_locks[name]`` around
+    each call; concurrency within a model comes from batching instead.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.models: Dict[str, Any] = {}
+        # Model name -> how it was loaded (source, verification, per-component times)
+        self.load_reports: Dict[str, Dict[str, Any]] = {}
+        # One call at a time per model
+        self.model_locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in ("sdxl", "step1x3d")}
+
+    @property
+    def model_ids(self) -> Dict[str, str]:
+        """Model name -> model repository id"""
+        return {
+            "sdxl": settings.sdxl_model_id,
+            "step1x3d": settings.step1x3d_model_id,
+        }
+
+    @property
+    def device(self) -> str:
+        return gpu_service.device
+
+    def is_loaded(self, name: str) -> bool:
+        return self.models.get(name) is not None
+
+    def load_model(self, name: str) -> None:
+        """Load a model into memory"""
+        raise NotImplementedError
+
+    def unload_model(self, name: str) -> None:
+        """Drop a model"""
+        self.models.pop(name, None)
+        self.load_reports.pop(name, None)
+
+    def offload_model(self, name: str) -> None:
+        """Move a loaded model to CPU memory, freeing the device"""
+
+    def restore_model(self, name: str) -> None:
+        """Move an offloaded model back onto the device"""
+
+    def footprint(self, name: str) -> int:
+        """Device memory held by a loaded model, in bytes"""
+        return 0
+
+    def finish_warmup(self) -> Dict[str, Any]:
+        """Called once warm-up inferences have run; persists what later restarts can reuse"""
+        return {}
+
+    def text_to_image(
+        self,
+        prompt: str,
+        width: int,
+        height: int,
+        num_inference_steps: int,
+        guidance_scale: float,
+        seed: Optional[int],
+        progress: Optional[StepCallback] = None,
+    ) -> Image.Image:
+        """Generate an image from a text prompt, reporting each denoising step to ``progress``"""
+        raise NotImplementedError
+
+    def image_to_3d(
+        self,
+        image: np.ndarray,
+        mode: str,
+        guidance_scale: float,
+        num_steps: int,
+        seed: int,
+        progress: Optional[StepCallback] = None,
+    ) -> Union[bytes, trimesh.Trimesh, trimesh.Scene]:
+        """Generate a 3D model from an HxWxC uint8 RGB or RGBA pixel array, reporting steps to ``progress``
+
+        Returns GLB bytes, or a trimesh mesh or scene that the caller exports
+        to GLB on the postprocess stage, off the inference workers.
+        """
+        raise NotImplementedError
+
+    def text_to_image_variants(
+        self,
+        prompt: str,
+        width: int,
+        height: int,
+        num_inference_steps: int,
+        guidance_scale: float,
+        seeds: List[int],
+        progress: Optional[StepCallback] = None,
+    ) -> List[Image.Image]:
+        """Generate one image per seed; backends that can batch do it in a single call"""
+        return [
+            self.text_to_image(prompt, width, height, num_inference_steps, guidance_scale, seed, progress)
+            for seed in seeds
+        ]
+
+    def image_to_3d_variants(
+        self,
+        image: np.ndarray,
+        mode: str,
+        guidance_scale: float,
+        num_steps: int,
+        seeds: List[int],
+        progress: Optional[StepCallback] = None,
+    ) -> List[Union[bytes, trimesh.Trimesh, trimesh.Scene]]:
+        """Generate one 3D model per seed from the same image; backends that can batch do it in a single call"""
+        return [self.image_to_3d(image, mode, guidance_scale, num_steps, seed, progress) for seed in seeds]
+
+
+def _step_end_callback(progress: StepCallback, total: int) -> Callable:
+    """Adapt a step callback to diffusers' ``callback_on_step_end`` hook"""
+
+    def callback(pipeline, step, timestep, callback_kwargs):
+        progress(step + 1, total)
+        return callback_kwargs
+
+    return callback
+
+
+class DiffusersBackend(InferenceBackend):
+    """SDXL through diffusers and the Step1X-3D pipeline on the GPU"""
+
+    name = "diffusers"
+
+    def __init__(self):
+        super().__init__()
+        self.weight_loader = create_weight_loader()
+        if settings.warmup_enabled:
+            # cuDNN autotunes per input shape on first use; warm-up covers the configured resolutions
+            torch.backends.cudnn.benchmark = True
+
+    def load_model(self, name: str) -> None:
+        if name == "sdxl":
+            # Imported on first load: diffusers pulls in transformers and takes seconds to import
+            from diffusers import StableDiffusionXLPipeline
+
+            # Local snapshot first, verified against its manifest; components load concurrently
+            report = self.weight_loader.resolve(settings.sdxl_model_id)
+            pipeline, report["components"] = self.weight_loader.load_pipeline(
+                StableDiffusionXLPipeline, report["path"], torch.float16
+            )
+
+            # Enable memory efficient attention
+            pipeline.vae.enable_slicing()
+
+            if settings.model_memory_budget_mb > 0:
+                # The residency manager moves whole pipelines between the device and CPU
+                pipeline.to(self.device)
+            else:
+                pipeline.enable_model_cpu_offload()
+
+            if settings.torch_compile:
+                report["compile"] = configure_compile_cache(settings.compile_cache_dir)
+                # In place, so the offload hooks on the module keep working
+                pipeline.unet.compile()
+            self.models["sdxl"] = pipeline
+            self.load_reports["sdxl"] = report
+
+        elif name == "step1x3d":
+            # Note: This is a placeholder - actual Step1X-3D loading will depend on the model format
+            # The actual implementation will depend on how the model is provided
+
+            # For now, we'll use a placeholder that matches the expected interface
+            self.models["step1x3d"] = {
+                "model_id": settings.step1x3d_model_id,
+                "loaded": True,
+                "device": self.device
+            }
+            self.load_reports["step1x3d"] = {"repo_id": settings.step1x3d_model_id, "source": "placeholder"}
+
+        else:
+            raise ValueError(f"Unknown model: {name}")
+
+    def offload_model(self, name: str) -> None:
+        model = self.models.get(name)
+        if hasattr(model, "to"):
+            model.to("cpu")
+
+    def restore_model(self, name: str) -> None:
+        model = self.models.get(name)
+        if hasattr(model, "to"):
+            model.to(self.device)
+
+    def footprint(self, name: str) -> int:
+        components = getattr(self.models.get(name), "components", None) or {}
+        return sum(
+            tensor.numel() * tensor.element_size()
+            for module in components.values() if isinstance(module, torch.nn.Module)
+            for tensor in itertools.chain(module.parameters(), module.buffers())
+        )
+
+    def finish_warmup(self) -> Dict[str, Any]:
+        if not settings.torch_compile or not self.is_loaded("sdxl"):
+            return {}
+        return {"compile": save_compile_cache(settings.compile_cache_dir)}
+
+    def _generator(self, seed: Optional[int]) -> torch.Generator:
+        """A per-call generator, so concurrent jobs never share the global RNG"""
+        generator = torch.Generator(device=self.device)
+        if seed is None:
+            generator.seed()
+        else:
+            generator.manual_seed(seed)
+        return generator
+
+    def text_to_image(self, prompt, width, height, num_inference_steps, guidance_scale, seed, progress=None):
+        result = self.models["sdxl"](
+            prompt=prompt,
+            width=width,
+            height=height,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            generator=self._generator(seed),
+            callback_on_step_end=_step_end_callback(progress, num_inference_steps) if progress else None,
+        )
+        return result.images[0]
+
+    def text_to_image_variants(self, prompt, width, height, num_inference_steps, guidance_scale, seeds, progress=None):
+        # One batched denoising pass; a generator per image makes each variant
+        # the same image a single call with its seed would produce
+        result = self.models["sdxl"](
+            prompt=prompt,
+            width=width,
+            height=height,
+            num_inference_steps=num_inference_steps,
+            guidance_scale=guidance_scale,
+            num_images_per_prompt=len(seeds),
+            generator=[self._generator(seed) for seed in seeds],
+            callback_on_step_end=_step_end_callback(progress, num_inference_steps) if progress else None,
+        )
+        return list(result.images)
+
+    def image_to_3d(self, image, mode, guidance_scale, num_steps, seed, progress=None):
+        # Placeholder for actual Step1X-3D inference
+        # This will be replaced with actual model inference
+        # For now, we'll create a dummy GLB file
+        dummy_content = b'\x67\x6C\x54\x46\x02\x00\x00\x00'  # GLB header
+        dummy_content += b'\x00' * 100  # Add some dummy data
+        if progress is not None:
+            progress(num_steps, num_steps)
+        return dummy_content
+
+
+class StubBackend(InferenceBackend):
+    """CPU stand-in that takes a parameter-dependent time and returns valid outputs
+
+    Latency is ``base + per_step * steps * scale``, where scale is the output
+    megapixels relative to 1024x1024 for images and 1 (geometry) or 2 (textured)
+    for 3D; a batch of image variants adds ``batch_marginal`` of that per extra
+    image. With ``work="compute"`` the time is spent busy on the CPU instead
+    of sleeping, which exercises GIL and thread-pool contention. ``load_time``
+    simulates slow model loading per model; restoring an offloaded model takes
+    a quarter of that. Each model reports a footprint of ``model_size_mb``.
+    """
+
+    name = "stub"
+
+    # Cost of each extra image in a batched text-to-image call, relative to the first
+    batch_marginal = 0.25
+
+    def __init__(
+        self,
+        base: float = 0.05,
+        per_step: float = 0.01,
+        work: str = "sleep",
+        load_time: float = 0.0,
+        model_size_mb: float = 0.0,
+    ):
+        super().__init__()
+        if work not in ("sleep", "compute"):
+            raise ValueError(f"Unknown stub work mode: {work}")
+        self.base = base
+        self.per_step = per_step
+        self.work = work
+        self.load_time = load_time
+        self.model_size_mb = model_size_mb
+        self._meshes: Dict[str, trimesh.Trimesh] = {}
+
+    @property
+    def device(self) -> str:
+        return "cpu"
+
+    def load_model(self, name: str) -> None:
+        if name not in self.model_ids:
+            raise ValueError(f"Unknown model: {name}")
+        time.sleep(self.load_time)
+        self.models[name] = {"model_id": f"stub/{name}", "loaded": True, "device": "cpu"}
+        self.load_reports[name] = {"repo_id": f"stub/{name}", "source": "stub"}
+
+    def offload_model(self, name: str) -> None:
+        self.models[name]["device"] = "offloaded"
+
+    def restore_model(self, name: str) -> None:
+        time.sleep(self.load_time / 4)
+        self.models[name]["device"] = "cpu"
+
+    def footprint(self, name: str) -> int:
+        return int(self.model_size_mb * 1024 * 1024) if self.is_loaded(name) else 0
+
+    def _spend_steps(self, seconds: float, steps: int, progress: Optional[StepCallback]) -> None:
+        """Take the given time spread over ``steps`` steps, reporting each one"""
+        if progress is None:
+            self._spend(seconds)
+            return
+
+        steps = max(1, steps)
+        for step in range(1, steps + 1):
+            self._spend(seconds / steps)
+            progress(step, steps)
+
+    def _spend(self, seconds: float) -> None:
+        """Take the given time, sleeping or computing"""
+        if self.work == "sleep":
+            time.sleep(seconds)
+            return
+
+        deadline = time.perf_counter() + seconds
+        matrix = np.random.default_rng(0).random((64, 64))
+        while time.perf_counter() < deadline:
+            matrix = np.tanh(matrix @ matrix)
+
+    @staticmethod
+    def _image(width: int, height: int, seed: Optional[int]) -> Image.Image:
+        """Seeded horizontal gradient so outputs differ per seed but stay cheap to encode"""
+        color = np.random.default_rng(seed).integers(0, 256, size=3)
+        ramp = np.linspace(0.25, 1.0, width, dtype=np.float32)[None, :, None]
+        pixels = np.broadcast_to(ramp * color, (height, width, 3)).astype(np.uint8)
+        return Image.fromarray(pixels, "RGB")
+
+    def text_to_image(self, prompt, width, height, num_inference_steps, guidance_scale, seed, progress=None):
+        seconds = self.base + self.per_step * num_inference_steps * (width * height) / (1024 * 1024)
+        self._spend_steps(seconds, num_inference_steps, progress)
+        return self._image(width, height, seed)
+
+    def text_to_image_variants(self, prompt, width, height, num_inference_steps, guidance_scale, seeds, progress=None):
+        # A batched pass: each extra image costs a fraction of the first
+        seconds = self.base + self.per_step * num_inference_steps * (width * height) / (1024 * 1024)
+        seconds *= 1 + self.batch_marginal * (len(seeds) - 1)
+        self._spend_steps(seconds, num_inference_steps, progress)
+        return [self._image(width, height, seed) for seed in seeds]
+
+    def image_to_3d(self, image, mode, guidance_scale, num_steps, seed, progress=None):
+        scale = 2.0 if mode == "textured" else 1.0
+        self._spend_steps(self.base + self.per_step * num_steps * scale, num_steps, progress)
+
+        if mode not in self._meshes:
+            self._meshes[mode] = trimesh.creation.icosphere(subdivisions=4 if mode == "textured" else 3)
+        # A fresh mesh per job, left for the caller to export like a real model's output
+        return self._meshes[mode].copy()
+
+
+def create_inference_backend(name: str) -> InferenceBackend:
+    """Create an inference backend by name ('diffusers' or 'stub')"""
+    name = name.lower()
+
+    if name == "diffusers":
+        return DiffusersBackend()
+    if name == "stub":
+        return StubBackend(
+            settings.stub_latency_base,
+            settings.stub_latency_per_step,
+            settings.stub_work,
+            settings.stub_load_time,
+            settings.stub_model_size_mb,
+        )
+
+    raise ValueError(f"Unknown inference backend: {name}")
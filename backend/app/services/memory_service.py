@@ -0,0 +1,302 @@
+"""
+Per-job peak memory accounting and memory-budget admission control
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import psutil
+import torch
+
+from ..config import settings
+from .metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Peak memory is far from normally distributed; buckets span 1 MB to 64 GB
+MEMORY_BUCKETS = tuple(float(MB * 4 ** i) for i in range(9))
+
+
+class MemoryBudgetExceeded(Exception):
+    """A job is predicted to need more memory than the budget can ever provide"""
+
+    def __init__(self, route: str, estimate: int, available: int):
+        self.route = route
+        self.estimate = estimate
+        self.available = available
+        super().__init__(
+            f"{route} job needs an estimated {estimate / MB:.0f} MB, "
+            f"more than the {available / MB:.0f} MB of the memory budget available to jobs"
+        )
+
+
+class MemoryAdmissionTimeout(Exception):
+    """A job waited too long for memory to become available"""
+
+    def __init__(self, route: str, waited: float):
+        self.route = route
+        self.waited = waited
+        super().__init__(f"Timed out after {waited:.0f}s waiting for memory to admit a {route} job")
+
+
+class MemoryTracker:
+    """Peak host memory (RSS and Python heap) and CUDA memory of one job
+
+    RSS is polled from a background thread because the kernel only keeps a
+    lifetime high-water mark. tracemalloc and CUDA peaks are process-wide, so
+    they are reset only when no other tracked job is running; with overlapping
+    jobs they are upper bounds.
+    """
+
+    def __init__(self, route: str, reset_peaks: bool, interval: float = 0.01):
+        self.route = route
+        self.interval = interval
+        self._reset_peaks = reset_peaks
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.rss_start = 0
+        self.rss_peak = 0
+        self.tracemalloc_start = 0
+        self.cuda_start: Dict[int, int] = {}
+        self.result: Dict[str, Any] = {}
+
+    def start(self) -> None:
+        self.rss_start = self.rss_peak = self._process.memory_info().rss
+
+        if tracemalloc.is_tracing():
+            if self._reset_peaks:
+                tracemalloc.reset_peak()
+            self.tracemalloc_start = tracemalloc.get_traced_memory()[0]
+
+        if torch.cuda.is_available():
+            for index in range(torch.cuda.device_count()):
+                if self._reset_peaks:
+                    torch.cuda.reset_peak_memory_stats(index)
+                self.cuda_start[index] = torch.cuda.memory_allocated(index)
+
+        self._thread = threading.Thread(target=self._poll, name=f"memory-{self.route}", daemon=True)
+        self._thread.start()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.rss_peak = max(self.rss_peak, self._process.memory_info().rss)
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop polling and return the job's memory report"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        rss_end = self._process.memory_info().rss
+        self.rss_peak = max(self.rss_peak, rss_end)
+
+        result: Dict[str, Any] = {
+            "rss_start": self.rss_start,
+            "rss_peak": self.rss_peak,
+            "rss_peak_delta": self.rss_peak - self.rss_start,
+            "rss_end_delta": rss_end - self.rss_start,
+            "tracemalloc_peak": None,
+            "cuda_peak_allocated": None,
+        }
+
+        if tracemalloc.is_tracing():
+            result["tracemalloc_peak"] = max(0, tracemalloc.get_traced_memory()[1] - self.tracemalloc_start)
+
+        if self.cuda_start:
+            result["cuda_peak_allocated"] = max(
+                torch.cuda.max_memory_allocated(index) - start for index, start in self.cuda_start.items()
+            )
+
+        self.result = result
+        return result
+
+
+class MemoryService:
+    """Learns per-route peak memory and admits jobs against a memory budget
+
+    Each route's peak RSS delta is modelled as proportional to a size feature
+    of the request (pixels for text-to-image, upload bytes for mesh
+    conversion, 1 for fixed-cost jobs). A job is admitted when the baseline
+    RSS plus the estimates of running jobs plus its own estimate fits the
+    budget; otherwise it waits, or is rejected outright if it could never fit.
+    """
+
+    def __init__(self):
+        self._ratios: Dict[str, float] = {}
+        self._observations: Dict[str, int] = {}
+        self._reserved: Dict[int, int] = {}
+        self._next_ticket = 0
+        self._baseline_rss: Optional[int] = None
+        self._condition: Optional[asyncio.Condition] = None
+        self._process = psutil.Process(os.getpid())
+
+        if settings.memory_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.peak_rss_delta = metrics_service.histogram(
+            "job_peak_rss_delta_bytes", "Peak resident memory growth during a job", ["route"], MEMORY_BUCKETS
+        )
+        self.tracemalloc_peak = metrics_service.histogram(
+            "job_tracemalloc_peak_bytes", "Peak Python heap growth during a job", ["route"], MEMORY_BUCKETS
+        )
+        self.cuda_peak = metrics_service.histogram(
+            "job_cuda_peak_allocated_bytes", "Peak CUDA memory allocated during a job", ["route"], MEMORY_BUCKETS
+        )
+        self.admission_waits = metrics_service.counter(
+            "memory_admission_waits_total", "Jobs queued until memory became available", ["route"]
+        )
+        self.admission_rejections = metrics_service.counter(
+            "memory_admission_rejections_total", "Jobs rejected by memory admission", ["route", "reason"]
+        )
+        metrics_service.gauge(
+            "memory_reserved_bytes", "Estimated memory reserved by admitted jobs",
+            collect=lambda: {(): sum(self._reserved.values())},
+        )
+
+    @property
+    def budget(self) -> int:
+        """Memory budget in bytes (0 disables admission control)"""
+        return int(settings.memory_budget_mb * MB)
+
+    def estimate(self, route: str, feature: float = 1.0) -> int:
+        """Predicted peak RSS growth of a job, 0 until the route has been observed"""
+        ratio = self._ratios.get(route)
+        if ratio is None:
+            return 0
+        return int(ratio * max(feature, 1.0) * settings.memory_estimate_margin)
+
+    def _observe(self, route: str, feature: float, peak_delta: int) -> None:
+        """Fold a job's measured peak into the route's ratio (EWMA, biased towards growth)"""
+        ratio = max(peak_delta, 0) / max(feature, 1.0)
+        previous = self._ratios.get(route)
+        if previous is None or ratio > previous:
+            # Underestimates cause OOMs, so increases are taken immediately
+            self._ratios[route] = ratio
+        else:
+            self._ratios[route] = 0.8 * previous + 0.2 * ratio
+        self._observations[route] = self._observations.get(route, 0) + 1
+
+    def _fits(self, estimate: int) -> bool:
+        return self._baseline_rss + sum(self._reserved.values()) + estimate <= self.budget
+
+    def _prepare(self) -> None:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        if self._baseline_rss is None:
+            self._baseline_rss = self._process.memory_info().rss
+
+    def check(self, route: str, feature: float = 1.0) -> int:
+        """Estimate a job's memory, rejecting it up front if it could never fit the budget"""
+        estimate = self.estimate(route, feature)
+        self._check_budget(route, estimate)
+        return estimate
+
+    def _check_budget(self, route: str, estimate: int) -> None:
+        self._prepare()
+        budget = self.budget
+        if budget and self._baseline_rss + estimate > budget:
+            self.admission_rejections.inc(route=route, reason="exceeds_budget")
+            raise MemoryBudgetExceeded(route, estimate, max(0, budget - self._baseline_rss))
+
+    def fits(self, estimate: int) -> bool:
+        """Whether an estimate fits beside the jobs admitted so far"""
+        self._prepare()
+        return not self.budget or self._fits(estimate)
+
+    async def wait_for_room(self, route: str, estimate: int, timeout: Optional[float] = None) -> None:
+        """Wait, without reserving anything, until an estimate fits beside the admitted jobs"""
+        self._prepare()
+        async with self._condition:
+            await self._wait_until_fits(route, estimate, timeout)
+
+    async def _wait_until_fits(self, route: str, estimate: int, timeout: Optional[float]) -> None:
+        """Wait on the held condition until an estimate fits"""
+        if not self.budget or self._fits(estimate):
+            return
+
+        self.admission_waits.inc(route=route)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                self._condition.wait_for(lambda: self._fits(estimate)),
+                timeout=settings.memory_admission_timeout if timeout is None else max(timeout, 0.0),
+            )
+        except asyncio.TimeoutError:
+            self.admission_rejections.inc(route=route, reason="timeout")
+            raise MemoryAdmissionTimeout(route, time.monotonic() - started)
+
+    async def _acquire(self, route: str, estimate: int) -> int:
+        """Reserve an estimate against the budget, waiting until it fits"""
+        self._check_budget(route, estimate)
+
+        async with self._condition:
+            await self._wait_until_fits(route, estimate, None)
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._reserved[ticket] = estimate
+            return ticket
+
+    async def _release(self, ticket: int) -> None:
+        async with self._condition:
+            self._reserved.pop(ticket, None)
+            if not self._reserved:
+                # Re-measure the idle footprint so cached allocations are accounted for
+                self._baseline_rss = self._process.memory_info().rss
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def track(self, route: str, feature: float = 1.0) -> AsyncIterator[MemoryTracker]:
+        """Admit a job against the memory budget and measure its peak memory
+
+        The tracker's ``result`` holds the memory report once the block exits.
+        """
+        estimate = self.estimate(route, feature)
+        ticket = await self._acquire(route, estimate)
+
+        tracker = MemoryTracker(route, reset_peaks=len(self._reserved) == 1, interval=settings.memory_sample_interval)
+        tracker.start()
+        try:
+            yield tracker
+        finally:
+            result = tracker.stop()
+            await self._release(ticket)
+
+            result["estimate"] = estimate
+            self._observe(route, feature, result["rss_peak_delta"])
+            self.peak_rss_delta.observe(result["rss_peak_delta"], route=route)
+            if result["tracemalloc_peak"] is not None:
+                self.tracemalloc_peak.observe(result["tracemalloc_peak"], route=route)
+            if result["cuda_peak_allocated"] is not None:
+                self.cuda_peak.observe(result["cuda_peak_allocated"], route=route)
+
+            logger.debug(f"{route} job peak RSS delta {result['rss_peak_delta'] / MB:.1f} MB")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Budget, reservations and learned per-route estimates"""
+        return {
+            "budget": self.budget,
+            "baseline_rss": self._baseline_rss,
+            "reserved": sum(self._reserved.values()),
+            "jobs": len(self._reserved),
+            "tracemalloc": tracemalloc.is_tracing(),
+            "routes": {
+                route: {
+                    "bytes_per_unit": ratio,
+                    "observations": self._observations.get(route, 0),
+                }
+                for route, ratio in self._ratios.items()
+            },
+        }
+
+
+# Global memory service instance
+memory_service = MemoryService()
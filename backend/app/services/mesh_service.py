@@ -2,11 +2,12 @@
 Mesh processing service for 3D model conversion and manipulation
 """
 
+import asyncio
 import tempfile
 import os
 import time
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
 import trimesh
@@ -15,6 +16,8 @@ import numpy as np
 from skimage import measure
 
 from ..config import settings
+from .pipeline import generation_pipeline
+from .tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -38,65 +41,101 @@ class MeshService:
     ) -> Tuple[bytes, Dict[str, Any]]:
         """Convert uploaded file to mesh format"""
         
+        outputs, metadata = await self.convert_to_formats(file_bytes, filename, [target_format], prompt, quality)
+        metadata["target_format"] = target_format
+        return outputs[target_format], metadata
+    
+    async def convert_to_formats(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        target_formats: List[str],
+        prompt: Optional[str] = None,
+        quality: str = "high"
+    ) -> Tuple[Dict[str, bytes], Dict[str, Any]]:
+        """Convert an uploaded file to several formats, loading it only once
+        
+        The input is parsed (or meshed) on the preprocess stage; each format
+        is then exported on the postprocess stage in parallel, alongside the
+        mesh statistics. trimesh fills caches and visuals lazily while it
+        exports, so every parallel task works on its own copy of the mesh.
+        """
+        
         start_time = time.time()
         file_ext = Path(filename).suffix.lower()
         
         try:
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
-                tmp.write(file_bytes)
-                tmp_path = tmp.name
-            
-            # Load based on file type
-            mesh = await self._load_mesh(tmp_path, file_ext)
+            with span("mesh_load"):
+                mesh = await generation_pipeline.run("preprocess", self.load_mesh, file_bytes, filename)
             
             # Apply modifications if prompt provided
             if prompt:
                 mesh = await self._apply_modifications(mesh, prompt)
             
-            # Convert to target format
-            output_bytes = await self._export_mesh(mesh, target_format, quality)
-            
-            # Get mesh information
-            mesh_info = self._get_mesh_info(mesh)
+            # Export every format and gather mesh information concurrently, each from a private copy
+            with span("mesh_export"):
+                copies = await generation_pipeline.run("postprocess", self._copy_mesh, mesh, len(target_formats))
+                *exported, mesh_info = await asyncio.gather(
+                    *(
+                        generation_pipeline.run("postprocess", self.export_mesh, copy, fmt, quality)
+                        for copy, fmt in zip(copies, target_formats)
+                    ),
+                    generation_pipeline.run("postprocess", self._get_mesh_info, mesh),
+                )
+            outputs = dict(zip(target_formats, exported))
             
             conversion_time = time.time() - start_time
             
-            # Clean up temp file
-            os.unlink(tmp_path)
-            
             metadata = {
                 "original_format": file_ext[1:],  # Remove the dot
-                "target_format": target_format,
+                "target_formats": target_formats,
                 "conversion_time": conversion_time,
                 "mesh_info": mesh_info,
                 "modification_prompt": prompt,
                 "quality": quality,
             }
             
-            return output_bytes, metadata
+            return outputs, metadata
             
         except Exception as e:
             logger.error(f"Mesh conversion failed: {e}")
-            # Clean up temp file in case of error
-            if 'tmp_path' in locals() and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
             raise
     
-    async def _load_mesh(self, file_path: str, file_ext: str) -> trimesh.Trimesh:
+    @staticmethod
+    def _copy_mesh(mesh: trimesh.Trimesh, count: int) -> List[trimesh.Trimesh]:
+        """Independent copies of a mesh, made before any of them is shared between threads"""
+        return [mesh.copy() for _ in range(count)]
+    
+    def load_mesh(self, file_bytes: bytes, filename: str) -> trimesh.Trimesh:
+        """Parse an uploaded file into a mesh (blocking; run it on a worker thread)"""
+        
+        file_ext = Path(filename).suffix.lower()
+        
+        # Save uploaded file temporarily
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp:
+            tmp.write(file_bytes)
+            tmp_path = tmp.name
+        
+        try:
+            return self._load_mesh(tmp_path, file_ext)
+        finally:
+            os.unlink(tmp_path)
+    
+    def _load_mesh(self, file_path: str, file_ext: str) -> trimesh.Trimesh:
         """Load mesh from file based on extension"""
         
         if file_ext in ['.glb', '.obj']:
-            return trimesh.load(file_path)
+            # GLB files load as scenes; flatten them into a single mesh
+            return trimesh.load(file_path, force='mesh')
         
         elif file_ext == '.gz' and file_path.endswith('.nii.gz'):
             # Load NIfTI medical imaging file
-            return await self._load_nifti_as_mesh(file_path)
+            return self._load_nifti_as_mesh(file_path)
         
         else:
             raise ValueError(f"Unsupported file format: {file_ext}")
     
-    async def _load_nifti_as_mesh(self, file_path: str) -> trimesh.Trimesh:
+    def _load_nifti_as_mesh(self, file_path: str) -> trimesh.Trimesh:
         """Load NIfTI file and convert to mesh using marching cubes"""
         
         nii_img = nib.load(file_path)
@@ -107,11 +146,12 @@ class MeshService:
         
         # Use marching cubes to create mesh
         threshold = data.mean() + data.std()
-        verts, faces, normals, values = measure.marching_cubes(
-            data, 
-            threshold,
-            spacing=nii_img.header.get_zooms()[:3]  # Use actual voxel spacing
-        )
+        with span("marching_cubes"):
+            verts, faces, normals, values = measure.marching_cubes(
+                data, 
+                threshold,
+                spacing=nii_img.header.get_zooms()[:3]  # Use actual voxel spacing
+            )
         
         # Create trimesh object
         mesh = trimesh.Trimesh(
@@ -137,35 +177,34 @@ class MeshService:
         # In production, this would apply actual modifications
         return mesh
     
-    async def _export_mesh(
+    def export_mesh(
         self, 
         mesh: trimesh.Trimesh, 
         target_format: str, 
         quality: str = "high"
     ) -> bytes:
-        """Export mesh to target format"""
+        """Export mesh to target format (blocking; run it on a worker thread)"""
         
         # Configure export settings based on quality
         export_kwargs = {}
         
         if target_format == 'glb':
             export_kwargs = {
-                'file_type': 'glb',
-                'binary': True
+                'file_type': 'glb'
             }
         elif target_format == 'obj':
             export_kwargs = {
                 'file_type': 'obj'
             }
         elif target_format == 'stl':
+            # trimesh writes binary STL by default
             export_kwargs = {
-                'file_type': 'stl',
-                'binary': True
+                'file_type': 'stl'
             }
         elif target_format == 'ply':
             export_kwargs = {
                 'file_type': 'ply',
-                'binary': True
+                'encoding': 'binary'
             }
         else:
             raise ValueError(f"Unsupported target format: {target_format}")
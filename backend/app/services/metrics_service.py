@@ -0,0 +1,359 @@
+"""
+Metrics service exporting counters, gauges and latency histograms in Prometheus format
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import psutil
+
+# Latency buckets (seconds) spanning sub-millisecond I/O to multi-minute inference
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render {name="value",...} for a sample line"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class for labelled metrics
+
+    Each update takes an uncontended lock held for a few dictionary
+    operations, which keeps recording cheap enough to leave on in production
+    while staying correct when updated from worker threads.
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+            if value is not None
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram of observations"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsService:
+    """Registry of application metrics"""
+
+    def __init__(self, namespace: str = "step1x3d"):
+        self.namespace = namespace
+        self._metrics: List[_Metric] = []
+        self._process = psutil.Process(os.getpid())
+
+        self.requests_total = self.counter(
+            "http_requests_total", "HTTP requests by route, method and status", ["method", "route", "status"]
+        )
+        self.request_errors_total = self.counter(
+            "http_request_errors_total", "HTTP requests that failed with a 5xx status", ["method", "route"]
+        )
+        self.request_duration = self.histogram(
+            "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+        )
+        self.requests_in_flight = self.gauge(
+            "http_requests_in_flight", "HTTP requests currently being handled"
+        )
+        self.queue_depth = self.gauge(
+            "queue_depth", "Generation jobs admitted but not finished", ["route"]
+        )
+        self.stage_duration = self.histogram(
+            "stage_duration_seconds", "Latency of pipeline stages", ["stage"]
+        )
+        self.cache_requests = self.counter(
+            "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+        )
+        self.cache_hit_ratio = self.gauge(
+            "cache_hit_ratio", "Fraction of cache lookups that hit", ["cache"], collect=self._collect_hit_ratios
+        )
+        self.model_load_seconds = self.gauge(
+            "model_load_seconds", "Time taken by the most recent load of each model", ["model"]
+        )
+        self.model_warmup_seconds = self.gauge(
+            "model_warmup_seconds", "Time taken by each startup warm-up inference", ["model", "case"]
+        )
+        self.deadline_at_risk_total = self.counter(
+            "deadline_at_risk_total", "Jobs predicted at submission to finish after their deadline", ["route"]
+        )
+        self.model_resident = self.gauge(
+            "model_resident", "Whether each model currently occupies the device", ["model"]
+        )
+        self.model_footprint_bytes = self.gauge(
+            "model_footprint_bytes", "Device memory held by each model when resident", ["model"]
+        )
+        self.model_evictions_total = self.counter(
+            "model_evictions_total", "Models evicted to stay within the model memory budget", ["model", "policy"]
+        )
+        self.model_residency_loads_total = self.counter(
+            "model_residency_loads_total", "Models made resident, by fresh load or restore from CPU", ["model", "source"]
+        )
+        self.pipeline_stage_busy_seconds = self.counter(
+            "pipeline_stage_busy_seconds_total", "Worker time spent processing items, per generation pipeline stage", ["stage"]
+        )
+        self.pipeline_stage_wait = self.histogram(
+            "pipeline_stage_wait_seconds", "Time items waited in a stage's queue for a worker", ["stage"]
+        )
+
+        self.host_gauges = {
+            "process_resident_memory_bytes": self.gauge(
+                "process_resident_memory_bytes", "Resident memory of the backend process",
+                collect=lambda: {(): self._process.memory_info().rss},
+            ),
+            "host_memory_available_bytes": self.gauge(
+                "host_memory_available_bytes", "Host memory available to new allocations",
+                collect=lambda: {(): psutil.virtual_memory().available},
+            ),
+            "host_cpu_percent": self.gauge(
+                "host_cpu_percent", "Host CPU utilization since the previous scrape",
+                collect=lambda: {(): psutil.cpu_percent(interval=None)},
+            ),
+        }
+        self._gpu_readings: Dict[str, Tuple[str, str]] = {
+            "utilization": ("gpu_utilization_percent", "GPU utilization"),
+            "memory_used": ("gpu_memory_used_bytes", "GPU memory in use (device-wide)"),
+            "memory_total": ("gpu_memory_total_bytes", "GPU memory capacity"),
+            "memory_allocated": ("gpu_memory_allocated_bytes", "GPU memory allocated by this process"),
+            "memory_reserved": ("gpu_memory_reserved_bytes", "GPU memory reserved by this process's allocator"),
+            "temperature": ("gpu_temperature_celsius", "GPU temperature"),
+            "power_watts": ("gpu_power_watts", "GPU power draw"),
+        }
+        self._gpu_snapshot: Callable[[], Optional[Dict]] = lambda: None
+        for reading, (name, documentation) in self._gpu_readings.items():
+            self.gauge(name, documentation, ["device", "name"], collect=self._gpu_collector(reading))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self._full_name(name), documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ) -> Gauge:
+        return self._register(Gauge(self._full_name(name), documentation, labelnames, collect))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(self._full_name(name), documentation, labelnames, buckets))
+
+    def _full_name(self, name: str) -> str:
+        return f"{self.namespace}_{name}"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        """Record the duration of a pipeline stage"""
+        self.stage_duration.observe(seconds, stage=stage)
+
+    @contextmanager
+    def track_job(self, route: str) -> Iterator[None]:
+        """Count a generation job towards the queue depth while it runs"""
+        self.queue_depth.inc(route=route)
+        try:
+            yield
+        finally:
+            self.queue_depth.dec(route=route)
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Record a cache lookup"""
+        self.cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+    def _collect_hit_ratios(self) -> Dict[LabelValues, float]:
+        totals: Dict[str, List[float]] = {}
+        for (cache, result), count in list(self.cache_requests._values.items()):
+            entry = totals.setdefault(cache, [0.0, 0.0])
+            entry[0 if result == "hit" else 1] += count
+        return {(cache,): hits / (hits + misses) for cache, (hits, misses) in totals.items() if hits + misses}
+
+    def set_gpu_snapshot_source(self, source: Callable[[], Optional[Dict]]) -> None:
+        """Register where GPU gauges read the latest telemetry snapshot from"""
+        self._gpu_snapshot = source
+
+    def _gpu_collector(self, reading: str) -> Callable[[], Dict[LabelValues, float]]:
+        def collect() -> Dict[LabelValues, float]:
+            snapshot = self._gpu_snapshot()
+            if not snapshot:
+                return {}
+            return {
+                (str(device["index"]), str(device.get("name", ""))): device[reading]
+                for device in snapshot["devices"]
+                if device.get(reading) is not None
+            }
+        return collect
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics service instance
+metrics_service = MetricsService()
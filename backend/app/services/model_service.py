@@ -3,33 +3,106 @@ Model service for handling Step1X-3D and SDXL model inference
 """
 
 import asyncio
+import functools
 import time
 import logging
-from typing import Dict, Any, Optional, Tuple
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 from pathlib import Path
-import torch
-from PIL import Image
+import numpy as np
 import io
-import base64
-
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from diffusers import StableDiffusionXLPipeline, DiffusionPipeline
-import accelerate
+from PIL import Image
 
 from ..config import settings
 from .gpu_service import gpu_service
+from .memory_service import memory_service
+from .metrics_service import metrics_service
+from .inference_backends import InferenceBackend, StepCallback, create_inference_backend
+from .residency_service import ModelResidency
+from .cost_service import JobSpec, cost_service
+from .scheduler import InferenceScheduler
+from .image_preprocessing import MAX_INPUT_SIZE, prepare_image, prepare_pil_image
+from .pipeline import generation_pipeline
+from .tracing import current_trace, span
 
 logger = logging.getLogger(__name__)
 
+# Models loaded at startup, in order
+MODEL_NAMES = ("sdxl", "step1x3d")
+
+# Receives job progress events (dicts with stage, event and step counts) on the event loop
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    """Encode a generated image as PNG"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _export_glb(model: Any) -> bytes:
+    """GLB bytes of a backend's 3D output, exporting meshes and scenes"""
+    if isinstance(model, bytes):
+        return model
+    return model.export(file_type="glb")
+
+
+def _step_reporter(progress: Optional[ProgressCallback], stage: str) -> Optional[StepCallback]:
+    """Backend step callback that forwards steps from the inference thread to a progress callback"""
+    if progress is None:
+        return None
+    loop = asyncio.get_running_loop()
+    
+    def report(step: int, total: int) -> None:
+        loop.call_soon_threadsafe(progress, {"stage": stage, "event": "step", "step": step, "total": total})
+    
+    return report
+
+
+class ModelsNotReady(Exception):
+    """Models did not become ready in time to serve a request"""
+
+    def __init__(self, state: str, error: Optional[str] = None):
+        self.state = state
+        self.error = error
+        detail = f"Models are not ready (state: {state})"
+        super().__init__(f"{detail}: {error}" if error else detail)
+
 
 class ModelService:
     """Service for managing and running model inference"""
     
-    def __init__(self):
-        self.step1x3d_pipeline: Optional[Any] = None
-        self.sdxl_pipeline: Optional[StableDiffusionXLPipeline] = None
+    def __init__(self, backend: Optional[InferenceBackend] = None):
+        self.backend = backend or create_inference_backend(settings.inference_backend)
         self.models_loaded = False
+        self.load_state = "not_loaded"  # not_loaded, loading, warming_up, ready, failed
+        self.load_error: Optional[str] = None
+        self.loaded_at: Dict[str, float] = {}
+        self.load_times: Dict[str, float] = {}
+        self.model_states: Dict[str, str] = {name: "pending" for name in MODEL_NAMES}
+        self.load_started: Optional[float] = None
+        self.load_finished: Optional[float] = None
+        self.waiting_requests = 0
+        self.warmup_state = "pending"  # pending, running, done, partial, disabled
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_runs: List[Dict[str, Any]] = []
+        self.warmup_report: Dict[str, Any] = {}
         self._loading_lock = asyncio.Lock()
+        self._ready: Optional[asyncio.Event] = None
+        self._load_task: Optional[asyncio.Task] = None
+        # Bounds concurrent inference; inference itself runs in worker threads
+        self.scheduler = InferenceScheduler(
+            settings.max_concurrent_requests, settings.scheduler_policy, settings.scheduler_aging
+        )
+        self.residency = ModelResidency(
+            self.backend,
+            self._load_pipeline,
+            budget_mb=settings.model_memory_budget_mb,
+            policy=settings.model_evict_policy,
+            half_life=settings.model_usage_half_life,
+            pinned=settings.pinned_models,
+        )
         
     async def initialize_models(self) -> None:
         """Initialize all models"""
@@ -38,67 +111,299 @@ class ModelService:
                 return
             
             logger.info("Initializing models...")
+            self.load_state = "loading"
+            self.load_error = None
+            self.load_started = time.time()
+            self.load_finished = None
+            self.model_states = {name: "pending" for name in MODEL_NAMES}
             
             try:
-                # Load SDXL pipeline first (smaller, faster to load)
-                await self._load_sdxl_pipeline()
+                # Pipelines are independent; load them concurrently (the residency
+                # manager serializes them when a model memory budget is set)
+                await asyncio.gather(*(self.residency.ensure(name) for name in MODEL_NAMES))
                 
-                # Load Step1X-3D pipeline
-                await self._load_step1x3d_pipeline()
+                # Requests keep queueing until warm-up is done, so none pays for first-run setup
+                if settings.warmup_enabled:
+                    self.load_state = "warming_up"
+                    await self._warm_up()
+                else:
+                    self.warmup_state = "disabled"
                 
                 self.models_loaded = True
+                self.load_state = "ready"
                 logger.info("All models loaded successfully")
                 
             except Exception as e:
                 logger.error(f"Failed to initialize models: {e}")
+                self.load_state = "failed"
+                self.load_error = str(e)
                 raise
+            
+            finally:
+                self.load_finished = time.time()
+                # Wake queued requests, whether loading succeeded or failed
+                self._ready_event().set()
+    
+    def start_background_load(self) -> asyncio.Task:
+        """Load models in a background task so the server can start listening immediately"""
+        if self._load_task is None or (self._load_task.done() and not self.models_loaded):
+            self._ready_event().clear()
+            self._load_task = asyncio.create_task(self._background_load())
+        return self._load_task
+    
+    async def _background_load(self) -> None:
+        try:
+            await self.initialize_models()
+        except Exception:
+            # Already logged and recorded in load_state; requests see the failure
+            pass
+    
+    def _ready_event(self) -> asyncio.Event:
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+    
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> None:
+        """Hold a request until models are loaded, starting the load if nothing has"""
+        if self.models_loaded:
+            return
+        
+        if self.load_state in ("not_loaded", "failed") and not self._loading_lock.locked():
+            self.start_background_load()
+        
+        timeout = settings.model_ready_timeout if timeout is None else timeout
+        self.waiting_requests += 1
+        try:
+            await asyncio.wait_for(self._ready_event().wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise ModelsNotReady(self.load_state)
+        finally:
+            self.waiting_requests -= 1
+        
+        if not self.models_loaded:
+            raise ModelsNotReady(self.load_state, self.load_error)
     
     async def _load_sdxl_pipeline(self) -> None:
         """Load Stable Diffusion XL pipeline"""
-        logger.info("Loading SDXL pipeline...")
+        logger.info(f"Loading SDXL pipeline ({self.backend.name} backend)...")
         
         async with gpu_service.gpu_context():
             try:
-                self.sdxl_pipeline = StableDiffusionXLPipeline.from_pretrained(
-                    settings.sdxl_model_id,
-                    torch_dtype=torch.float16,
-                    use_safetensors=True,
-                    cache_dir=settings.model_cache_dir,
-                    local_files_only=False,
-                )
-                
-                # Enable memory efficient attention
-                self.sdxl_pipeline.enable_model_cpu_offload()
-                self.sdxl_pipeline.enable_vae_slicing()
+                self.model_states["sdxl"] = "loading"
+                await self._load_model("sdxl")
+                self.model_states["sdxl"] = "loaded"
                 
                 logger.info("SDXL pipeline loaded successfully")
                 
             except Exception as e:
+                self.model_states["sdxl"] = "failed"
                 logger.error(f"Failed to load SDXL pipeline: {e}")
                 raise
     
     async def _load_step1x3d_pipeline(self) -> None:
         """Load Step1X-3D pipeline"""
-        logger.info("Loading Step1X-3D pipeline...")
+        logger.info(f"Loading Step1X-3D pipeline ({self.backend.name} backend)...")
         
         async with gpu_service.gpu_context():
             try:
-                # Note: This is a placeholder - actual Step1X-3D loading will depend on the model format
-                # The actual implementation will depend on how the model is provided
-                
-                # For now, we'll use a placeholder that matches the expected interface
-                self.step1x3d_pipeline = {
-                    "model_id": settings.step1x3d_model_id,
-                    "loaded": True,
-                    "device": gpu_service.device
-                }
+                self.model_states["step1x3d"] = "loading"
+                await self._load_model("step1x3d")
+                self.model_states["step1x3d"] = "loaded"
                 
                 logger.info("Step1X-3D pipeline loaded successfully")
                 
             except Exception as e:
+                self.model_states["step1x3d"] = "failed"
                 logger.error(f"Failed to load Step1X-3D pipeline: {e}")
                 raise
     
+    async def _load_pipeline(self, name: str) -> None:
+        """Load a model by name; the residency manager's loader"""
+        loaders = {"sdxl": self._load_sdxl_pipeline, "step1x3d": self._load_step1x3d_pipeline}
+        await loaders[name]()
+    
+    def preload(self, name: str) -> None:
+        """Start loading a model a queued job will need, if it is not resident"""
+        if self.models_loaded:
+            self.residency.preload(name)
+    
+    async def _load_model(self, name: str) -> None:
+        """Load one model in a worker thread, recording its load time"""
+        start = time.perf_counter()
+        # Loading blocks for a long time; keep the event loop serving probes
+        await asyncio.to_thread(self.backend.load_model, name)
+        self.load_times[name] = time.perf_counter() - start
+        self.loaded_at[name] = time.time()
+        metrics_service.model_load_seconds.set(self.load_times[name], model=name)
+        logger.info(f"Loaded {name} in {self.load_times[name]:.1f}s")
+    
+    async def _warm_up(self) -> None:
+        """Run small inferences at each configured resolution and mode
+        
+        The first call at a given shape pays for CUDA/cuDNN autotuning, lazy
+        module initialization, allocator growth and (with TORCH_COMPILE)
+        compilation. A failed case is logged and left cold; it does not stop
+        the service from becoming ready.
+        """
+        self.warmup_state = "running"
+        self.warmup_runs = []
+        start = time.perf_counter()
+        steps = settings.warmup_steps
+        
+        # Each run is also the first measurement of its kind's peak GPU memory
+        cases = [
+            ("sdxl", f"{width}x{height}", ("text-to-image", width * height),
+             self.backend.text_to_image, ("warm-up", width, height, steps, 7.5, 0))
+            for width, height in settings.warmup_resolution_list
+        ]
+        pixels = np.full((MAX_INPUT_SIZE, MAX_INPUT_SIZE, 3), 255, dtype=np.uint8)
+        cases += [
+            ("step1x3d", mode, (f"generate-3d/{mode}", 1),
+             self.backend.image_to_3d, (pixels, mode, 7.5, steps, 0))
+            for mode in settings.warmup_mode_list
+        ]
+        
+        for model, case, (kind, feature), func, args in cases:
+            run: Dict[str, Any] = {"model": model, "case": case}
+            run_start = time.perf_counter()
+            try:
+                async with self.residency.use(model, count=False), gpu_service.gpu_context(kind, feature):
+                    await asyncio.to_thread(self._call_exclusive, model, func, *args)
+            except Exception as e:
+                logger.warning(f"Warm-up {model}/{case} failed: {e}")
+                run["error"] = str(e)
+            run["seconds"] = time.perf_counter() - run_start
+            metrics_service.model_warmup_seconds.set(run["seconds"], model=model, case=case)
+            self.warmup_runs.append(run)
+        
+        try:
+            self.warmup_report = await asyncio.to_thread(self.backend.finish_warmup)
+        except Exception as e:
+            logger.warning(f"Failed to persist warm-up state: {e}")
+            self.warmup_report = {"error": str(e)}
+        
+        self.warmup_seconds = time.perf_counter() - start
+        self.warmup_state = "partial" if any("error" in run for run in self.warmup_runs) else "done"
+        logger.info(f"Warm-up finished in {self.warmup_seconds:.1f}s ({len(cases)} runs, {self.warmup_state})")
+    
+    @property
+    def cost_device(self) -> str:
+        """Device label the cost model keys observations by"""
+        return f"{self.backend.name}:{gpu_service.device_name}"
+    
+    def estimate(self, spec: JobSpec) -> Dict[str, Any]:
+        """Predicted service time, queueing delay and completion time of a job submitted now"""
+        service = cost_service.predict(spec, self.cost_device)
+        queue = self.scheduler.expected_wait(service)
+        return {
+            "service": round(service, 3),
+            "queue": round(queue, 3),
+            "eta": round(service + queue, 3),
+            "models_ready": self.models_loaded,
+        }
+    
+    async def _run_inference(self, model: str, spec: JobSpec, func, *args) -> Any:
+        """Run a blocking backend call on the inference stage, bounded by MAX_CONCURRENT_REQUESTS
+        
+        A job whose host memory estimate could never fit the budget is
+        rejected before anything else. The model is made resident first, so
+        queued jobs hold it on the device; slots go to queued jobs in
+        SCHEDULER_POLICY order by predicted cost, and host and GPU memory for
+        the job are admitted and measured only once it holds a slot, so queued
+        jobs neither reserve memory nor skew the peaks; each call's memory
+        report is attached to the job's trace under ``memory``. Calls to the
+        same model run one at a time under its lock; only different models
+        overlap. The measured service time, excluding the wait for the lock,
+        feeds the cost model.
+        """
+        kind = spec.route if spec.mode is None else f"{spec.route}/{spec.mode}"
+        # Batched images share one forward pass, so working memory grows with the batch; 3D
+        # variants run one after another in the backend and peak like a single job
+        feature = spec.width * spec.height * (spec.count or 1) if spec.width and spec.height else 1
+        estimate = memory_service.check(spec.route, feature)
+        
+        async with self.residency.use(model):
+            async with self._inference_slot(spec, estimate):
+                async with memory_service.track(spec.route, feature) as memory:
+                    async with gpu_service.gpu_context(kind, feature):
+                        with span("inference"):
+                            result, elapsed = await generation_pipeline.run(
+                                "inference", self._call_exclusive, model, func, *args
+                            )
+        
+        trace = current_trace()
+        if trace is not None:
+            trace.args.setdefault("memory", {})[spec.route] = memory.result
+        
+        await cost_service.observe(spec, self.cost_device, elapsed)
+        return result
+    
+    @asynccontextmanager
+    async def _inference_slot(self, spec: JobSpec, estimate: int) -> AsyncIterator[None]:
+        """Hold an inference slot once the job's host memory estimate fits the budget
+        
+        A job waits for memory outside the scheduler, reserving nothing; if
+        others take the room while it queues for a slot, it gives the slot
+        back and waits again, so jobs that do fit are not held up behind it.
+        """
+        cost = cost_service.predict(spec, self.cost_device)
+        deadline = time.monotonic() + settings.memory_admission_timeout
+        while True:
+            await memory_service.wait_for_room(spec.route, estimate, deadline - time.monotonic())
+            async with self.scheduler.slot(cost):
+                if memory_service.fits(estimate):
+                    yield
+                    return
+    
+    def _call_exclusive(self, model: str, func: Callable, *args) -> Tuple[Any, float]:
+        """Call ``func`` holding the model's lock; returns the result and the time it ran"""
+        with self.backend.model_locks[model]:
+            start = time.perf_counter()
+            result = func(*args)
+            return result, time.perf_counter() - start
+    
+    async def _generate_image(
+        self,
+        prompt: str,
+        width: int,
+        height: int,
+        num_inference_steps: int,
+        guidance_scale: float,
+        seed: Optional[int],
+        progress: Optional[ProgressCallback] = None
+    ) -> Image.Image:
+        """Run SDXL and return the generated image"""
+        return await self._run_inference(
+            "sdxl",
+            JobSpec("text-to-image", width=width, height=height, steps=num_inference_steps),
+            functools.partial(self.backend.text_to_image, progress=_step_reporter(progress, "text-to-image")),
+            prompt, width, height, num_inference_steps, guidance_scale, seed
+        )
+    
+    async def _generate_model(
+        self,
+        pixels: np.ndarray,
+        mode: str,
+        guidance_scale: float,
+        num_steps: int,
+        seed: int,
+        progress: Optional[ProgressCallback] = None
+    ) -> bytes:
+        """Run Step1X-3D on a pixel array, then export the result to GLB on the postprocess stage"""
+        model = await self._run_inference(
+            "step1x3d",
+            JobSpec("generate-3d", mode=mode, steps=num_steps),
+            functools.partial(self.backend.image_to_3d, progress=_step_reporter(progress, "generate-3d")),
+            pixels, mode, guidance_scale, num_steps, seed
+        )
+        with span("mesh_export"):
+            return await generation_pipeline.run("postprocess", _export_glb, model)
+    
+    async def _encode_image(self, image: Image.Image) -> bytes:
+        """PNG-encode an image on the postprocess stage, overlapping with other jobs' inference"""
+        with span("image_encode"):
+            return await generation_pipeline.run("postprocess", _encode_png, image)
+    
     async def generate_text_to_image(
         self,
         prompt: str,
@@ -110,53 +415,29 @@ class ModelService:
     ) -> Tuple[bytes, Dict[str, Any]]:
         """Generate image from text prompt"""
         
-        if not self.models_loaded:
-            await self.initialize_models()
-        
-        if self.sdxl_pipeline is None:
-            raise RuntimeError("SDXL pipeline not loaded")
+        await self.wait_until_ready()
         
         start_time = time.time()
         
         try:
-            async with gpu_service.gpu_context():
-                # Set seed if provided
-                if seed is not None:
-                    torch.manual_seed(seed)
-                    if torch.cuda.is_available():
-                        torch.cuda.manual_seed(seed)
-                
-                # Generate image
-                result = self.sdxl_pipeline(
-                    prompt=prompt,
-                    width=width,
-                    height=height,
-                    num_inference_steps=num_inference_steps,
-                    guidance_scale=guidance_scale,
-                    generator=torch.Generator(device=gpu_service.device).manual_seed(seed) if seed else None,
-                )
-                
-                # Convert to bytes
-                image = result.images[0]
-                img_bytes = io.BytesIO()
-                image.save(img_bytes, format="PNG")
-                img_bytes.seek(0)
-                
-                generation_time = time.time() - start_time
-                
-                metadata = {
-                    "prompt": prompt,
-                    "width": width,
-                    "height": height,
-                    "num_inference_steps": num_inference_steps,
-                    "guidance_scale": guidance_scale,
-                    "seed": seed,
-                    "generation_time": generation_time,
-                    "device": gpu_service.device,
-                }
-                
-                return img_bytes.getvalue(), metadata
-                
+            image = await self._generate_image(prompt, width, height, num_inference_steps, guidance_scale, seed)
+            png_bytes = await self._encode_image(image)
+            
+            generation_time = time.time() - start_time
+            
+            metadata = {
+                "prompt": prompt,
+                "width": width,
+                "height": height,
+                "num_inference_steps": num_inference_steps,
+                "guidance_scale": guidance_scale,
+                "seed": seed,
+                "generation_time": generation_time,
+                "device": self.backend.device,
+            }
+            
+            return png_bytes, metadata
+            
         except Exception as e:
             logger.error(f"Text-to-image generation failed: {e}")
             raise
@@ -171,89 +452,275 @@ class ModelService:
     ) -> Tuple[bytes, Dict[str, Any]]:
         """Generate 3D model from image"""
         
-        if not self.models_loaded:
-            await self.initialize_models()
-        
-        if self.step1x3d_pipeline is None:
-            raise RuntimeError("Step1X-3D pipeline not loaded")
+        await self.wait_until_ready()
         
         start_time = time.time()
         
         try:
-            async with gpu_service.gpu_context():
-                # Load and preprocess image
-                image = Image.open(io.BytesIO(image_bytes))
-                
-                # Resize if necessary
-                max_size = 1024
-                if max(image.size) > max_size:
-                    ratio = max_size / max(image.size)
-                    new_size = tuple(int(dim * ratio) for dim in image.size)
-                    image = image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # Convert to base64 for model input
-                buffered = io.BytesIO()
-                image.save(buffered, format="PNG")
-                img_b64 = base64.b64encode(buffered.getvalue()).decode()
-                
-                # Placeholder for actual Step1X-3D inference
-                # This will be replaced with actual model inference
-                # For now, we'll create a dummy GLB file
-                dummy_glb = self._create_dummy_glb()
-                
-                generation_time = time.time() - start_time
-                
-                metadata = {
-                    "mode": mode,
-                    "guidance_scale": guidance_scale,
-                    "num_steps": num_steps,
-                    "seed": seed,
-                    "generation_time": generation_time,
-                    "device": gpu_service.device,
-                    "image_size": image.size,
-                }
-                
-                return dummy_glb, metadata
-                
+            # Decode at reduced scale straight to a pixel array on the preprocess stage
+            with span("image_preprocess"):
+                pixels, image_info = await generation_pipeline.run("preprocess", prepare_image, image_bytes)
+            
+            glb_bytes = await self._generate_model(pixels, mode, guidance_scale, num_steps, seed)
+            
+            generation_time = time.time() - start_time
+            
+            metadata = {
+                "mode": mode,
+                "guidance_scale": guidance_scale,
+                "num_steps": num_steps,
+                "seed": seed,
+                "generation_time": generation_time,
+                "device": self.backend.device,
+                "image_size": image_info["image_size"],
+                "original_size": image_info["original_size"],
+            }
+            
+            return glb_bytes, metadata
+            
         except Exception as e:
             logger.error(f"3D generation failed: {e}")
             raise
     
-    def _create_dummy_glb(self) -> bytes:
-        """Create a dummy GLB file for testing"""
-        # This is a minimal GLB file structure
-        # In production, this would be replaced with actual Step1X-3D output
-        dummy_content = b'\x67\x6C\x54\x46\x02\x00\x00\x00'  # GLB header
-        dummy_content += b'\x00' * 100  # Add some dummy data
-        return dummy_content
+    async def generate_text_to_image_variants(
+        self,
+        prompt: str,
+        seeds: List[int],
+        width: int = 1024,
+        height: int = 1024,
+        num_inference_steps: int = 20,
+        guidance_scale: float = 7.5
+    ) -> Tuple[List[bytes], Dict[str, Any]]:
+        """Generate one image per seed in a single batched inference, returning PNGs in seed order"""
+        
+        await self.wait_until_ready()
+        
+        start_time = time.time()
+        
+        try:
+            images = await self._run_inference(
+                "sdxl",
+                JobSpec("text-to-image", width=width, height=height, steps=num_inference_steps, count=len(seeds)),
+                self.backend.text_to_image_variants,
+                prompt, width, height, num_inference_steps, guidance_scale, seeds
+            )
+            png_bytes = await asyncio.gather(*(self._encode_image(image) for image in images))
+            
+            generation_time = time.time() - start_time
+            
+            metadata = {
+                "prompt": prompt,
+                "width": width,
+                "height": height,
+                "num_inference_steps": num_inference_steps,
+                "guidance_scale": guidance_scale,
+                "seeds": seeds,
+                "num_variants": len(seeds),
+                "generation_time": generation_time,
+                "device": self.backend.device,
+            }
+            
+            return list(png_bytes), metadata
+            
+        except Exception as e:
+            logger.error(f"Text-to-image variant generation failed: {e}")
+            raise
+    
+    async def generate_3d_variants(
+        self,
+        image_bytes: bytes,
+        seeds: List[int],
+        mode: str = "geometry",
+        guidance_scale: float = 7.5,
+        num_steps: int = 50
+    ) -> Tuple[List[bytes], Dict[str, Any]]:
+        """Generate one 3D model per seed from one image, decoded once and inferred in one backend call"""
+        
+        await self.wait_until_ready()
+        
+        start_time = time.time()
+        
+        try:
+            with span("image_preprocess"):
+                pixels, image_info = await generation_pipeline.run("preprocess", prepare_image, image_bytes)
+            
+            models = await self._run_inference(
+                "step1x3d",
+                JobSpec("generate-3d", mode=mode, steps=num_steps, count=len(seeds)),
+                self.backend.image_to_3d_variants,
+                pixels, mode, guidance_scale, num_steps, seeds
+            )
+            with span("mesh_export"):
+                glb_bytes = await asyncio.gather(
+                    *(generation_pipeline.run("postprocess", _export_glb, model) for model in models)
+                )
+            
+            generation_time = time.time() - start_time
+            
+            metadata = {
+                "mode": mode,
+                "guidance_scale": guidance_scale,
+                "num_steps": num_steps,
+                "seeds": seeds,
+                "num_variants": len(seeds),
+                "generation_time": generation_time,
+                "device": self.backend.device,
+                "image_size": image_info["image_size"],
+                "original_size": image_info["original_size"],
+            }
+            
+            return list(glb_bytes), metadata
+            
+        except Exception as e:
+            logger.error(f"3D variant generation failed: {e}")
+            raise
+    
+    async def generate_text_to_3d(
+        self,
+        prompt: str,
+        width: int = 1024,
+        height: int = 1024,
+        num_inference_steps: int = 20,
+        image_guidance_scale: float = 7.5,
+        image_seed: Optional[int] = None,
+        mode: str = "geometry",
+        guidance_scale: float = 7.5,
+        num_steps: int = 50,
+        seed: int = 2025,
+        keep_image: bool = False,
+        progress: Optional[ProgressCallback] = None
+    ) -> Tuple[bytes, Optional[bytes], Dict[str, Any]]:
+        """Generate a 3D model from a text prompt, passing the generated image to Step1X-3D in memory
+        
+        The SDXL output goes straight to a pixel array without a PNG
+        round trip. With ``keep_image`` the image is also PNG-encoded, on
+        the postprocess stage while 3D inference runs, and returned for
+        storage. ``progress`` receives stage and step events on the event loop.
+        """
+        
+        await self.wait_until_ready()
+        
+        emit = progress or (lambda event: None)
+        start_time = time.time()
+        encode: Optional[asyncio.Future] = None
+        
+        try:
+            emit({"stage": "text-to-image", "event": "started", "total": num_inference_steps})
+            image = await self._generate_image(
+                prompt, width, height, num_inference_steps, image_guidance_scale, image_seed, progress
+            )
+            image_time = time.time() - start_time
+            emit({"stage": "text-to-image", "event": "completed", "seconds": round(image_time, 3)})
+            
+            if keep_image:
+                encode = asyncio.ensure_future(self._encode_image(image))
+            with span("image_preprocess"):
+                pixels, image_info = await generation_pipeline.run("preprocess", prepare_pil_image, image)
+            
+            emit({"stage": "generate-3d", "event": "started", "total": num_steps})
+            glb_bytes = await self._generate_model(pixels, mode, guidance_scale, num_steps, seed, progress)
+            emit({"stage": "generate-3d", "event": "completed", "seconds": round(time.time() - start_time - image_time, 3)})
+            
+            png_bytes = await encode if encode is not None else None
+            
+            generation_time = time.time() - start_time
+            
+            metadata = {
+                "prompt": prompt,
+                "image": {
+                    "width": width,
+                    "height": height,
+                    "num_inference_steps": num_inference_steps,
+                    "guidance_scale": image_guidance_scale,
+                    "seed": image_seed,
+                    "generation_time": image_time,
+                },
+                "mode": mode,
+                "guidance_scale": guidance_scale,
+                "num_steps": num_steps,
+                "seed": seed,
+                "generation_time": generation_time,
+                "device": self.backend.device,
+                "image_size": image_info["image_size"],
+            }
+            
+            return glb_bytes, png_bytes, metadata
+            
+        except Exception as e:
+            logger.error(f"Text-to-3D generation failed: {e}")
+            raise
+        finally:
+            if encode is not None and not encode.done():
+                encode.cancel()
     
     def get_model_status(self) -> Dict[str, Any]:
         """Get status of loaded models"""
         return {
             "step1x3d": {
                 "model_id": settings.step1x3d_model_id,
-                "loaded": self.step1x3d_pipeline is not None,
-                "device": gpu_service.device if self.step1x3d_pipeline else None,
+                "loaded": self.backend.is_loaded("step1x3d"),
+                "device": self.backend.device if self.backend.is_loaded("step1x3d") else None,
+                "loaded_at": self.loaded_at.get("step1x3d"),
+                "load_time": self.load_times.get("step1x3d"),
+                "load_report": self.backend.load_reports.get("step1x3d"),
             },
             "sdxl": {
                 "model_id": settings.sdxl_model_id,
-                "loaded": self.sdxl_pipeline is not None,
-                "device": gpu_service.device if self.sdxl_pipeline else None,
+                "loaded": self.backend.is_loaded("sdxl"),
+                "device": self.backend.device if self.backend.is_loaded("sdxl") else None,
+                "loaded_at": self.loaded_at.get("sdxl"),
+                "load_time": self.load_times.get("sdxl"),
+                "load_report": self.backend.load_reports.get("sdxl"),
             },
             "models_loaded": self.models_loaded,
+            "backend": self.backend.name,
+        }
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Get whether the service can accept generation requests"""
+        loaded = sum(1 for state in self.model_states.values() if state == "loaded")
+        end = self.load_finished or time.time()
+        
+        return {
+            "ready": self.models_loaded,
+            "state": self.load_state,
+            "error": self.load_error,
+            "progress": loaded / len(self.model_states),
+            "models": dict(self.model_states),
+            "load_times": dict(self.load_times),
+            "load_elapsed": end - self.load_started if self.load_started else None,
+            "waiting_requests": self.waiting_requests,
+            "warmup": {
+                "state": self.warmup_state,
+                "seconds": self.warmup_seconds,
+                "runs": list(self.warmup_runs),
+                **self.warmup_report,
+            },
         }
     
     async def cleanup(self) -> None:
         """Clean up model resources"""
-        if self.sdxl_pipeline is not None:
-            del self.sdxl_pipeline
-            self.sdxl_pipeline = None
+        for name in list(self.backend.models):
+            self.backend.unload_model(name)
         
-        if self.step1x3d_pipeline is not None:
-            del self.step1x3d_pipeline
-            self.step1x3d_pipeline = None
+        if self._load_task is not None and not self._load_task.done():
+            self._load_task.cancel()
+            try:
+                await self._load_task
+            except asyncio.CancelledError:
+                pass
+        self._load_task = None
         
         self.models_loaded = False
+        self.load_state = "not_loaded"
+        self.model_states = {name: "pending" for name in MODEL_NAMES}
+        self.loaded_at.clear()
+        self.load_times.clear()
+        self.residency.reset()
+        self.warmup_state = "pending"
+        self.warmup_seconds = None
+        self.warmup_runs = []
+        self.warmup_report = {}
         gpu_service.clear_cache()
 
 
@@ -0,0 +1,199 @@
+"""
+Staged generation pipeline: bounded queues feeding per-stage worker pools
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .metrics_service import metrics_service
+from .profiling import profiled_thread
+from .tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+# Window over which recent stage utilization is reported
+UTILIZATION_WINDOW = 60.0
+
+
+class _Item:
+    def __init__(self, func: Callable, args: Tuple, future: asyncio.Future):
+        self.func = func
+        self.args = args
+        self.future = future
+        self.context = contextvars.copy_context()
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+
+
+class Stage:
+    """One step of generation, run by its own workers from a bounded queue
+
+    Blocking functions run on the stage's thread pool; coroutine functions
+    (async writes) run on the event loop, ``workers`` at a time. When the
+    queue is full, submitting waits, which pushes back on earlier stages
+    instead of piling work up in memory. Each stage records how busy its
+    workers are and how long items waited.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int, blocking: bool = True):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.blocking = blocking
+        self.executor = (
+            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"stage-{name}") if blocking else None
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.started_at = time.monotonic()
+        # (finished at, busy seconds) of recent items, for windowed utilization
+        self._recent: Deque[Tuple[float, float]] = deque()
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (tests, reloads): start fresh workers on it
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    async def _worker(self) -> None:
+        while True:
+            item: _Item = await self._queue.get()
+            if item.future.cancelled():
+                continue
+
+            item.started = time.perf_counter()
+            self.busy += 1
+            try:
+                if self.blocking:
+                    result = await self._loop.run_in_executor(self.executor, item.context.run, self._call, item)
+                else:
+                    result = await item.context.run(asyncio.ensure_future, item.func(*item.args))
+            except Exception as e:
+                self.failed += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+            else:
+                if not item.future.done():
+                    item.future.set_result(result)
+            finally:
+                elapsed = time.perf_counter() - item.started
+                self.busy -= 1
+                self.processed += 1
+                self.busy_seconds += elapsed
+                self.wait_seconds += item.started - item.submitted
+                self._recent.append((time.monotonic(), elapsed))
+                metrics_service.pipeline_stage_busy_seconds.inc(elapsed, stage=self.name)
+                metrics_service.pipeline_stage_wait.observe(item.started - item.submitted, stage=self.name)
+
+    @staticmethod
+    def _call(item: _Item) -> Any:
+        # Runs in the worker thread inside the submitter's context; sampled only for this call
+        with profiled_thread():
+            return item.func(*item.args)
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Queue ``func(*args)`` on this stage and wait for its result"""
+        queue = self._ensure_workers()
+        item = _Item(func, args, asyncio.get_running_loop().create_future())
+        await queue.put(item)
+        result = await item.future
+
+        trace = current_trace()
+        if trace is not None and item.started is not None:
+            trace.add_span(f"{self.name}_wait", item.submitted, item.started - item.submitted)
+        return result
+
+    def utilization(self, window: float = UTILIZATION_WINDOW) -> float:
+        """Fraction of worker time spent busy over the last ``window`` seconds"""
+        now = time.monotonic()
+        while self._recent and self._recent[0][0] < now - window:
+            self._recent.popleft()
+        span = min(window, now - self.started_at)
+        if span <= 0:
+            return 0.0
+        busy = sum(min(elapsed, span) for _, elapsed in self._recent)
+        return min(busy / (span * self.workers), 1.0)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "processed": self.processed,
+            "failed": self.failed,
+            "utilization": round(self.utilization(), 3),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "mean_wait": round(self.wait_seconds / self.processed, 4) if self.processed else None,
+        }
+
+    def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class GenerationPipeline:
+    """The stages of a generation job, each with its own workers
+
+    ``preprocess`` (image decoding), ``inference`` (backend calls, whose
+    concurrency the inference scheduler already bounds), ``postprocess``
+    (PNG encoding, mesh export) and ``write`` (storing outputs). A job
+    moves through them in order, but different jobs occupy different
+    stages at once, so the next job's decoding and the previous job's
+    export and write overlap with the current job's inference.
+    """
+
+    def __init__(self):
+        queue_size = settings.pipeline_queue_size
+        self.stages: Dict[str, Stage] = {
+            "preprocess": Stage("preprocess", settings.pipeline_preprocess_workers, queue_size),
+            "inference": Stage("inference", settings.max_concurrent_requests, queue_size),
+            "postprocess": Stage("postprocess", settings.pipeline_postprocess_workers, queue_size),
+            "write": Stage("write", settings.pipeline_write_workers, queue_size, blocking=False),
+        }
+        metrics_service.gauge(
+            "pipeline_stage_utilization", "Fraction of each stage's worker time spent busy (last minute)", ["stage"],
+            collect=lambda: {(name,): stage.utilization() for name, stage in self.stages.items()},
+        )
+        metrics_service.gauge(
+            "pipeline_stage_queued", "Items waiting for a worker in each stage", ["stage"],
+            collect=lambda: {(name,): float(stage.get_status()["queued"]) for name, stage in self.stages.items()},
+        )
+
+    async def run(self, stage: str, func: Callable, *args: Any) -> Any:
+        """Run one step of a job on the named stage"""
+        return await self.stages[stage].run(func, *args)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Per-stage workers, queue depth, throughput and utilization"""
+        return {
+            "window": UTILIZATION_WINDOW,
+            "stages": {name: stage.get_status() for name, stage in self.stages.items()},
+        }
+
+    def shutdown(self) -> None:
+        for stage in self.stages.values():
+            stage.shutdown()
+
+
+# Global generation pipeline instance
+generation_pipeline = GenerationPipeline()
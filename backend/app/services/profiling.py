@@ -0,0 +1,188 @@
+"""
+Low-overhead sampling profiler for individual jobs
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..config import settings
+
+_current_profiler: ContextVar[Optional["SamplingProfiler"]] = ContextVar("current_profiler", default=None)
+
+# (function name, file, first line) from root to leaf
+Stack = Tuple[Tuple[str, str, int], ...]
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of a job's threads from a background thread
+
+    The thread that starts the profiler (the event loop) is sampled
+    throughout. Worker threads are sampled only while they run this job's
+    work, from entering a span or pipeline stage call until leaving it, so
+    shared pipeline workers do not bring in other jobs. The event loop is
+    shared, though: other requests it serves while the job awaits show up
+    in its samples. The profiled code pays nothing beyond the GIL hand-offs
+    of the sampler waking up.
+    """
+
+    def __init__(self, job_id: str, interval: float = 0.005, max_depth: int = 128):
+        self.job_id = job_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.ticks = 0
+        self.start_time: Optional[float] = None
+        self.duration = 0.0
+        # Thread id -> nesting depth of the job work it is running
+        self._threads: Dict[int, int] = {}
+        self._seen: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, thread_id: Optional[int] = None) -> None:
+        """Include a thread in the sampled set until a matching ``remove_thread``"""
+        thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+        self._seen.add(thread_id)
+
+    def remove_thread(self, thread_id: Optional[int] = None) -> None:
+        """Stop sampling a thread once it leaves the job's outermost unit of work"""
+        thread_id = thread_id if thread_id is not None else threading.get_ident()
+        depth = self._threads.get(thread_id, 0) - 1
+        if depth > 0:
+            self._threads[thread_id] = depth
+        else:
+            self._threads.pop(thread_id, None)
+
+    def start(self) -> None:
+        """Start sampling the calling thread"""
+        self.add_thread()
+        self.start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.job_id[:8]}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.start_time is not None:
+            self.duration = time.perf_counter() - self.start_time
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            self.ticks += 1
+            for thread_id in list(self._threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.samples[self._stack(frame)] += 1
+                    self.sample_count += 1
+
+    def _stack(self, frame) -> Stack:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    @staticmethod
+    def _frame_label(frame: Tuple[str, str, int]) -> str:
+        name, filename, line = frame
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def to_collapsed(self) -> str:
+        """Export as collapsed stacks (flamegraph.pl / speedscope / inferno input)"""
+        lines = [
+            ";".join(self._frame_label(frame) for frame in stack) + f" {count}"
+            for stack, count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """Export as a speedscope sampled profile (load in speedscope.app)"""
+        frame_index: Dict[Tuple[str, str, int], int] = {}
+        frames: List[Dict[str, Any]] = []
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        # Wake-ups drift under GIL contention, so spread the measured wall time over them
+        sample_weight = self.duration / self.ticks if self.ticks else self.interval
+
+        for stack, count in self.samples.most_common():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(count * sample_weight)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"job {self.job_id}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": f"job {self.job_id}",
+            "activeProfileIndex": 0,
+            "exporter": "step1x3d-backend",
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Profile statistics for job metadata"""
+        return {
+            "samples": self.sample_count,
+            "interval": self.interval,
+            "duration": self.duration,
+            "threads": len(self._seen),
+            "note": "event loop samples include other requests served while this job awaited",
+        }
+
+
+@contextmanager
+def profile(job_id: str, enabled: bool = True, interval: Optional[float] = None) -> Iterator[Optional[SamplingProfiler]]:
+    """Sample the enclosed block, yielding the profiler (or None when disabled)"""
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler(job_id, interval or settings.profile_interval)
+    token = _current_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _current_profiler.reset(token)
+
+
+@contextmanager
+def profiled_thread() -> Iterator[None]:
+    """Sample the calling thread for the active job profiler, if any, while the block runs"""
+    profiler = _current_profiler.get()
+    if profiler is None:
+        yield
+        return
+
+    profiler.add_thread()
+    try:
+        yield
+    finally:
+        profiler.remove_thread()
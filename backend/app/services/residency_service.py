@@ -0,0 +1,344 @@
+"""
+Model residency: which pipelines occupy the device under a memory budget
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from .gpu_service import gpu_service
+from .inference_backends import InferenceBackend
+from .metrics_service import metrics_service
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# What happens to an evicted model
+EVICT_POLICIES = ("offload", "unload")
+
+
+class ModelEntry:
+    """Residency state of one model"""
+
+    def __init__(self, name: str, pinned: bool = False):
+        self.name = name
+        self.state = "unloaded"  # unloaded, loading, resident, evicting, offloaded
+        self.footprint: Optional[int] = None  # device bytes, measured after the first load
+        self.pinned = pinned
+        self.active = 0  # jobs currently using the model
+        self.waiting = 0  # jobs waiting for the model to become resident
+        self.usage = 0.0  # decayed use count
+        self.last_used: Optional[float] = None
+        self.loads = 0
+        self.evictions = 0
+
+
+class ModelResidency:
+    """Keeps the models that fit a device memory budget resident
+
+    Each model's footprint is measured after it loads. When making a model
+    resident would exceed the budget, idle unpinned models are evicted in
+    order of their usage score, a use count that halves every
+    ``half_life`` seconds, so a model used often stays ahead of one used
+    once more recently. Evicted models are offloaded to CPU memory (quick
+    to restore) or unloaded entirely, depending on the policy. A model in
+    use is never evicted; jobs needing room wait until it is released.
+    With a budget of 0 nothing is ever evicted.
+
+    The first load of a model whose footprint is unknown waits for other
+    loads to finish, then evicts down to the budget once it is measured.
+    """
+
+    def __init__(
+        self,
+        backend: InferenceBackend,
+        load: Callable[[str], Awaitable[None]],
+        budget_mb: float = 0.0,
+        policy: str = "offload",
+        half_life: float = 300.0,
+        pinned: Optional[List[str]] = None,
+    ):
+        if policy not in EVICT_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.backend = backend
+        self._load = load
+        self.budget = int(budget_mb * MB)
+        self.policy = policy
+        self.half_life = half_life
+        self.entries: Dict[str, ModelEntry] = {
+            name: ModelEntry(name, pinned=name in (pinned or [])) for name in backend.model_ids
+        }
+        self._condition: Optional[asyncio.Condition] = None
+        self._preloads: Dict[str, asyncio.Task] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _entry(self, name: str) -> ModelEntry:
+        if name not in self.entries:
+            raise KeyError(f"Unknown model: {name}")
+        return self.entries[name]
+
+    def _score(self, entry: ModelEntry, now: float) -> float:
+        """Decayed use count; lower scores are evicted first"""
+        if entry.last_used is None:
+            return 0.0
+        return entry.usage * 0.5 ** ((now - entry.last_used) / self.half_life)
+
+    def _touch(self, entry: ModelEntry) -> None:
+        now = time.time()
+        entry.usage = self._score(entry, now) + 1.0
+        entry.last_used = now
+
+    def _used(self, exclude: Optional[ModelEntry] = None) -> int:
+        """Device bytes held by resident and loading models"""
+        return sum(
+            entry.footprint or 0
+            for entry in self.entries.values()
+            if entry is not exclude and entry.state in ("loading", "resident", "evicting")
+        )
+
+    def _victims(self, entry: Optional[ModelEntry], need: int) -> Optional[List[ModelEntry]]:
+        """Idle models to evict so ``need`` more bytes fit beside ``entry``, or None to wait for busy ones
+
+        Returns what can be evicted even when that is not enough, if nothing
+        that could free more is busy (pinned models, or a model larger than
+        the budget); the load then proceeds over budget.
+        """
+        used = self._used(exclude=entry)
+        if not self.enabled or used + need <= self.budget:
+            return []
+
+        now = time.time()
+        candidates = sorted(
+            (
+                other for other in self.entries.values()
+                if other is not entry and other.state == "resident"
+                and not other.pinned and other.active == 0 and other.waiting == 0
+            ),
+            key=lambda other: (self._score(other, now), other.last_used or 0.0),
+        )
+        victims = []
+        for candidate in candidates:
+            if used + need <= self.budget:
+                return victims
+            victims.append(candidate)
+            used -= candidate.footprint or 0
+        if used + need <= self.budget:
+            return victims
+
+        busy = any(
+            other is not entry and not other.pinned
+            and (other.active > 0 or other.state in ("loading", "evicting"))
+            for other in self.entries.values()
+        )
+        return None if busy else victims
+
+    async def _evict(self, entries: List[ModelEntry]) -> None:
+        """Offload or unload models already marked as evicting"""
+        for entry in entries:
+            try:
+                if self.policy == "offload":
+                    await asyncio.to_thread(self.backend.offload_model, entry.name)
+                    state = "offloaded"
+                else:
+                    await asyncio.to_thread(self.backend.unload_model, entry.name)
+                    state = "unloaded"
+            except Exception as e:
+                logger.error(f"Failed to evict {entry.name}: {e}")
+                state = "resident"
+            else:
+                entry.evictions += 1
+                metrics_service.model_evictions_total.inc(model=entry.name, policy=self.policy)
+                logger.info(f"Evicted {entry.name} ({self.policy}) to stay within the model memory budget")
+
+            async with self._cond():
+                entry.state = state
+                metrics_service.model_resident.set(1 if state == "resident" else 0, model=entry.name)
+                self._cond().notify_all()
+
+        if entries:
+            gpu_service.clear_cache()
+
+    async def _make_resident(self, entry: ModelEntry) -> None:
+        """Load or restore a model, evicting others to fit; called with the condition held"""
+        condition = self._cond()
+
+        while True:
+            if entry.state == "resident":
+                return
+            if entry.state in ("loading", "evicting"):
+                await condition.wait()
+                continue
+
+            if entry.footprint is None and self.enabled and any(
+                other.state in ("loading", "evicting") for other in self.entries.values()
+            ):
+                # Unknown size: load alone, then evict down to the budget
+                await condition.wait()
+                continue
+
+            victims = self._victims(entry, entry.footprint or 0)
+            if victims is None:
+                await condition.wait()
+                continue
+            break
+
+        freed = sum(victim.footprint or 0 for victim in victims)
+        if self.enabled and self._used(exclude=entry) - freed + (entry.footprint or 0) > self.budget:
+            logger.warning(f"Loading {entry.name} exceeds the model memory budget")
+
+        previous = entry.state
+        entry.state = "loading"
+        for victim in victims:
+            victim.state = "evicting"
+
+        condition.release()
+        try:
+            await self._evict(victims)
+            if previous == "offloaded":
+                await asyncio.to_thread(self.backend.restore_model, entry.name)
+                source = "restore"
+            else:
+                await self._load(entry.name)
+                source = "load"
+            footprint = self.backend.footprint(entry.name)
+        except BaseException:
+            await condition.acquire()
+            entry.state = previous if previous == "offloaded" and self.backend.is_loaded(entry.name) else "unloaded"
+            condition.notify_all()
+            raise
+        await condition.acquire()
+
+        entry.footprint = footprint
+        entry.loads += 1
+        entry.state = "resident"
+        metrics_service.model_footprint_bytes.set(footprint, model=entry.name)
+        metrics_service.model_resident.set(1, model=entry.name)
+        metrics_service.model_residency_loads_total.inc(model=entry.name, source=source)
+        condition.notify_all()
+
+        # A first load may have overshot the budget before its size was known
+        self._enforce()
+
+    def _enforce(self) -> None:
+        """Start evicting idle models while the budget is exceeded; called with the condition held"""
+        victims = self._victims(None, 0) or []
+        for victim in victims:
+            victim.state = "evicting"
+        if victims:
+            asyncio.create_task(self._evict(victims))
+
+    @asynccontextmanager
+    async def use(self, name: str, count: bool = True) -> AsyncIterator[None]:
+        """Hold a model resident for the duration of the block
+
+        Loads or restores the model if needed, waiting while the models that
+        would have to be evicted are in use. ``count=False`` leaves the usage
+        score untouched (warm-up, pinning).
+        """
+        entry = self._entry(name)
+        condition = self._cond()
+
+        with span("model_residency"):
+            async with condition:
+                entry.waiting += 1
+                try:
+                    await self._make_resident(entry)
+                finally:
+                    entry.waiting -= 1
+                entry.active += 1
+
+        try:
+            yield
+        finally:
+            async with condition:
+                entry.active -= 1
+                if count:
+                    self._touch(entry)
+                condition.notify_all()
+
+    async def ensure(self, name: str) -> None:
+        """Make a model resident without counting a use"""
+        async with self.use(name, count=False):
+            pass
+
+    def preload(self, name: str) -> None:
+        """Start making a model resident for a queued job, if that needs no waiting
+
+        A model that could only be loaded by evicting one in use is left for
+        the job itself to load when it gets there.
+        """
+        entry = self._entry(name)
+        if not self.enabled or entry.state in ("resident", "loading") or name in self._preloads:
+            return
+        if self._victims(entry, entry.footprint or 0) is None:
+            return
+
+        task = asyncio.create_task(self._preload(entry))
+        self._preloads[name] = task
+        task.add_done_callback(lambda _: self._preloads.pop(name, None))
+
+    async def _preload(self, entry: ModelEntry) -> None:
+        try:
+            await self.ensure(entry.name)
+        except Exception as e:
+            logger.warning(f"Preloading {entry.name} failed: {e}")
+
+    async def pin(self, name: str) -> None:
+        """Keep a model resident until unpinned, loading it if needed"""
+        entry = self._entry(name)
+        entry.pinned = True
+        await self.ensure(name)
+
+    async def unpin(self, name: str) -> None:
+        """Make a pinned model evictable again"""
+        entry = self._entry(name)
+        async with self._cond():
+            entry.pinned = False
+            self._enforce()
+            self._cond().notify_all()
+
+    def reset(self) -> None:
+        """Forget residency after the backend's models were dropped"""
+        for task in self._preloads.values():
+            task.cancel()
+        self._preloads.clear()
+        for entry in self.entries.values():
+            entry.state = "unloaded"
+            entry.active = 0
+            metrics_service.model_resident.set(0, model=entry.name)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Budget, usage and per-model residency"""
+        now = time.time()
+        return {
+            "budget": self.budget,
+            "used": self._used(),
+            "policy": self.policy,
+            "half_life": self.half_life,
+            "models": {
+                entry.name: {
+                    "state": entry.state,
+                    "footprint": entry.footprint,
+                    "pinned": entry.pinned,
+                    "active": entry.active,
+                    "waiting": entry.waiting,
+                    "score": round(self._score(entry, now), 3),
+                    "last_used": entry.last_used,
+                    "loads": entry.loads,
+                    "evictions": entry.evictions,
+                }
+                for entry in self.entries.values()
+            },
+        }
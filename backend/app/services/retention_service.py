@@ -0,0 +1,304 @@
+"""
+Retention service for enforcing disk quota and age limits on generated outputs
+"""
+
+import asyncio
+import json
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..config import settings
+from .storage_service import is_sidecar, storage_service
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """Service for evicting old and least-recently-downloaded outputs"""
+
+    def __init__(self):
+        self.models_dir = Path(settings.output_dir) / "models"
+        self.temp_dir = Path(settings.output_dir) / "temp"
+        self.jobs_dir = Path(settings.output_dir) / "jobs"
+        self.index_path = Path(settings.output_dir) / "retention_index.json"
+        self._last_access: Dict[str, float] = {}
+        self._index_loaded = False
+        self._run_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Dict[str, Any] = {}
+        self.totals = {
+            "runs": 0,
+            "evicted_files": 0,
+            "temp_files_removed": 0,
+            "jobs_removed": 0,
+            "reclaimed_bytes": 0,
+        }
+
+    @property
+    def quota_bytes(self) -> int:
+        """Configured quota for the models directory in bytes (0 = unlimited)"""
+        return max(settings.output_quota_mb, 0) * 1024 * 1024
+
+    def touch(self, filename: str) -> None:
+        """Record that a file was downloaded (cheap, safe to call on the event loop)"""
+        self._last_access[filename] = time.time()
+
+    def forget(self, filename: str) -> None:
+        """Drop access tracking for a deleted file"""
+        self._last_access.pop(filename, None)
+
+    async def start(self) -> None:
+        """Start the background retention loop"""
+        if not settings.retention_enabled or self._task is not None:
+            return
+
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(
+            f"Retention manager started (quota={settings.output_quota_mb}MB, "
+            f"max_age={settings.output_max_age_hours}h, "
+            f"interval={settings.retention_interval_seconds}s)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the background retention loop"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run_loop(self) -> None:
+        """Periodically enforce retention until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+
+            await asyncio.sleep(max(settings.retention_interval_seconds, 1))
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Run a single retention pass off the event loop"""
+        async with self._run_lock:
+            report = await asyncio.to_thread(self._enforce)
+
+        self.last_run = report
+        self.totals["runs"] += 1
+        self.totals["evicted_files"] += len(report["evicted"])
+        self.totals["temp_files_removed"] += report["temp_files_removed"]
+        self.totals["jobs_removed"] += report["jobs_removed"]
+        self.totals["reclaimed_bytes"] += report["reclaimed_bytes"]
+
+        if report["reclaimed_bytes"]:
+            logger.info(
+                f"Retention reclaimed {report['reclaimed_bytes']} bytes "
+                f"({len(report['evicted'])} outputs, {report['temp_files_removed']} temp files)"
+            )
+
+        return report
+
+    def _enforce(self) -> Dict[str, Any]:
+        """Apply age expiry, quota eviction and temp sweeping (runs in a worker thread)"""
+        start_time = time.time()
+        self._load_index()
+
+        evicted: List[Dict[str, Any]] = []
+        reclaimed = 0
+
+        entries = self._scan_outputs()
+
+        # Age-based expiry
+        if settings.output_max_age_hours > 0:
+            cutoff = start_time - settings.output_max_age_hours * 3600
+            for entry in list(entries):
+                if entry["modified"] < cutoff and self._remove_all(entry["paths"]):
+                    entries.remove(entry)
+                    evicted.append({"filename": entry["filename"], "size": entry["size"], "reason": "age"})
+                    reclaimed += entry["size"]
+
+        # Quota eviction, least recently downloaded first
+        total_size = sum(entry["size"] for entry in entries)
+        quota = self.quota_bytes
+        if quota and total_size > quota:
+            entries.sort(key=lambda entry: entry["last_access"])
+            for entry in entries:
+                if total_size <= quota:
+                    break
+                if self._remove_all(entry["paths"]):
+                    total_size -= entry["size"]
+                    evicted.append({"filename": entry["filename"], "size": entry["size"], "reason": "quota"})
+                    reclaimed += entry["size"]
+
+        # Orphaned temp files
+        temp_removed, temp_reclaimed = self._sweep_temp(start_time)
+        reclaimed += temp_reclaimed
+
+        # Job records whose outputs are all gone
+        jobs_removed = self._sweep_jobs(start_time)
+
+        for item in evicted:
+            self.forget(item["filename"])
+        self._save_index()
+
+        return {
+            "timestamp": start_time,
+            "duration": time.time() - start_time,
+            "evicted": evicted,
+            "temp_files_removed": temp_removed,
+            "jobs_removed": jobs_removed,
+            "reclaimed_bytes": reclaimed,
+            "usage_bytes": total_size,
+            "quota_bytes": quota,
+        }
+
+    def _scan_outputs(self) -> List[Dict[str, Any]]:
+        """Collect size and access information for every stored output
+
+        Precompressed sidecars are grouped with the output they belong to so
+        that they are evicted together.
+        """
+        if not self.models_dir.exists():
+            return []
+
+        entries: Dict[str, Dict[str, Any]] = {}
+        for file_path in self.models_dir.iterdir():
+            try:
+                if not file_path.is_file():
+                    continue
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+
+            filename = file_path.stem if is_sidecar(file_path.name) else file_path.name
+            entry = entries.setdefault(filename, {
+                "filename": filename,
+                "paths": [],
+                "size": 0,
+                "modified": stat.st_mtime,
+            })
+            entry["paths"].append(file_path)
+            entry["size"] += stat.st_size
+            entry["modified"] = max(entry["modified"], stat.st_mtime)
+
+        for entry in entries.values():
+            entry["last_access"] = self._last_access.get(entry["filename"], entry["modified"])
+
+        return list(entries.values())
+
+    def _sweep_temp(self, now: float) -> Tuple[int, int]:
+        """Remove temp files older than the configured age"""
+        if not self.temp_dir.exists() or settings.temp_max_age_minutes <= 0:
+            return 0, 0
+
+        cutoff = now - settings.temp_max_age_minutes * 60
+        removed = 0
+        reclaimed = 0
+        for file_path in self.temp_dir.iterdir():
+            if file_path.name.startswith("."):
+                continue  # Keep placeholders such as .gitkeep
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            if file_path.is_file() and stat.st_mtime < cutoff and self._remove(file_path):
+                removed += 1
+                reclaimed += stat.st_size
+
+        return removed, reclaimed
+
+    def _sweep_jobs(self, now: float) -> int:
+        """Remove job directories once none of their outputs remain
+
+        Running jobs (a batch writes its manifest before any item finishes)
+        and jobs updated within TEMP_MAX_AGE_MINUTES are left alone.
+        """
+        if not self.jobs_dir.exists():
+            return 0
+
+        cutoff = now - max(settings.temp_max_age_minutes, 0) * 60
+        removed = 0
+        for job_dir in self.jobs_dir.iterdir():
+            if not job_dir.is_dir():
+                continue
+            try:
+                job = storage_service.get_job(job_dir.name)
+            except (OSError, ValueError):
+                continue
+            if job is None or job.get("status") == "running":
+                continue
+            if job.get("updated", job.get("created", 0)) > cutoff:
+                continue
+            if any(storage_service.locate(name) is not None for name in job.get("files", [])):
+                continue
+
+            shutil.rmtree(job_dir, ignore_errors=True)
+            removed += 1
+
+        return removed
+
+    @classmethod
+    def _remove_all(cls, paths: List[Path]) -> bool:
+        """Unlink an output and its sidecars"""
+        removed = [cls._remove(path) for path in paths]
+        return any(removed)
+
+    @staticmethod
+    def _remove(file_path: Path) -> bool:
+        """Unlink a file, tolerating concurrent deletion"""
+        try:
+            file_path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Failed to remove {file_path}: {e}")
+            return False
+
+    def _load_index(self) -> None:
+        """Load persisted download times once so LRU order survives restarts"""
+        if self._index_loaded:
+            return
+        self._index_loaded = True
+
+        try:
+            persisted = json.loads(self.index_path.read_text())
+            for filename, accessed in persisted.items():
+                # In-memory touches since startup are newer than the persisted ones
+                self._last_access.setdefault(filename, float(accessed))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable retention index: {e}")
+
+    def _save_index(self) -> None:
+        """Persist download times"""
+        try:
+            self.index_path.write_text(json.dumps(dict(self._last_access)))
+        except OSError as e:
+            logger.warning(f"Failed to save retention index: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get retention configuration and statistics"""
+        return {
+            "enabled": settings.retention_enabled,
+            "running": self._task is not None and not self._task.done(),
+            "quota_bytes": self.quota_bytes,
+            "max_age_hours": settings.output_max_age_hours,
+            "temp_max_age_minutes": settings.temp_max_age_minutes,
+            "interval_seconds": settings.retention_interval_seconds,
+            "last_run": self.last_run,
+            "totals": dict(self.totals),
+        }
+
+
+# Global retention service instance
+retention_service = RetentionService()
@@ -0,0 +1,117 @@
+"""
+Inference slot scheduling: first-come-first-served or shortest expected job first
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Orders in which queued jobs get a free inference slot
+SCHEDULER_POLICIES = ("fifo", "sjf")
+
+
+class _Waiter:
+    def __init__(self, sequence: int, cost: float, future: asyncio.Future):
+        self.sequence = sequence
+        self.cost = cost
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class InferenceScheduler:
+    """A fixed number of inference slots handed to queued jobs in policy order
+
+    With ``sjf`` the waiting job with the lowest predicted service time goes
+    next, less ``aging`` seconds of credit per second it has waited, so long
+    jobs are delayed but never starved. Predicted times also give the
+    expected queueing delay for ETAs and Retry-After values.
+    """
+
+    def __init__(self, slots: int, policy: str = "fifo", aging: float = 1.0):
+        if policy not in SCHEDULER_POLICIES:
+            raise ValueError(f"Unknown scheduler policy: {policy}")
+        self.slots = max(1, slots)
+        self.policy = policy
+        self.aging = aging
+        self._waiters: List[_Waiter] = []
+        self._running: Dict[int, Dict[str, float]] = {}
+        self._sequence = itertools.count()
+
+    def _priority(self, waiter: _Waiter, now: float) -> Any:
+        if self.policy == "sjf":
+            return (waiter.cost - self.aging * (now - waiter.queued_at), waiter.sequence)
+        return waiter.sequence
+
+    def _wake_next(self) -> None:
+        """Hand free slots to the highest-priority waiters"""
+        now = time.monotonic()
+        while self._waiters and len(self._running) < self.slots:
+            waiter = min(self._waiters, key=lambda w: self._priority(w, now))
+            self._waiters.remove(waiter)
+            self._running[waiter.sequence] = {"cost": waiter.cost, "started": now}
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, cost: float = 0.0) -> AsyncIterator[None]:
+        """Hold an inference slot; ``cost`` is the job's predicted service time"""
+        sequence = next(self._sequence)
+
+        if len(self._running) < self.slots and not self._waiters:
+            self._running[sequence] = {"cost": cost, "started": time.monotonic()}
+        else:
+            waiter = _Waiter(sequence, cost, asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # Woken and cancelled in the same tick: pass the slot on
+                    self._running.pop(sequence, None)
+                    self._wake_next()
+                raise
+
+        try:
+            yield
+        finally:
+            self._running.pop(sequence, None)
+            self._wake_next()
+
+    def _remaining(self, now: float) -> List[float]:
+        return [max(job["cost"] - (now - job["started"]), 0.0) for job in self._running.values()]
+
+    def expected_wait(self, cost: Optional[float] = None) -> float:
+        """Predicted queueing delay of a job arriving now
+
+        Work ahead is the remaining time of running jobs plus queued jobs that
+        would be served first (all of them for fifo; shorter ones for sjf),
+        shared across the slots.
+        """
+        now = time.monotonic()
+        remaining = self._remaining(now)
+        if len(remaining) < self.slots and not self._waiters:
+            return 0.0
+
+        ahead = [
+            waiter.cost for waiter in self._waiters
+            if self.policy == "fifo" or cost is None or waiter.cost <= cost
+        ]
+        return (sum(remaining) + sum(ahead)) / self.slots
+
+    def drain_time(self) -> float:
+        """Predicted time until everything running and queued has finished"""
+        now = time.monotonic()
+        work = sum(self._remaining(now)) + sum(waiter.cost for waiter in self._waiters)
+        return work / self.slots
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "slots": self.slots,
+            "running": len(self._running),
+            "queued": len(self._waiters),
+            "drain_time": round(self.drain_time(), 3),
+        }
@@ -0,0 +1,457 @@
+"""
+Storage service for non-blocking, atomic writes of generated outputs
+"""
+
+import asyncio
+import io
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+
+from ..compression import (
+    ENCODING_SUFFIXES,
+    StreamDecompressor,
+    compress,
+    is_available,
+    is_compressible,
+    negotiate,
+    zstd_content_size,
+)
+from ..config import settings
+from .metrics_service import metrics_service
+from .profiling import SamplingProfiler
+from .tracing import Trace, span
+
+logger = logging.getLogger(__name__)
+
+# Valid values for settings.output_fsync_policy
+FSYNC_POLICIES = ("none", "file", "always")
+
+# Profile format -> (file name in the job directory, media type)
+PROFILE_FORMATS = {
+    "speedscope": ("profile.speedscope.json", "application/json"),
+    "collapsed": ("profile.collapsed.txt", "text/plain"),
+}
+
+# Media types of stored outputs by extension
+MEDIA_TYPES = {
+    ".glb": "model/gltf-binary",
+    ".obj": "model/obj",
+    ".stl": "model/stl",
+    ".ply": "application/x-ply",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+}
+
+
+def media_type_for(filename: str) -> str:
+    """Get the media type of a stored output"""
+    return MEDIA_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream")
+
+
+def is_valid_filename(filename: str) -> bool:
+    """Check that a filename cannot escape the output directory"""
+    return bool(filename) and not (".." in filename or "/" in filename or "\\" in filename)
+
+
+def is_valid_job_id(job_id: str) -> bool:
+    """Check that a job ID is a plain token"""
+    return bool(re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id or ""))
+
+
+def is_sidecar(filename: str) -> bool:
+    """Check whether a file is a precompressed copy of another output"""
+    path = Path(filename)
+    return (
+        path.suffix.lower() in ENCODING_SUFFIXES.values()
+        and Path(path.stem).suffix.lower() in MEDIA_TYPES
+    )
+
+
+class StorageService:
+    """Service for storing generated outputs without blocking the event loop"""
+
+    def __init__(self):
+        self.models_dir = Path(settings.output_dir) / "models"
+        self.temp_dir = Path(settings.output_dir) / "temp"
+        self.jobs_dir = Path(settings.output_dir) / "jobs"
+        self.chunk_size = 1024 * 1024
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    def output_path(self, filename: str) -> Path:
+        """Get the final path of a stored output"""
+        return self.models_dir / filename
+
+    async def write_output(self, filename: str, data: bytes) -> Dict[str, Any]:
+        """Atomically write an output file and return its size and write latency
+
+        The bytes are streamed to a temporary file under ``output/temp`` and
+        renamed into ``output/models`` only once complete, so a crash
+        mid-write never leaves a truncated file in the listing. Orphaned
+        temporary files are swept by the retention service.
+
+        Formats listed in ``OUTPUT_COMPRESS_FORMATS`` are stored zstd
+        compressed as ``<filename>.zst`` when ``OUTPUT_COMPRESS_AT_REST`` is on.
+        """
+
+        with span("output_write", filename=filename):
+            return await self._write_output(filename, data)
+
+    async def _write_output(self, filename: str, data: bytes) -> Dict[str, Any]:
+        """Compress if configured, then write via a temporary file and rename"""
+
+        start_time = time.time()
+        policy = settings.output_fsync_policy
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid output fsync policy: {policy}")
+
+        logical_size = len(data)
+        encoding = None
+        if self.should_compress_at_rest(filename):
+            encoding = "zstd"
+            data = await asyncio.to_thread(
+                compress, data, encoding, settings.output_compression_level
+            )
+
+        stored_name = filename + ENCODING_SUFFIXES[encoding] if encoding else filename
+        final_path = self.output_path(stored_name)
+        tmp_path = self.temp_dir / f"{uuid.uuid4().hex}_{stored_name}.partial"
+
+        await aiofiles.os.makedirs(self.models_dir, exist_ok=True)
+        await aiofiles.os.makedirs(self.temp_dir, exist_ok=True)
+
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                view = memoryview(data)
+                for offset in range(0, len(view), self.chunk_size):
+                    await f.write(view[offset:offset + self.chunk_size])
+
+                if policy != "none":
+                    await f.flush()
+                    await asyncio.to_thread(os.fsync, f.fileno())
+
+            await aiofiles.os.replace(tmp_path, final_path)
+
+            if policy == "always":
+                # Persist the rename itself
+                await asyncio.to_thread(self._fsync_directory, self.models_dir)
+
+        except Exception as e:
+            logger.error(f"Failed to write output {filename}: {e}")
+            try:
+                await aiofiles.os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        if encoding is None and settings.output_precompress and is_compressible(media_type_for(filename)):
+            # Precompress off the request path; downloads fall back to the raw file meanwhile
+            task = asyncio.create_task(asyncio.to_thread(self._write_sidecars, final_path, data))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+        return {
+            "path": final_path,
+            "size": logical_size,
+            "stored_size": len(data),
+            "encoding": encoding,
+            "write_time": time.time() - start_time,
+        }
+
+    def should_compress_at_rest(self, filename: str) -> bool:
+        """Check whether an output is stored compressed"""
+        return (
+            settings.output_compress_at_rest
+            and is_available("zstd")
+            and Path(filename).suffix.lower() in settings.compress_at_rest_extensions
+        )
+
+    def locate(self, filename: str) -> Optional[Tuple[Path, Optional[str]]]:
+        """Find the stored file for an output and its at-rest encoding
+
+        Returns ``(path, None)`` for outputs stored raw and ``(path, "zstd")``
+        for outputs stored compressed, or ``None`` if the output does not exist.
+        """
+        raw_path = self.output_path(filename)
+        if raw_path.is_file():
+            return raw_path, None
+
+        compressed_path = self.output_path(filename + ENCODING_SUFFIXES["zstd"])
+        if compressed_path.is_file():
+            return compressed_path, "zstd"
+
+        return None
+
+    def logical_size(self, path: Path, encoding: Optional[str]) -> Optional[int]:
+        """Get the uncompressed size of a stored output"""
+        if encoding is None:
+            return path.stat().st_size
+
+        with open(path, "rb") as f:
+            return zstd_content_size(f.read(18))
+
+    def iter_decompressed(self, path: Path, encoding: str) -> Iterator[bytes]:
+        """Stream-decompress a stored output in fixed-size chunks"""
+        decompressor = StreamDecompressor(encoding)
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+
+    def list_outputs(self) -> List[Dict[str, Any]]:
+        """List stored outputs with their stored and logical sizes"""
+        if not self.models_dir.exists():
+            return []
+
+        files = []
+        for file_path in self.models_dir.iterdir():
+            if not file_path.is_file():
+                continue
+
+            encoding = None
+            filename = file_path.name
+            if is_sidecar(filename):
+                filename = file_path.stem
+                if self.output_path(filename).is_file():
+                    continue  # Precompressed copy of a raw output
+                if file_path.suffix != ENCODING_SUFFIXES["zstd"]:
+                    continue
+                encoding = "zstd"
+
+            try:
+                stat = file_path.stat()
+                size = self.logical_size(file_path, encoding)
+            except FileNotFoundError:
+                continue
+
+            files.append({
+                "filename": filename,
+                "size": size,
+                "stored_size": stat.st_size,
+                "encoding": encoding,
+                "created": stat.st_ctime,
+                "modified": stat.st_mtime,
+                "extension": Path(filename).suffix.lower()
+            })
+
+        return files
+
+    def _write_sidecars(self, final_path: Path, data: bytes) -> None:
+        """Write precompressed sidecar copies of an output (runs in a worker thread)"""
+        for encoding in settings.compression_preferences:
+            if encoding not in ENCODING_SUFFIXES or not is_available(encoding):
+                continue
+
+            sidecar_path = final_path.with_name(final_path.name + ENCODING_SUFFIXES[encoding])
+            tmp_path = self.temp_dir / f"{uuid.uuid4().hex}_{sidecar_path.name}.partial"
+            try:
+                tmp_path.write_bytes(compress(data, encoding))
+                os.replace(tmp_path, sidecar_path)
+            except Exception as e:
+                logger.warning(f"Failed to precompress {final_path.name} as {encoding}: {e}")
+                tmp_path.unlink(missing_ok=True)
+
+    def find_sidecar(self, filename: str, accept_encoding: Optional[str]) -> Optional[Tuple[Path, str]]:
+        """Find a precompressed copy of an output the client can accept"""
+        if not accept_encoding:
+            return None
+
+        candidates = [
+            encoding for encoding in settings.compression_preferences
+            if encoding in ENCODING_SUFFIXES
+            and self.output_path(filename + ENCODING_SUFFIXES[encoding]).is_file()
+        ]
+        encoding = negotiate(accept_encoding, candidates)
+        if is_compressible(media_type_for(filename)):
+            metrics_service.record_cache("sidecar", hit=encoding is not None)
+        if encoding is None:
+            return None
+
+        return self.output_path(filename + ENCODING_SUFFIXES[encoding]), encoding
+
+    @staticmethod
+    def new_job_id() -> str:
+        """Create an identifier grouping the outputs of one request or batch"""
+        return uuid.uuid4().hex
+
+    def job_dir(self, job_id: str) -> Path:
+        """Get the directory holding a job's manifest and diagnostics"""
+        return self.jobs_dir / job_id
+
+    async def record_job(self, job_id: str, filenames: List[str], info: Optional[Dict[str, Any]] = None) -> None:
+        """Record which outputs belong to a job, appending to an existing manifest"""
+        await asyncio.to_thread(self._record_job, job_id, filenames, info or {})
+
+    def _record_job(self, job_id: str, filenames: List[str], info: Dict[str, Any]) -> None:
+        """Write a job manifest atomically (runs in a worker thread)"""
+        manifest = self.get_job(job_id) or {"job_id": job_id, "created": time.time(), "files": []}
+        manifest["files"].extend(name for name in filenames if name not in manifest["files"])
+        manifest.update(info)
+        manifest["updated"] = time.time()
+        self._write_job_file(job_id, "manifest.json", json.dumps(manifest, default=str))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job manifest"""
+        try:
+            return json.loads((self.job_dir(job_id) / "manifest.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    async def save_trace(self, trace: Trace) -> None:
+        """Persist a job's trace as Chrome/Perfetto trace-event JSON"""
+        if not settings.tracing_enabled:
+            return
+        await asyncio.to_thread(self._write_job_file, trace.job_id, "trace.json", json.dumps(trace.to_chrome()))
+
+    def get_trace(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job's stored trace"""
+        try:
+            return json.loads((self.job_dir(job_id) / "trace.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    async def save_profile(self, profiler: SamplingProfiler) -> None:
+        """Persist a job's profile in every supported format"""
+        await asyncio.to_thread(self._save_profile, profiler)
+
+    def _save_profile(self, profiler: SamplingProfiler) -> None:
+        speedscope_name = PROFILE_FORMATS["speedscope"][0]
+        collapsed_name = PROFILE_FORMATS["collapsed"][0]
+        self._write_job_file(profiler.job_id, speedscope_name, json.dumps(profiler.to_speedscope()))
+        self._write_job_file(profiler.job_id, collapsed_name, profiler.to_collapsed())
+
+    def get_profile_path(self, job_id: str, profile_format: str) -> Optional[Path]:
+        """Locate a job's stored profile"""
+        path = self.job_dir(job_id) / PROFILE_FORMATS[profile_format][0]
+        return path if path.exists() else None
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """List jobs that have a stored profile, newest first"""
+        profiles = []
+        speedscope_name = PROFILE_FORMATS["speedscope"][0]
+        if not self.jobs_dir.exists():
+            return profiles
+
+        for profile_path in self.jobs_dir.glob(f"*/{speedscope_name}"):
+            job_id = profile_path.parent.name
+            job = self.get_job(job_id) or {}
+            profiles.append({
+                "job_id": job_id,
+                "route": job.get("route"),
+                "created": profile_path.stat().st_mtime,
+                "size": profile_path.stat().st_size,
+                **job.get("profile", {}),
+            })
+
+        profiles.sort(key=lambda profile: profile["created"], reverse=True)
+        return profiles
+
+    def _write_job_file(self, job_id: str, name: str, content: str) -> None:
+        """Atomically write a file into a job directory (runs in a worker thread)"""
+        job_dir = self.job_dir(job_id)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = job_dir / f"{name}.{uuid.uuid4().hex}.partial"
+        tmp_path.write_text(content)
+        os.replace(tmp_path, job_dir / name)
+
+    def iter_bundle(self, filenames: List[str]) -> Iterator[bytes]:
+        """Stream a ZIP archive of outputs without building it in memory or on disk
+
+        Already-compressed media (PNG, JPEG, GLB) are stored as-is and text
+        formats are deflated. Outputs stored compressed at rest are
+        decompressed on the fly, so memory stays bounded by the chunk size
+        regardless of the bundle size.
+        """
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, mode="w", allowZip64=True) as archive:
+            for filename in filenames:
+                stored = self.locate(filename)
+                if stored is None:
+                    continue
+                path, encoding = stored
+
+                stat = path.stat()
+                entry = zipfile.ZipInfo(filename, date_time=time.localtime(stat.st_mtime)[:6])
+                entry.compress_type = (
+                    zipfile.ZIP_DEFLATED if is_compressible(media_type_for(filename)) else zipfile.ZIP_STORED
+                )
+                size = self.logical_size(path, encoding)
+                entry.file_size = size or 0
+
+                chunks = self.iter_decompressed(path, encoding) if encoding else self._iter_file(path)
+                with archive.open(entry, mode="w", force_zip64=size is None) as member:
+                    for chunk in chunks:
+                        member.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+
+                data = sink.drain()
+                if data:
+                    yield data
+
+        data = sink.drain()
+        if data:
+            yield data
+
+    def _iter_file(self, path: Path) -> Iterator[bytes]:
+        """Read a file in fixed-size chunks"""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def remove_sidecars(self, filename: str) -> None:
+        """Delete precompressed copies of an output"""
+        for suffix in ENCODING_SUFFIXES.values():
+            self.output_path(filename + suffix).unlink(missing_ok=True)
+
+    @staticmethod
+    def _fsync_directory(directory: Path) -> None:
+        """Flush directory entries to disk"""
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target that hands ZIP output back to a generator"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        """Take everything written since the last drain"""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Global storage service instance
+storage_service = StorageService()
@@ -0,0 +1,124 @@
+"""
+Lightweight per-request span tracing with Chrome/Perfetto trace-event export
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from .metrics_service import metrics_service
+from .profiling import profiled_thread
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while handling one job
+
+    Spans opened in worker threads started with ``asyncio.to_thread`` land in
+    the same trace because the context is copied into the thread.
+    """
+
+    def __init__(self, job_id: str, name: str = "request"):
+        self.job_id = job_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.end: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.timings: Dict[str, float] = {}
+        self.args: Dict[str, Any] = {}
+
+    def add_span(self, name: str, start: float, duration: float, args: Optional[Dict[str, Any]] = None) -> None:
+        """Record a completed span (start is a perf_counter timestamp)"""
+        self.spans.append({
+            "name": name,
+            "start": start,
+            "duration": duration,
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def finish(self) -> None:
+        """Mark the end of the job"""
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Total time per stage name, in seconds"""
+        return dict(self.timings)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Export as Chrome/Perfetto trace-event JSON (load in ui.perfetto.dev)"""
+        pid = os.getpid()
+        main_tid = self.spans[0]["tid"] if self.spans else threading.get_ident()
+
+        def micros(timestamp: float) -> float:
+            return round((timestamp - self.start) * 1e6, 3)
+
+        events = [{
+            "name": self.name,
+            "cat": "job",
+            "ph": "X",
+            "ts": 0,
+            "dur": round(self.duration * 1e6, 3),
+            "pid": pid,
+            "tid": main_tid,
+            "args": {"job_id": self.job_id, **self.args},
+        }]
+        for span_info in self.spans:
+            events.append({
+                "name": span_info["name"],
+                "cat": "stage",
+                "ph": "X",
+                "ts": micros(span_info["start"]),
+                "dur": round(span_info["duration"] * 1e6, 3),
+                "pid": pid,
+                "tid": span_info["tid"],
+                "args": span_info["args"],
+            })
+
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "job_id": self.job_id,
+                "started_at": self.wall_start,
+                "stage_timings": self.stage_timings(),
+            },
+        }
+
+
+def start_trace(job_id: str, name: str = "request") -> Trace:
+    """Start a trace and make it current for the rest of this task"""
+    trace = Trace(job_id, name)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    """Get the trace of the job being handled, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Time a stage, recording it in the current trace and the stage latency histogram"""
+    start = time.perf_counter()
+    try:
+        with profiled_thread():
+            yield
+    finally:
+        duration = time.perf_counter() - start
+        metrics_service.observe_stage(name, duration)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, start, duration, args)
@@ -0,0 +1,247 @@
+"""
+Cache-first model weight resolution, manifest verification and parallel component loading
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Verification levels for local snapshots
+VERIFY_MODES = ("none", "size", "hash")
+
+# Variant weights (model.fp16.safetensors, ...) are skipped; the default weights are loaded and cast
+IGNORE_PATTERNS = ["*.*.safetensors", "*.bin", "*.ckpt", "*.msgpack", "*.onnx", "*.onnx_data"]
+
+
+def _sha256(path: Path) -> str:
+    """Hash a file through a memory map (the digest releases the GIL on large buffers)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            digest.update(mapped)
+    return digest.hexdigest()
+
+
+class WeightLoader:
+    """Resolves model snapshots from the local cache before the network
+
+    A snapshot found in ``cache_dir`` is used without any hub request and is
+    checked against a manifest of file sizes and SHA-256 digests written the
+    first time it is seen. Files that fail verification are re-downloaded.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        verify: str = "size",
+        workers: int = 4,
+        allow_download: bool = True,
+        token: Optional[str] = None,
+    ):
+        if verify not in VERIFY_MODES:
+            raise ValueError(f"Unknown verify mode: {verify}")
+        self.cache_dir = Path(cache_dir)
+        self.verify_mode = verify
+        self.workers = max(1, workers)
+        self.allow_download = allow_download
+        self.token = token
+        self.manifest_dir = self.cache_dir / "manifests"
+
+    def resolve(self, repo_id: str) -> Dict[str, Any]:
+        """Locate (or download) a diffusers snapshot and verify it, returning a load report"""
+        from huggingface_hub import snapshot_download
+
+        start = time.perf_counter()
+        source = "local"
+        try:
+            path = snapshot_download(
+                repo_id, cache_dir=str(self.cache_dir), local_files_only=True, ignore_patterns=IGNORE_PATTERNS
+            )
+        except Exception:
+            if not self.allow_download:
+                raise FileNotFoundError(f"{repo_id} is not in {self.cache_dir} and downloads are disabled")
+            logger.info(f"{repo_id} not cached locally, downloading...")
+            path = self._download(repo_id)
+            source = "download"
+
+        report = {
+            "repo_id": repo_id,
+            "path": path,
+            "revision": Path(path).name,
+            "source": source,
+        }
+        report["verify"] = self.verify(repo_id, Path(path))
+
+        if report["verify"]["status"] == "failed":
+            if not self.allow_download:
+                raise RuntimeError(
+                    f"{repo_id} failed verification ({len(report['verify']['mismatched'])} files) "
+                    "and downloads are disabled"
+                )
+            self._repair(repo_id, report["revision"], report["verify"]["mismatched"])
+            report["verify"] = self.verify(repo_id, Path(path), rebuild=True)
+            report["source"] = "repaired"
+
+        report["resolve_seconds"] = time.perf_counter() - start
+        return report
+
+    def _download(self, repo_id: str, revision: Optional[str] = None) -> str:
+        """Download only the files a diffusers pipeline needs"""
+        from huggingface_hub import hf_hub_download, snapshot_download
+
+        # Fetch the index first so only the listed components are downloaded
+        index_path = hf_hub_download(
+            repo_id, "model_index.json", revision=revision, cache_dir=str(self.cache_dir), token=self.token
+        )
+        components = self._components(Path(index_path).parent)
+        allow_patterns = ["model_index.json"] + [
+            f"{name}/*.{extension}" for name in components for extension in ("json", "txt", "safetensors")
+        ]
+        return snapshot_download(
+            repo_id,
+            revision=revision,
+            cache_dir=str(self.cache_dir),
+            allow_patterns=allow_patterns,
+            ignore_patterns=IGNORE_PATTERNS,
+            token=self.token,
+        )
+
+    def _repair(self, repo_id: str, revision: str, filenames: List[str]) -> None:
+        """Re-download files that failed verification"""
+        from huggingface_hub import hf_hub_download
+
+        logger.warning(f"Re-downloading {len(filenames)} files of {repo_id} that failed verification")
+        for filename in filenames:
+            hf_hub_download(
+                repo_id, filename, revision=revision, cache_dir=str(self.cache_dir),
+                token=self.token, force_download=True,
+            )
+
+    def _manifest_path(self, repo_id: str, revision: str) -> Path:
+        return self.manifest_dir / f"{repo_id.replace('/', '--')}@{revision}.json"
+
+    def _scan(self, path: Path) -> Dict[str, int]:
+        """Relative path -> size of every file in a snapshot (following cache symlinks)"""
+        files = {}
+        for file_path in sorted(path.rglob("*")):
+            if file_path.is_file():
+                files[file_path.relative_to(path).as_posix()] = file_path.stat().st_size
+        return files
+
+    def _hash_all(self, path: Path, names: List[str]) -> Dict[str, str]:
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            digests = pool.map(lambda name: _sha256(path / name), names)
+            return dict(zip(names, digests))
+
+    def verify(self, repo_id: str, path: Path, rebuild: bool = False) -> Dict[str, Any]:
+        """Check a snapshot against its manifest, writing the manifest on first sight"""
+        start = time.perf_counter()
+        manifest_path = self._manifest_path(repo_id, path.name)
+        sizes = self._scan(path)
+
+        if rebuild or not manifest_path.exists():
+            digests = self._hash_all(path, list(sizes))
+            manifest = {
+                "repo_id": repo_id,
+                "revision": path.name,
+                "created": time.time(),
+                "files": {name: {"size": size, "sha256": digests[name]} for name, size in sizes.items()},
+            }
+            self.manifest_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = manifest_path.with_suffix(".partial")
+            tmp_path.write_text(json.dumps(manifest, indent=2))
+            os.replace(tmp_path, manifest_path)
+            return self._verify_report("created", sizes, [], start)
+
+        if self.verify_mode == "none":
+            return self._verify_report("skipped", sizes, [], start)
+
+        expected = json.loads(manifest_path.read_text())["files"]
+        mismatched = [
+            name for name, entry in expected.items()
+            if sizes.get(name) != entry["size"]
+        ]
+
+        if self.verify_mode == "hash":
+            candidates = [name for name in expected if name not in mismatched]
+            digests = self._hash_all(path, candidates)
+            mismatched.extend(name for name in candidates if digests[name] != expected[name]["sha256"])
+
+        return self._verify_report("failed" if mismatched else "ok", sizes, sorted(mismatched), start)
+
+    def _verify_report(self, status: str, sizes: Dict[str, int], mismatched: List[str], start: float) -> Dict[str, Any]:
+        return {
+            "status": status,
+            "mode": self.verify_mode,
+            "files": len(sizes),
+            "bytes": sum(sizes.values()),
+            "mismatched": mismatched,
+            "seconds": time.perf_counter() - start,
+        }
+
+    @staticmethod
+    def _components(path: Path) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Pipeline component name -> (library, class name) from model_index.json"""
+        index = json.loads((path / "model_index.json").read_text())
+        return {
+            name: (value[0], value[1])
+            for name, value in index.items()
+            if not name.startswith("_") and isinstance(value, list) and len(value) == 2
+        }
+
+    def load_pipeline(self, pipeline_cls: Any, path: str, torch_dtype: Any) -> Tuple[Any, Dict[str, float]]:
+        """Load a diffusers pipeline's components concurrently from a local snapshot
+
+        Weights come from safetensors files, which are memory-mapped rather
+        than read into an intermediate buffer, and ``low_cpu_mem_usage``
+        avoids materializing randomly initialized modules first.
+        """
+        import torch
+
+        components = self._components(Path(path))
+
+        def load_component(name: str, library: Optional[str], class_name: Optional[str]) -> Tuple[Any, float]:
+            if library is None or class_name is None:
+                return None, 0.0
+
+            start = time.perf_counter()
+            component_cls = getattr(importlib.import_module(library), class_name)
+            kwargs: Dict[str, Any] = {"subfolder": name}
+            if isinstance(component_cls, type) and issubclass(component_cls, torch.nn.Module):
+                kwargs.update(torch_dtype=torch_dtype, use_safetensors=True, low_cpu_mem_usage=True)
+            component = component_cls.from_pretrained(path, **kwargs)
+            return component, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                name: pool.submit(load_component, name, library, class_name)
+                for name, (library, class_name) in components.items()
+            }
+            loaded = {name: future.result() for name, future in futures.items()}
+
+        pipeline = pipeline_cls(**{name: component for name, (component, _) in loaded.items()})
+        return pipeline, {name: seconds for name, (component, seconds) in loaded.items() if component is not None}
+
+
+def create_weight_loader() -> WeightLoader:
+    """Create a weight loader from settings"""
+    return WeightLoader(
+        settings.model_cache_dir,
+        verify=settings.model_verify,
+        workers=settings.model_load_workers,
+        allow_download=settings.model_allow_download,
+        token=settings.hf_token,
+    )
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the Step1X-3D backend
+"""
@@ -0,0 +1,287 @@
+"""
+HTTP load generation against the backend API
+
+Runs open-loop (Poisson arrivals at a fixed offered rate) or closed-loop
+(a fixed number of clients issuing requests back to back) traffic and prints
+throughput and latency percentiles as JSON.
+
+Without --url the app is served in-process with the CPU stub inference
+backend, so API overhead and queueing can be measured without GPUs:
+
+    python -m benchmarks.load_test --scenario text-to-image --mode closed --concurrency 8 --duration 30
+    python -m benchmarks.load_test --scenario generate-3d --mode open --rate 20 --duration 30
+    python -m benchmarks.load_test --url http://gpu-host:8000 --scenario convert-mesh --mode open --rate 5
+
+Open-loop latencies are measured from each request's scheduled send time,
+so a server that falls behind is charged for the queueing it causes.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("text-to-image", "generate-3d", "convert-mesh", "health")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_request(scenario: str, args: argparse.Namespace) -> Callable[[], Dict[str, Any]]:
+    """Return a factory for httpx request keyword arguments"""
+    if scenario == "health":
+        return lambda: {"method": "GET", "url": "/health/"}
+
+    if scenario == "text-to-image":
+        data = {
+            "prompt": "a red ceramic teapot, studio lighting",
+            "width": str(args.width),
+            "height": str(args.height),
+            "num_inference_steps": str(args.steps),
+        }
+        return lambda: {"method": "POST", "url": "/api/v1/text-to-image", "data": data}
+
+    if scenario == "generate-3d":
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (args.width, args.height), (200, 80, 40)).save(buffer, format="PNG")
+        image_bytes = buffer.getvalue()
+        data = {"mode": "geometry", "num_steps": str(max(args.steps, 10))}
+        return lambda: {
+            "method": "POST",
+            "url": "/api/v1/generate-3d",
+            "data": data,
+            "files": {"image": ("input.png", image_bytes, "image/png")},
+        }
+
+    if scenario == "convert-mesh":
+        import trimesh
+
+        mesh_bytes = trimesh.creation.icosphere(subdivisions=args.mesh_subdivisions).export(file_type="obj").encode()
+        data = {"target_format": args.target_format}
+        return lambda: {
+            "method": "POST",
+            "url": "/api/v1/convert-mesh",
+            "data": data,
+            "files": {"file": ("input.obj", mesh_bytes, "model/obj")},
+        }
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+class Recorder:
+    """Collects per-request outcomes"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, latency: float, status: Optional[int], error: Optional[str] = None) -> None:
+        key = str(status) if status is not None else "error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        elif status is not None and status < 400:
+            self.latencies.append(latency)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        total = sum(self.statuses.values())
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "requests": total,
+            "succeeded": len(latencies),
+            "failed": total - len(latencies),
+            "statuses": self.statuses,
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed > 0 else None,
+            "latency_ms": {
+                "mean": ms(sum(latencies) / len(latencies)) if latencies else None,
+                "min": ms(latencies[0]) if latencies else None,
+                "p50": ms(percentile(latencies, 0.50)),
+                "p95": ms(percentile(latencies, 0.95)),
+                "p99": ms(percentile(latencies, 0.99)),
+                "max": ms(latencies[-1]) if latencies else None,
+            },
+        }
+
+
+async def send(client: httpx.AsyncClient, make_request, recorder: Recorder, started: float) -> None:
+    """Issue one request and record its latency from the given start time"""
+    try:
+        response = await client.request(**make_request())
+        recorder.record(time.perf_counter() - started, response.status_code)
+    except Exception as e:
+        recorder.record(time.perf_counter() - started, None, type(e).__name__)
+
+
+async def run_closed_loop(client, make_request, args) -> Dict[str, Any]:
+    """Each of N clients sends its next request as soon as the previous one completes"""
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests] if args.requests else None
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            await send(client, make_request, recorder, time.perf_counter())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return recorder.summary(time.perf_counter() - started)
+
+
+async def run_open_loop(client, make_request, args) -> Dict[str, Any]:
+    """Send requests on a Poisson schedule regardless of how fast responses come back"""
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    tasks = []
+
+    started = time.perf_counter()
+    next_send = started
+    while next_send - started < args.duration:
+        if args.requests and len(tasks) >= args.requests:
+            break
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, make_request, recorder, next_send)))
+        next_send += rng.expovariate(args.rate) if args.arrivals == "poisson" else 1.0 / args.rate
+
+    sending_time = time.perf_counter() - started
+    await asyncio.gather(*tasks)
+    result = recorder.summary(time.perf_counter() - started)
+    result["offered_rps"] = args.rate
+    result["achieved_send_rps"] = round(len(tasks) / sending_time, 3) if sending_time > 0 else None
+    return result
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    make_request = build_request(args.scenario, args)
+    timeout = httpx.Timeout(args.timeout)
+
+    async with AsyncExitStack() as stack:
+        if args.url:
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits)
+            )
+        else:
+            app = load_inprocess_app(args)
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://inprocess", timeout=timeout)
+            )
+
+        for _ in range(args.warmup):
+            await client.request(**make_request())
+
+        if args.mode == "closed":
+            result = await run_closed_loop(client, make_request, args)
+        else:
+            result = await run_open_loop(client, make_request, args)
+
+    result["config"] = {
+        "scenario": args.scenario,
+        "mode": args.mode,
+        "target": args.url or "in-process (stub backend)",
+        "duration_s": args.duration,
+        "concurrency": args.concurrency if args.mode == "closed" else None,
+        "rate_rps": args.rate if args.mode == "open" else None,
+        "arrivals": args.arrivals if args.mode == "open" else None,
+        "width": args.width,
+        "height": args.height,
+        "steps": args.steps,
+    }
+    if not args.url:
+        result["config"]["stub"] = {
+            "base_s": args.stub_base,
+            "per_step_s": args.stub_per_step,
+            "work": args.stub_work,
+        }
+    return result
+
+
+def load_inprocess_app(args: argparse.Namespace):
+    """Import the FastAPI app configured with the stub backend and a scratch output directory"""
+    output_dir = tempfile.mkdtemp(prefix="step1x3d-bench-")
+    (Path(output_dir) / "logs").mkdir()
+    os.environ.update({
+        "OUTPUT_DIR": output_dir,
+        "INFERENCE_BACKEND": "stub",
+        "STUB_LATENCY_BASE": str(args.stub_base),
+        "STUB_LATENCY_PER_STEP": str(args.stub_per_step),
+        "STUB_WORK": args.stub_work,
+        "GPU_TELEMETRY_BACKEND": "none",
+        "RETENTION_ENABLED": "False",
+        "LOG_LEVEL": "WARNING",
+    })
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    import main
+
+    return main.app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Target server; omit to serve the app in-process with the stub backend")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="text-to-image")
+    parser.add_argument("--mode", choices=("open", "closed"), default="closed")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load for")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0: no limit)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed loop: concurrent clients")
+    parser.add_argument("--rate", type=float, default=5.0, help="Open loop: offered requests per second")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests sent first")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--mesh-subdivisions", type=int, default=4)
+    parser.add_argument("--target-format", default="obj")
+    parser.add_argument("--stub-base", type=float, default=0.05, help="Stub backend fixed latency (s)")
+    parser.add_argument("--stub-per-step", type=float, default=0.005, help="Stub backend latency per step (s)")
+    parser.add_argument("--stub-work", choices=("sleep", "compute"), default="sleep")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    result = asyncio.run(run(args))
+
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
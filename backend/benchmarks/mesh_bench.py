@@ -0,0 +1,266 @@
+"""
+Microbenchmarks for the mesh pipeline on synthetic inputs
+
+Times MeshService._load_mesh (OBJ, GLB), _load_nifti_as_mesh (sphere, noise
+and multi-label volumes), export_mesh per output format, _get_mesh_info and
+convert_to_formats (one load, every format exported in parallel) at several
+input sizes. Each case records wall time over repeated runs, peak
+traced memory (from a separate tracemalloc run so tracing does not skew the
+timings) and output size, and the report is written as JSON:
+
+    python -m benchmarks.mesh_bench --output mesh.json
+    python -m benchmarks.mesh_bench --save-baseline benchmarks/baselines/mesh.json
+    python -m benchmarks.mesh_bench --baseline benchmarks/baselines/mesh.json --threshold 0.2
+
+With --baseline, cases whose median time or peak memory grew by more than
+the threshold are reported as regressions and the exit status is 1.
+Baselines are machine-specific; record them on the host that compares them.
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import trimesh
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.mesh_service import MeshService  # noqa: E402
+
+from . import synthetic  # noqa: E402
+
+EXPORT_FORMATS = ("glb", "obj", "stl", "ply")
+
+
+class Case:
+    """A named benchmark step: a callable, awaited if it returns an awaitable"""
+
+    def __init__(self, name: str, group: str, size: str, run: Callable[[], Any], **params: Any):
+        self.name = name
+        self.group = group
+        self.size = size
+        self.run = run
+        self.params = params
+
+
+async def _run(case: Case) -> Any:
+    output = case.run()
+    if inspect.isawaitable(output):
+        output = await output
+    return output
+
+
+async def measure(case: Case, repeat: int, warmup: int) -> Dict[str, Any]:
+    """Time a case and measure its peak traced memory"""
+    for _ in range(warmup):
+        await _run(case)
+
+    times: List[float] = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = await _run(case)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        await _run(case)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result: Dict[str, Any] = {
+        "group": case.group,
+        "size": case.size,
+        "params": case.params,
+        "repeat": repeat,
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "mean_s": statistics.fmean(times),
+        "stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "peak_memory_bytes": peak,
+    }
+
+    if isinstance(output, (bytes, bytearray)):
+        result["output_bytes"] = len(output)
+    elif isinstance(output, tuple) and isinstance(output[0], dict):
+        # convert_to_formats: (bytes per format, metadata)
+        result["output_bytes"] = sum(len(data) for data in output[0].values())
+    elif isinstance(output, trimesh.Trimesh):
+        result["vertices"] = len(output.vertices)
+        result["faces"] = len(output.faces)
+    return result
+
+
+def build_cases(service: MeshService, workdir: Path, sizes: List[str]) -> List[Case]:
+    """Generate inputs and the cases that exercise them"""
+    cases: List[Case] = []
+
+    for size in sizes:
+        subdivisions = synthetic.MESH_SIZES[size]
+        mesh = synthetic.sphere_mesh(subdivisions)
+
+        for file_format in ("obj", "glb"):
+            path = str(synthetic.write_mesh(workdir, subdivisions, file_format))
+            cases.append(Case(
+                f"load_mesh/{file_format}/{size}", "load_mesh", size,
+                lambda path=path, ext=f".{file_format}": service._load_mesh(path, ext),
+                format=file_format, faces=len(mesh.faces),
+            ))
+
+        for target_format in EXPORT_FORMATS:
+            cases.append(Case(
+                f"export_mesh/{target_format}/{size}", "export_mesh", size,
+                lambda mesh=mesh, target_format=target_format: service.export_mesh(mesh, target_format),
+                format=target_format, faces=len(mesh.faces),
+            ))
+
+        async def mesh_info(mesh=mesh):
+            # Fresh copy each run: trimesh caches derived properties on the mesh
+            return service._get_mesh_info(mesh.copy())
+
+        cases.append(Case(f"mesh_info/{size}", "mesh_info", size, mesh_info, faces=len(mesh.faces)))
+
+        obj_bytes = synthetic.write_mesh(workdir, subdivisions, "obj").read_bytes()
+        cases.append(Case(
+            f"convert_formats/{size}", "convert_formats", size,
+            lambda data=obj_bytes: service.convert_to_formats(data, "input.obj", list(EXPORT_FORMATS)),
+            formats=len(EXPORT_FORMATS), faces=len(mesh.faces),
+        ))
+
+    for size in sizes:
+        edge = synthetic.VOLUME_SIZES[size]
+        for kind in synthetic.VOLUMES:
+            path = str(synthetic.write_nifti(workdir, kind, edge))
+            cases.append(Case(
+                f"load_nifti/{kind}/{size}", "load_nifti", size,
+                lambda path=path: service._load_nifti_as_mesh(path),
+                volume=kind, voxels=edge ** 3,
+            ))
+
+    return cases
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Any],
+    threshold: float,
+    min_delta: float = 0.002,
+) -> Dict[str, Any]:
+    """Compare results with a baseline report, flagging growth beyond the threshold
+
+    Time changes smaller than min_delta seconds are treated as noise, which
+    keeps sub-millisecond cases from flapping.
+    """
+    base_results = baseline.get("results", {})
+    cases = {}
+    regressions = []
+
+    for name, result in results.items():
+        base = base_results.get(name)
+        if base is None:
+            cases[name] = {"status": "new"}
+            continue
+
+        time_ratio = result["median_s"] / base["median_s"] if base["median_s"] else None
+        memory_ratio = (
+            result["peak_memory_bytes"] / base["peak_memory_bytes"] if base["peak_memory_bytes"] else None
+        )
+        regressed = []
+        if time_ratio is not None and time_ratio > 1.0 + threshold and result["median_s"] - base["median_s"] > min_delta:
+            regressed.append("time")
+        if memory_ratio is not None and memory_ratio > 1.0 + threshold:
+            regressed.append("memory")
+        cases[name] = {
+            "time_ratio": round(time_ratio, 3) if time_ratio is not None else None,
+            "memory_ratio": round(memory_ratio, 3) if memory_ratio is not None else None,
+            "status": "regressed" if regressed else "ok",
+        }
+        if regressed:
+            cases[name]["regressed"] = regressed
+            regressions.append(name)
+
+    missing = sorted(set(base_results) - set(results))
+    return {
+        "threshold": threshold,
+        "min_delta_s": min_delta,
+        "baseline_created": baseline.get("meta", {}).get("created"),
+        "regressions": regressions,
+        "missing": missing,
+        "cases": cases,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    service = MeshService()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="step1x3d-mesh-bench-") as workdir:
+        cases = build_cases(service, Path(workdir), args.sizes)
+        if args.filter:
+            cases = [case for case in cases if any(pattern in case.name for pattern in args.filter)]
+
+        for case in cases:
+            results[case.name] = await measure(case, args.repeat, args.warmup)
+            print(f"{case.name:<32} {results[case.name]['median_s'] * 1000:10.2f} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "created": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "trimesh": trimesh.__version__,
+            "repeat": args.repeat,
+            "sizes": args.sizes,
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(synthetic.MESH_SIZES), default=list(synthetic.MESH_SIZES))
+    parser.add_argument("--filter", nargs="+", help="Only run cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against this baseline report")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth before flagging")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="Ignore time changes below this many seconds")
+    parser.add_argument("--save-baseline", help="Write the report as a new baseline to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        report["comparison"] = compare(report["results"], baseline, args.threshold, args.min_delta)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps({"meta": report["meta"], "results": report["results"]}, indent=2) + "\n")
+
+    return 1 if report.get("comparison", {}).get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
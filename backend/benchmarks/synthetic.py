@@ -0,0 +1,72 @@
+"""
+Synthetic NIfTI volumes and meshes for benchmarks
+"""
+
+from pathlib import Path
+from typing import Dict
+
+import nibabel as nib
+import numpy as np
+import trimesh
+
+# Volume edge lengths (voxels) and icosphere subdivisions per size
+VOLUME_SIZES: Dict[str, int] = {"small": 32, "medium": 64, "large": 128}
+MESH_SIZES: Dict[str, int] = {"small": 3, "medium": 5, "large": 6}
+
+
+def _grid(size: int) -> np.ndarray:
+    """Distance of each voxel from the volume centre, in voxels"""
+    axis = np.arange(size, dtype=np.float32) - (size - 1) / 2.0
+    x, y, z = np.meshgrid(axis, axis, axis, indexing="ij")
+    return np.sqrt(x * x + y * y + z * z)
+
+
+def sphere_volume(size: int) -> np.ndarray:
+    """Smooth sphere filling about 70% of the volume"""
+    radius = size * 0.35
+    return np.clip(radius - _grid(size), -1.0, 1.0).astype(np.float32)
+
+
+def noise_volume(size: int, seed: int = 0) -> np.ndarray:
+    """Smoothed random noise: many small disconnected surfaces, a worst case for marching cubes"""
+    rng = np.random.default_rng(seed)
+    data = rng.random((size, size, size), dtype=np.float32)
+    for axis in range(3):
+        data = (data + np.roll(data, 1, axis) + np.roll(data, -1, axis)) / 3.0
+    return data
+
+
+def multilabel_volume(size: int, labels: int = 4) -> np.ndarray:
+    """Concentric shells with integer labels, like a segmentation mask"""
+    distance = _grid(size) / (size * 0.45)
+    volume = np.floor((1.0 - np.clip(distance, 0.0, 1.0)) * labels)
+    return volume.astype(np.int16)
+
+
+VOLUMES = {
+    "sphere": sphere_volume,
+    "noise": noise_volume,
+    "multilabel": multilabel_volume,
+}
+
+
+def write_nifti(directory: Path, kind: str, size: int, spacing: float = 1.0) -> Path:
+    """Write a synthetic .nii.gz volume and return its path"""
+    data = VOLUMES[kind](size)
+    affine = np.diag([spacing, spacing, spacing, 1.0])
+    path = directory / f"{kind}_{size}.nii.gz"
+    nib.save(nib.Nifti1Image(data, affine), str(path))
+    return path
+
+
+def sphere_mesh(subdivisions: int) -> trimesh.Trimesh:
+    """Icosphere with 20 * 4**subdivisions faces"""
+    return trimesh.creation.icosphere(subdivisions=subdivisions)
+
+
+def write_mesh(directory: Path, subdivisions: int, file_format: str) -> Path:
+    """Write a synthetic mesh as OBJ or GLB and return its path"""
+    path = directory / f"sphere_{subdivisions}.{file_format}"
+    sphere_mesh(subdivisions).export(str(path), file_type=file_format)
+    return path
+
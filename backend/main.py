@@ -11,7 +11,6 @@ from pathlib import Path
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
@@ -19,9 +18,14 @@ import uvicorn
 sys.path.append(str(Path(__file__).parent))
 
 from app.config import settings
-from app.routes import generation_router, health_router
+from app.middleware import CompressionMiddleware, MetricsMiddleware
+from app.routes import admin_router, generation_router, health_router, jobs_router, metrics_router, storage_router
+from app.services.cost_service import cost_service
 from app.services.model_service import model_service
 from app.services.gpu_service import gpu_service
+from app.services.retention_service import retention_service
+from app.services.pipeline import generation_pipeline
+from app.services.metrics_service import metrics_service
 
 # Configure logging
 logging.basicConfig(
@@ -48,14 +52,22 @@ async def lifespan(app: FastAPI):
         settings.create_directories()
         logger.info("Directories created successfully")
         
+        # Start GPU telemetry sampling
+        await gpu_service.telemetry.start()
+        
+        # Replay recorded job timings so queue estimates start from history
+        await cost_service.load()
+        
         # Check GPU availability
         gpu_info = gpu_service.get_gpu_info()
         logger.info(f"GPU Info: {gpu_info}")
         
-        # Initialize models in background
-        logger.info("Initializing models...")
-        await model_service.initialize_models()
-        logger.info("Models initialized successfully")
+        # Load models in background; requests arriving before they are ready wait in a queue
+        model_service.start_background_load()
+        logger.info("Model loading started in background")
+        
+        # Start output retention in background
+        await retention_service.start()
         
         logger.info("Backend startup complete")
         
@@ -69,10 +81,19 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down Step1X-3D Backend...")
     
     try:
+        # Stop output retention
+        await retention_service.stop()
+        
         # Clean up model resources
         await model_service.cleanup()
         logger.info("Model cleanup complete")
         
+        # Stop pipeline stage workers
+        generation_pipeline.shutdown()
+        
+        # Stop GPU telemetry sampling
+        await gpu_service.telemetry.stop()
+        
         # Clear GPU cache
         gpu_service.clear_cache()
         logger.info("GPU cache cleared")
@@ -102,11 +123,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        encodings=settings.compression_preferences,
+    )
+
+if settings.metrics_enabled:
+    # Added last so it is outermost and times the full request
+    app.add_middleware(MetricsMiddleware, metrics=metrics_service)
 
 # Include routers
 app.include_router(health_router)
 app.include_router(generation_router)
+app.include_router(storage_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 # Root endpoint
 @app.get("/")
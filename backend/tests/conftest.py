@@ -0,0 +1,37 @@
+"""
+Shared test setup: a throwaway output directory, the stub inference backend and fake GPU telemetry
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Settings are read once at import, so the environment must be in place before the app is imported
+_output_dir = Path(tempfile.mkdtemp(prefix="step1x3d-tests-"))
+(_output_dir / "logs").mkdir()
+os.environ["OUTPUT_DIR"] = str(_output_dir)
+os.environ["INFERENCE_BACKEND"] = "stub"
+os.environ["WARMUP_ENABLED"] = "false"
+os.environ["GPU_TELEMETRY_BACKEND"] = "fake"
+os.environ["RETENTION_ENABLED"] = "false"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """The global storage and retention services, pointed at an empty output directory"""
+    from app.services.retention_service import retention_service
+    from app.services.storage_service import storage_service
+
+    for service in (storage_service, retention_service):
+        monkeypatch.setattr(service, "models_dir", tmp_path / "models")
+        monkeypatch.setattr(service, "temp_dir", tmp_path / "temp")
+        monkeypatch.setattr(service, "jobs_dir", tmp_path / "jobs")
+    monkeypatch.setattr(retention_service, "index_path", tmp_path / "retention_index.json")
+    monkeypatch.setattr(retention_service, "_last_access", {})
+    monkeypatch.setattr(retention_service, "_index_loaded", False)
+    return storage_service
@@ -0,0 +1,178 @@
+"""
+Batch uploads: spooling, archive limits, per-item overrides and deduplication
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.services import batch_service as batch_module
+from app.services.batch_service import BatchError, build_items, schedule_order, spool_uploads
+
+SHARED = {"mode": "geometry", "guidance_scale": 7.5, "num_steps": 50, "seed": 2025}
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def spool():
+    spools = []
+
+    def make(files=(), archive=None):
+        spool = spool_uploads([(name, io.BytesIO(data)) for name, data in files], archive)
+        spools.append(spool)
+        return spool
+
+    yield make
+    for spool in spools:
+        spool.close()
+
+
+def test_uploads_are_read_back_lazily(spool):
+    uploads = spool(
+        [("a.png", b"first image"), ("b.png", b"second")],
+        make_zip({"dir/c.jpg": b"third" * 1000, "d.webp": b"fourth"}),
+    ).uploads
+
+    assert [upload.name for upload in uploads] == ["a.png", "b.png", "dir/c.jpg", "d.webp"]
+    assert [upload.size for upload in uploads] == [11, 6, 5000, 6]
+    # Reads can come in any order, and more than once
+    assert uploads[2].read() == b"third" * 1000
+    assert uploads[1].read() == b"second"
+    assert uploads[0].read() == b"first image"
+    assert uploads[1].read() == b"second"
+
+
+def test_archive_skips_non_images_and_hidden_files(spool):
+    archive = make_zip({
+        "a.png": b"a",
+        "notes.txt": b"text",
+        ".hidden.png": b"h",
+        "__MACOSX/._a.png": b"fork",
+        "folder/": b"",
+    })
+
+    assert [upload.name for upload in spool(archive=archive).uploads] == ["a.png"]
+
+
+def test_archive_size_is_checked_before_extraction(spool, monkeypatch):
+    monkeypatch.setattr(batch_module.settings, "batch_max_archive_mb", 1)
+    # Highly compressible: small on the wire, over the limit once expanded
+    archive = make_zip({"a.png": b"\0" * (600 * 1024), "b.png": b"\0" * (600 * 1024)})
+
+    with pytest.raises(BatchError, match="over the 1 MB limit"):
+        spool(archive=archive)
+
+
+def test_invalid_archive(spool):
+    with pytest.raises(BatchError, match="not a valid ZIP"):
+        spool(archive=io.BytesIO(b"not a zip"))
+
+
+def test_corrupt_member_is_rejected_at_submission(spool):
+    data = make_zip({"a.png": b"image bytes " * 100}, zipfile.ZIP_STORED).getvalue()
+    corrupt = data.replace(b"image bytes", b"IMAGE BYTES", 1)
+
+    with pytest.raises(BatchError, match="Cannot extract a.png"):
+        spool(archive=io.BytesIO(corrupt))
+
+
+def test_list_overrides_apply_by_position(spool):
+    uploads = spool([("a.png", b"a"), ("b.png", b"b"), ("c.png", b"c")]).uploads
+
+    items = build_items(uploads, SHARED, json.dumps([{}, {"mode": "textured", "num_steps": "80"}]))
+
+    assert [item.params["mode"] for item in items] == ["geometry", "textured", "geometry"]
+    assert items[1].params["num_steps"] == 80
+    assert items[2].params == SHARED
+
+
+def test_object_overrides_apply_by_name(spool):
+    uploads = spool([("a.png", b"a"), ("b.png", b"b")]).uploads
+
+    items = build_items(uploads, SHARED, json.dumps({"b.png": {"seed": 7}}))
+
+    assert [item.params["seed"] for item in items] == [2025, 7]
+
+
+@pytest.mark.parametrize("overrides,message", [
+    ("[{}, {}, {}]", "Parameters given for 3 items"),
+    ('{"z.png": {}}', "unknown images"),
+    ('[{"steps": 10}]', "Unknown parameters"),
+    ('[{"num_steps": "many"}]', "Invalid parameter"),
+    ("[1]", "must be a JSON object"),
+    ('"textured"', "JSON list or object"),
+    ("{", "not valid JSON"),
+])
+def test_invalid_overrides(spool, overrides, message):
+    uploads = spool([("a.png", b"a"), ("b.png", b"b")]).uploads
+
+    with pytest.raises(BatchError, match=message):
+        build_items(uploads, SHARED, overrides)
+
+
+def test_identical_images_and_parameters_run_once(spool):
+    uploads = spool(
+        [("a.png", b"same"), ("b.png", b"same"), ("c.png", b"other")],
+        make_zip({"d.png": b"same"}),
+    ).uploads
+
+    items = build_items(uploads, SHARED, json.dumps({"b.png": {"seed": 1}}))
+
+    # b differs by seed; the archive member duplicates a
+    assert [item.duplicate_of.index if item.duplicate_of else None for item in items] == [None, None, None, 0]
+    assert [item.index for item in schedule_order(items)] == [0, 1, 2]
+
+
+def test_item_limit(spool, monkeypatch):
+    monkeypatch.setattr(batch_module.settings, "batch_max_items", 2)
+    uploads = spool([("a.png", b"a"), ("b.png", b"b"), ("c.png", b"c")]).uploads
+
+    with pytest.raises(BatchError, match="over the limit of 2"):
+        build_items(uploads, SHARED, None)
+
+
+def test_empty_batch(spool):
+    with pytest.raises(BatchError, match="No images"):
+        build_items(spool().uploads, SHARED, None)
+
+
+def test_schedule_groups_by_mode_and_steps(spool):
+    uploads = spool([(f"{i}.png", bytes([i])) for i in range(4)]).uploads
+    overrides = [{"num_steps": 80}, {"mode": "textured"}, {}, {"num_steps": 80}]
+
+    items = build_items(uploads, SHARED, json.dumps(overrides))
+
+    assert [item.index for item in schedule_order(items)] == [2, 0, 3, 1]
+
+
+def test_batch_route_rejects_oversized_archive(storage, monkeypatch):
+    monkeypatch.setattr(batch_module.settings, "batch_max_archive_mb", 1)
+    archive = make_zip({"a.png": b"\0" * (2 * 1024 * 1024)})
+
+    response = TestClient(main.app).post(
+        "/api/v1/generate-3d/batch", files={"archive": ("images.zip", archive.getvalue(), "application/zip")}
+    )
+
+    assert response.status_code == 400
+    assert "over the 1 MB limit" in response.json()["detail"]
+
+
+def test_batch_route_rejects_empty_images(storage):
+    response = TestClient(main.app).post(
+        "/api/v1/generate-3d/batch", files=[("images", ("a.png", b"", "image/png"))]
+    )
+
+    assert response.status_code == 400
+    assert "Empty image files" in response.json()["detail"]
@@ -0,0 +1,115 @@
+"""
+Streamed ZIP bundles of outputs
+"""
+
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.services import storage_service as storage_module
+from app.services.storage_service import _ChunkSink
+
+OBJ = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n" * 200
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+
+
+@pytest.fixture
+def outputs(storage):
+    async def run():
+        await storage.write_output("box.obj", OBJ)
+        await storage.write_output("preview.png", PNG)
+
+    asyncio.run(run())
+    return storage
+
+
+def open_archive(chunks):
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_chunk_sink_hands_back_writes_once():
+    sink = _ChunkSink()
+
+    assert sink.write(memoryview(b"abc")) == 3
+    sink.write(b"def")
+
+    assert sink.drain() == b"abcdef"
+    assert sink.drain() == b""
+    assert not sink.seekable()
+
+
+def test_bundle_opens_with_zipfile(outputs):
+    with open_archive(outputs.iter_bundle(["box.obj", "preview.png"])) as archive:
+        assert archive.testzip() is None
+        assert archive.read("box.obj") == OBJ
+        assert archive.read("preview.png") == PNG
+
+
+def test_compression_follows_media_type(outputs):
+    with open_archive(outputs.iter_bundle(["box.obj", "preview.png"])) as archive:
+        assert archive.getinfo("box.obj").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("preview.png").compress_type == zipfile.ZIP_STORED
+
+
+def test_bundle_is_streamed_in_chunks(outputs, monkeypatch):
+    monkeypatch.setattr(outputs, "chunk_size", 1024)
+
+    chunks = list(outputs.iter_bundle(["box.obj", "preview.png"]))
+
+    assert len(chunks) > 2
+    assert max(len(chunk) for chunk in chunks) < len(PNG)
+    assert open_archive(chunks).read("preview.png") == PNG
+
+
+def test_outputs_compressed_at_rest_are_decompressed(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_compress_at_rest", True)
+    monkeypatch.setattr(storage_module.settings, "output_compress_formats", "obj")
+    asyncio.run(storage.write_output("box.obj", OBJ))
+
+    with open_archive(storage.iter_bundle(["box.obj"])) as archive:
+        assert archive.namelist() == ["box.obj"]
+        assert archive.read("box.obj") == OBJ
+
+
+def test_missing_files_are_skipped(outputs):
+    with open_archive(outputs.iter_bundle(["missing.obj", "box.obj"])) as archive:
+        assert archive.namelist() == ["box.obj"]
+
+
+def test_bundle_route_lists_missing_files(outputs):
+    response = TestClient(main.app).post(
+        "/api/v1/bundle",
+        json={"filenames": ["box.obj", "missing.obj", "gone.png"], "archive_name": "meshes"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["x-bundle-missing"] == "missing.obj,gone.png"
+    assert 'filename="meshes.zip"' in response.headers["content-disposition"]
+    with open_archive([response.content]) as archive:
+        assert archive.namelist() == ["box.obj"]
+
+
+def test_bundle_route_includes_job_outputs(outputs):
+    job_id = outputs.new_job_id()
+    asyncio.run(outputs.record_job(job_id, ["box.obj", "preview.png"]))
+
+    response = TestClient(main.app).post("/api/v1/bundle", json={"job_id": job_id})
+
+    assert response.status_code == 200
+    assert response.headers["x-bundle-missing"] == ""
+    with open_archive([response.content]) as archive:
+        assert sorted(archive.namelist()) == ["box.obj", "preview.png"]
+
+
+@pytest.mark.parametrize("body,status_code", [
+    ({"filenames": ["missing.obj"]}, 404),
+    ({"filenames": ["../secret"]}, 400),
+    ({}, 400),
+])
+def test_bundle_route_rejects(outputs, body, status_code):
+    assert TestClient(main.app).post("/api/v1/bundle", json=body).status_code == status_code
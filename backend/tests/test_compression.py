@@ -0,0 +1,143 @@
+"""
+Accept-Encoding negotiation and the response compression middleware
+"""
+
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import negotiate, parse_accept_encoding
+from app.middleware.compression import CompressionMiddleware
+
+PREFERENCES = ["zstd", "br", "gzip"]
+TEXT = b"compressible text " * 200
+
+
+def test_parse_q_values():
+    assert parse_accept_encoding("gzip, br;q=0.5, ZSTD;q=0 , identity;q=0") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "zstd": 0.0,
+        "identity": 0.0,
+    }
+
+
+def test_parse_invalid_q_value_means_not_acceptable():
+    assert parse_accept_encoding("gzip;q=high") == {"gzip": 0.0}
+
+
+@pytest.mark.parametrize("header", [None, "", " , "])
+def test_parse_empty_header(header):
+    assert parse_accept_encoding(header) == {}
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("gzip, br, zstd", "zstd"),
+    # Server preference wins over client q-value order as long as both are acceptable
+    ("gzip;q=1, br;q=0.1", "br"),
+    ("zstd;q=0, br;q=0, gzip", "gzip"),
+    ("*", "zstd"),
+    ("*;q=0, gzip", "gzip"),
+    ("*, zstd;q=0", "br"),
+    ("identity", None),
+    ("gzip;q=0, identity;q=0", None),
+    (None, None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, PREFERENCES) == expected
+
+
+def test_negotiate_only_offers_configured_encodings():
+    assert negotiate("zstd, br", ["gzip"]) is None
+
+
+def make_client(response, minimum_size=100):
+    async def endpoint(request):
+        return response()
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    return TestClient(CompressionMiddleware(app, minimum_size=minimum_size, encodings=PREFERENCES))
+
+
+def get(client, accept_encoding="gzip"):
+    with client.stream("GET", "/", headers={"Accept-Encoding": accept_encoding}) as response:
+        response.raw_body = b"".join(response.iter_raw())
+    return response
+
+
+def test_single_chunk_body_gets_compressed_length():
+    response = get(make_client(lambda: Response(TEXT, media_type="text/plain")))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["content-length"] == str(len(response.raw_body))
+    assert gzip.decompress(response.raw_body) == TEXT
+
+
+def test_streamed_body_is_compressed_without_length():
+    def streamed():
+        return StreamingResponse(
+            iter([TEXT, TEXT]), media_type="model/obj", headers={"Content-Length": str(2 * len(TEXT))}
+        )
+
+    response = get(make_client(streamed))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(response.raw_body) == TEXT + TEXT
+
+
+def test_preferred_codec_is_used():
+    response = get(make_client(lambda: Response(TEXT, media_type="text/plain")), "gzip, zstd")
+
+    assert response.headers["content-encoding"] == "zstd"
+
+
+@pytest.mark.parametrize("media_type", ["image/png", "model/gltf-binary", "application/zip", None])
+def test_incompressible_media_types_pass_through(media_type):
+    response = get(make_client(lambda: Response(TEXT, media_type=media_type)))
+
+    assert "content-encoding" not in response.headers
+    assert response.raw_body == TEXT
+
+
+def test_small_bodies_pass_through():
+    response = get(make_client(lambda: Response(TEXT[:99], media_type="text/plain")))
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == "99"
+    assert response.raw_body == TEXT[:99]
+
+
+def test_existing_content_encoding_passes_through():
+    body = gzip.compress(TEXT)
+    response = get(
+        make_client(lambda: Response(body, media_type="text/plain", headers={"Content-Encoding": "gzip"})),
+        "zstd, gzip",
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.raw_body == body
+
+
+@pytest.mark.parametrize("status_code", [204, 206, 304])
+def test_bodiless_and_partial_responses_pass_through(status_code):
+    body = b"" if status_code != 206 else TEXT
+    headers = {"Content-Range": f"bytes 0-{len(TEXT) - 1}/{len(TEXT) * 2}"} if status_code == 206 else {}
+    client = make_client(lambda: Response(body, status_code=status_code, media_type="text/plain", headers=headers))
+    response = get(client)
+
+    assert response.status_code == status_code
+    assert "content-encoding" not in response.headers
+    assert response.raw_body == body
+
+
+def test_client_without_accepted_encoding_gets_identity():
+    response = get(make_client(lambda: Response(TEXT, media_type="text/plain")), "identity")
+
+    assert "content-encoding" not in response.headers
+    assert response.raw_body == TEXT
@@ -0,0 +1,49 @@
+"""
+Mesh conversion routes, run against the stub inference backend
+"""
+
+import io
+
+import pytest
+import trimesh
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def obj_bytes():
+    return trimesh.creation.box().export(file_type="obj").encode()
+
+
+def test_convert_mesh_rejects_unknown_target_format(client, obj_bytes):
+    response = client.post(
+        "/api/v1/convert-mesh",
+        files={"file": ("box.obj", obj_bytes, "text/plain")},
+        data={"target_format": "xyz"},
+    )
+
+    assert response.status_code == 400
+    assert "Target format must be one of" in response.json()["detail"]
+
+
+def test_convert_mesh_exports_requested_format(client, obj_bytes):
+    response = client.post(
+        "/api/v1/convert-mesh",
+        files={"file": ("box.obj", obj_bytes, "text/plain")},
+        data={"target_format": "stl"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"] is True
+    assert body["filename"].endswith(".stl")
+
+    download = client.get(f"/api/v1/download/{body['filename']}")
+    mesh = trimesh.load(io.BytesIO(download.content), file_type="stl")
+    assert len(mesh.faces) == 12
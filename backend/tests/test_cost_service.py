@@ -0,0 +1,146 @@
+"""
+Job latency fitting, forgetting and history replay
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services import cost_service as cost_module
+from app.services.cost_service import COST_PRIORS, JobSpec, LinearCost, cost_service
+
+
+@pytest.fixture
+def cost(tmp_path, monkeypatch):
+    monkeypatch.setattr(cost_service, "history_path", tmp_path / "cost_history.jsonl")
+    monkeypatch.setattr(cost_service, "models", {})
+    monkeypatch.setattr(cost_service, "_loaded", False)
+    monkeypatch.setattr(cost_service, "_lines", 0)
+    return cost_service
+
+
+def spec(steps, mode="fast"):
+    return JobSpec("generate-3d", mode=mode, steps=steps)
+
+
+def test_fit_recovers_intercept_and_slope():
+    model = LinearCost()
+    for work in (10, 20, 30, 40):
+        model.observe(work, 2.0 + 0.5 * work)
+
+    intercept, slope = model.coefficients()
+
+    assert intercept == pytest.approx(2.0)
+    assert slope == pytest.approx(0.5)
+    assert model.predict(100) == pytest.approx(52.0)
+
+
+def test_single_size_scales_the_mean():
+    model = LinearCost(decay=1.0)
+    for seconds in (9.0, 11.0):
+        model.observe(10, seconds)
+
+    assert model.coefficients() == pytest.approx((0.0, 1.0))
+    assert model.predict(20) == pytest.approx(20.0)
+
+
+def test_negative_trend_falls_back_to_the_mean():
+    model = LinearCost(decay=1.0)
+    model.observe(10, 6.0)
+    model.observe(20, 4.0)
+
+    assert model.coefficients() == pytest.approx((5.0, 0.0))
+
+
+def test_decay_follows_a_slowdown():
+    model = LinearCost(decay=0.5)
+    for _ in range(20):
+        model.observe(10, 10.0)
+    for _ in range(20):
+        model.observe(10, 20.0)
+
+    assert model.predict(10) == pytest.approx(20.0, rel=1e-3)
+
+
+def test_error_tracks_relative_misprediction():
+    model = LinearCost()
+    model.observe(10, 10.0)
+    model.observe(10, 20.0)
+
+    assert model.error == pytest.approx(0.5)
+
+
+def test_priors_until_observed(cost):
+    intercept, slope = COST_PRIORS["generate-3d"]
+
+    assert cost.predict(spec(10), "cuda:0") == pytest.approx(intercept + slope * 10)
+
+
+def test_falls_back_to_the_route_fit(cost):
+    asyncio.run(cost.observe(spec(10, mode="fast"), "cuda:0", 7.0))
+
+    assert cost.predict(spec(10, mode="fast"), "cuda:0") == pytest.approx(7.0)
+    # Another mode on another device has no history of its own yet
+    assert cost.predict(spec(10, mode="quality"), "cuda:1") == pytest.approx(7.0)
+
+
+def test_observations_are_replayed_at_load(cost):
+    async def record():
+        for steps in (10, 20, 30):
+            await cost.observe(spec(steps), "cuda:0", 1.0 + 0.1 * steps)
+
+    asyncio.run(record())
+    expected = cost.predict(spec(50), "cuda:0")
+
+    cost.models = {}
+    cost._loaded = False
+    asyncio.run(cost.load())
+
+    assert cost.predict(spec(50), "cuda:0") == pytest.approx(expected)
+    assert cost._lines == 3
+    assert cost.get_status()["models"]["generate-3d/fast/cuda:0"]["observations"] == 3
+
+
+def test_load_replaces_models_fitted_before_it(cost):
+    # Observations made before load are already in the history file and must not count twice
+    asyncio.run(cost.observe(spec(10), "cuda:0", 5.0))
+    asyncio.run(cost.load())
+
+    assert cost.models["generate-3d"].count == 1
+
+
+def test_load_keeps_only_the_most_recent_history(cost, monkeypatch):
+    monkeypatch.setattr(cost_module.settings, "cost_history_size", 2)
+    with cost.history_path.open("w") as f:
+        for seconds in (100.0, 5.0, 5.0):
+            f.write(json.dumps({**spec(10).to_dict(), "device": "cuda:0", "seconds": seconds, "time": 0}) + "\n")
+
+    asyncio.run(cost.load())
+
+    assert cost.models["generate-3d"].count == 2
+    assert cost.predict(spec(10), "cuda:0") == pytest.approx(5.0)
+
+
+def test_unreadable_history_is_ignored(cost):
+    cost.history_path.write_text("not json\n")
+
+    asyncio.run(cost.load())
+
+    assert cost.models == {}
+    assert cost.predict(spec(10), "cuda:0") > 0
+
+
+def test_history_is_compacted(cost, monkeypatch):
+    monkeypatch.setattr(cost_module.settings, "cost_history_size", 3)
+
+    async def record():
+        for i in range(7):
+            await cost.observe(spec(10), "cuda:0", float(i + 1))
+
+    asyncio.run(record())
+
+    records = [json.loads(line) for line in cost.history_path.read_text().splitlines()]
+    # Compaction runs once the file holds more than twice the history size
+    assert [record["seconds"] for record in records] == [5.0, 6.0, 7.0]
+    assert cost._lines == 3
@@ -0,0 +1,124 @@
+"""
+Download encoding negotiation for outputs stored compressed at rest or with precompressed sidecars
+"""
+
+import asyncio
+import gzip
+
+import pytest
+import zstandard
+from fastapi.testclient import TestClient
+
+import main
+from app.services import storage_service as storage_module
+
+OBJ = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n" * 200
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def write(storage, filename, data=OBJ):
+    async def run():
+        await storage.write_output(filename, data)
+        await asyncio.gather(*storage._background_tasks)
+
+    asyncio.run(run())
+
+
+def get(client, filename, **headers):
+    # stream() leaves the body undecoded so the encoding on the wire can be checked
+    with client.stream("GET", f"/api/v1/download/{filename}", headers=headers) as response:
+        response.raw_body = b"".join(response.iter_raw())
+    return response
+
+
+@pytest.fixture
+def compressed_at_rest(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_compress_at_rest", True)
+    monkeypatch.setattr(storage_module.settings, "output_compress_formats", "obj")
+    write(storage, "box.obj")
+    return storage
+
+
+def test_iter_decompressed_round_trips_across_chunks(compressed_at_rest, monkeypatch):
+    data = b"".join(f"v {i} {i * 7 % 13} {i * 31 % 97}\n".encode() for i in range(50000))
+    write(compressed_at_rest, "points.obj", data)
+    monkeypatch.setattr(compressed_at_rest, "chunk_size", 4096)
+    path, encoding = compressed_at_rest.locate("points.obj")
+
+    chunks = list(compressed_at_rest.iter_decompressed(path, encoding))
+
+    assert len(chunks) > 1
+    assert b"".join(chunks) == data
+
+
+def test_stored_zstd_is_passed_through(compressed_at_rest, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "zstd, gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.raw_body == compressed_at_rest.locate("box.obj")[0].read_bytes()
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(response.raw_body) == OBJ
+
+
+def test_stored_zstd_is_recompressed_for_gzip_clients(compressed_at_rest, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.raw_body) == OBJ
+
+
+def test_stored_zstd_is_decompressed_for_identity_clients(compressed_at_rest, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == str(len(OBJ))
+    assert response.headers["content-type"] == "model/obj"
+    assert response.raw_body == OBJ
+
+
+def test_range_over_decompressed_stream_is_refused(compressed_at_rest, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "identity", "Range": "bytes=0-99"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(OBJ)}"
+
+
+def test_range_over_stored_zstd_applies_to_stored_bytes(compressed_at_rest, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "zstd", "Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.raw_body == compressed_at_rest.locate("box.obj")[0].read_bytes()[:10]
+
+
+@pytest.fixture
+def precompressed(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_precompress", True)
+    write(storage, "box.obj")
+    return storage
+
+
+def test_sidecar_is_served_when_accepted(precompressed, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.raw_body == precompressed.output_path("box.obj.gz").read_bytes()
+
+
+def test_range_skips_sidecars(precompressed, client):
+    response = get(client, "box.obj", **{"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.raw_body == OBJ[:10]
+
+
+def test_missing_download(storage, client):
+    assert get(client, "missing.obj").status_code == 404
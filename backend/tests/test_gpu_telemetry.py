@@ -0,0 +1,117 @@
+"""
+GPU telemetry sampling and the health routes that serve it, driven by the fake backend
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.routes import health
+from app.services.gpu_service import gpu_service
+from app.services.gpu_telemetry import FakeBackend, GPUTelemetrySampler, TelemetryBackend
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    """A fresh two-device fake sampler with a small ring buffer, installed on the GPU service"""
+    sampler = GPUTelemetrySampler(FakeBackend(device_count=2, memory_total=1000), interval=0.01, history_size=5)
+    monkeypatch.setattr(gpu_service, "telemetry", sampler)
+    monkeypatch.setattr(health, "snapshot_cache", health._SnapshotCache())
+    return sampler
+
+
+@pytest.fixture
+def client():
+    # No lifespan: models are not loaded and the background sampler is not started
+    return TestClient(main.app)
+
+
+def test_fake_readings_are_consistent(sampler):
+    snapshot = sampler.sample_now()
+
+    assert snapshot["backend"] == "fake"
+    assert [device["index"] for device in snapshot["devices"]] == [0, 1]
+    for device in snapshot["devices"]:
+        assert device["name"] == f"Fake GPU {device['index']}"
+        assert device["memory_used"] + device["memory_free"] == device["memory_total"] == 1000
+        assert 0.0 <= device["utilization"] <= 100.0
+
+
+def test_history_is_bounded_ring_buffer(sampler):
+    snapshots = [sampler.sample_now() for _ in range(12)]
+
+    assert len(sampler.history) == 5
+    assert sampler.get_history() == snapshots[-5:]
+    assert sampler.latest is snapshots[-1]
+
+
+def test_history_limit(sampler):
+    snapshots = [sampler.sample_now() for _ in range(4)]
+
+    assert sampler.get_history(2) == snapshots[-2:]
+    assert sampler.get_history(10) == snapshots
+    assert sampler.get_history(0) == []
+
+
+def test_background_sampling_stays_bounded():
+    sampler = GPUTelemetrySampler(FakeBackend(), interval=0.005, history_size=3)
+
+    async def run():
+        await sampler.start()
+        assert sampler.running
+        await asyncio.sleep(0.1)
+        await sampler.stop()
+
+    asyncio.run(run())
+
+    assert not sampler.running
+    assert len(sampler.history) == 3
+    timestamps = [snapshot["timestamp"] for snapshot in sampler.history]
+    assert timestamps == sorted(timestamps)
+
+
+def test_sampler_without_devices_does_not_start():
+    sampler = GPUTelemetrySampler(TelemetryBackend(), interval=0.005)
+
+    asyncio.run(sampler.start())
+
+    assert not sampler.running
+    assert sampler.latest is None
+
+
+def test_history_route_returns_most_recent_window(sampler, client):
+    snapshots = [sampler.sample_now() for _ in range(7)]
+
+    response = client.get("/health/gpu/history", params={"limit": 3})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["backend"] == "fake"
+    assert body["capacity"] == 5
+    assert body["count"] == 3
+    assert [sample["timestamp"] for sample in body["samples"]] == [s["timestamp"] for s in snapshots[-3:]]
+
+    assert client.get("/health/gpu/history").json()["count"] == 5
+    assert client.get("/health/gpu/history", params={"limit": 0}).status_code == 422
+
+
+def test_health_serves_cached_snapshot(sampler, client, monkeypatch):
+    monkeypatch.setattr(main.settings, "health_cache_ttl", 60.0)
+    first = sampler.sample_now()
+
+    response = client.get("/health/")
+    assert response.status_code == 200
+    assert response.json()["gpu_info"]["timestamp"] == first["timestamp"]
+
+    # Newer telemetry is not picked up while the cached snapshot is fresh
+    sampler.sample_now()
+    cached = client.get("/health/").json()
+    assert cached["gpu_info"]["timestamp"] == first["timestamp"]
+    assert cached["uptime"] >= response.json()["uptime"]
+
+    monkeypatch.setattr(main.settings, "health_cache_ttl", 0.0)
+    refreshed = client.get("/health/").json()
+    assert refreshed["gpu_info"]["timestamp"] == sampler.latest["timestamp"]
+    assert refreshed["gpu_info"]["devices"][0]["utilization"] == sampler.latest["devices"][0]["utilization"]
@@ -0,0 +1,121 @@
+"""
+Host memory admission around inference slots
+"""
+
+import asyncio
+
+import pytest
+
+from app.services import memory_service as memory_module
+from app.services.cost_service import JobSpec, cost_service
+from app.services.memory_service import MemoryAdmissionTimeout, MemoryBudgetExceeded, memory_service
+from app.services.model_service import model_service
+from app.services.scheduler import InferenceScheduler
+
+MB = 1024 * 1024
+
+# Predicted peak memory per route
+ESTIMATES = {"text-to-image": 50 * MB, "generate-3d": 0}
+
+
+@pytest.fixture
+def budget(tmp_path, monkeypatch):
+    """A budget 100 MB above the current footprint, with 60 MB held by an outside reservation"""
+    baseline = memory_service._process.memory_info().rss
+    monkeypatch.setattr(memory_module.settings, "memory_budget_mb", (baseline + 100 * MB) / MB)
+    monkeypatch.setattr(memory_module.settings, "memory_admission_timeout", 5.0)
+    monkeypatch.setattr(memory_service, "_baseline_rss", baseline)
+    monkeypatch.setattr(memory_service, "_condition", None)
+    monkeypatch.setattr(memory_service, "_reserved", {-1: 60 * MB})
+    monkeypatch.setattr(memory_service, "estimate", lambda route, feature=1.0: ESTIMATES[route])
+    monkeypatch.setattr(model_service, "scheduler", InferenceScheduler(1))
+    monkeypatch.setattr(cost_service, "history_path", tmp_path / "cost_history.jsonl")
+    return memory_service
+
+
+def image_spec():
+    return JobSpec("text-to-image", width=64, height=64, steps=1)
+
+
+async def release_outside_reservation():
+    memory_service._prepare()
+    await memory_service._release(-1)
+
+
+def test_job_that_can_never_fit_is_rejected_before_queueing(budget, monkeypatch):
+    monkeypatch.setitem(ESTIMATES, "text-to-image", 200 * MB)
+    slots = []
+    monkeypatch.setattr(model_service.scheduler, "slot", lambda cost: slots.append(cost))
+
+    with pytest.raises(MemoryBudgetExceeded):
+        asyncio.run(model_service._run_inference("sdxl", image_spec(), lambda: "image"))
+
+    assert slots == []
+
+
+def test_job_waiting_for_memory_does_not_hold_a_slot(budget):
+    order = []
+
+    def run(name):
+        order.append(name)
+        return name
+
+    async def scenario():
+        waiting = asyncio.create_task(model_service._run_inference("sdxl", image_spec(), run, "image"))
+        await asyncio.sleep(0.05)
+        assert model_service.scheduler.get_status()["running"] == 0
+
+        # A job that fits takes the free slot while the other waits for memory
+        await asyncio.wait_for(
+            model_service._run_inference("step1x3d", JobSpec("generate-3d", steps=10), run, "mesh"), timeout=5
+        )
+        assert not waiting.done()
+
+        await release_outside_reservation()
+        return await asyncio.wait_for(waiting, timeout=5)
+
+    assert asyncio.run(scenario()) == "image"
+    assert order == ["mesh", "image"]
+    assert memory_service._reserved == {}
+
+
+def test_slot_is_given_back_when_memory_is_taken_while_queued(budget):
+    async def scenario():
+        scheduler = model_service.scheduler
+        release_slot = asyncio.Event()
+
+        async def hold_slot():
+            async with scheduler.slot():
+                await release_slot.wait()
+
+        await release_outside_reservation()
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+
+        # Fits now, so it queues for the slot...
+        job = asyncio.create_task(model_service._run_inference("sdxl", image_spec(), lambda: "image"))
+        await asyncio.sleep(0.05)
+        assert scheduler.get_status()["queued"] == 1
+
+        # ...but by the time the slot frees up the memory is gone
+        ticket = await memory_service._acquire("outside", 60 * MB)
+        release_slot.set()
+        await holder
+        await asyncio.sleep(0.05)
+        assert scheduler.get_status()["running"] == 0
+        assert scheduler.get_status()["queued"] == 0
+        assert not job.done()
+
+        await memory_service._release(ticket)
+        return await asyncio.wait_for(job, timeout=5)
+
+    assert asyncio.run(scenario()) == "image"
+
+
+def test_waiting_for_memory_times_out(budget, monkeypatch):
+    monkeypatch.setattr(memory_module.settings, "memory_admission_timeout", 0.1)
+
+    with pytest.raises(MemoryAdmissionTimeout):
+        asyncio.run(model_service._run_inference("sdxl", image_spec(), lambda: "image"))
+
+    assert model_service.scheduler.get_status()["running"] == 0
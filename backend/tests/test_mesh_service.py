@@ -0,0 +1,84 @@
+"""
+Mesh loading and export: scene flattening and binary output formats
+"""
+
+import asyncio
+import io
+import struct
+
+import numpy as np
+import pytest
+import trimesh
+
+from app.services.mesh_service import mesh_service
+
+
+@pytest.fixture
+def scene_glb():
+    """A GLB holding two differently sized boxes under separate node transforms"""
+    translate = trimesh.transformations.translation_matrix
+    scene = trimesh.Scene()
+    scene.add_geometry(trimesh.creation.box(), geom_name="small", transform=translate([-5, 0, 0]))
+    scene.add_geometry(trimesh.creation.box(extents=[2, 2, 2]), geom_name="large", transform=translate([5, 0, 0]))
+    return scene.export(file_type="glb")
+
+
+@pytest.fixture
+def box():
+    return trimesh.creation.box()
+
+
+def test_multi_geometry_glb_is_flattened_with_transforms(scene_glb):
+    mesh = mesh_service.load_mesh(scene_glb, "scene.glb")
+
+    assert isinstance(mesh, trimesh.Trimesh)
+    assert len(mesh.faces) == 24
+    np.testing.assert_allclose(mesh.bounds, [[-5.5, -1, -1], [6, 1, 1]])
+
+
+def test_multi_geometry_glb_converts_to_every_format(scene_glb):
+    outputs, metadata = asyncio.run(
+        mesh_service.convert_to_formats(scene_glb, "scene.glb", ["glb", "obj", "stl", "ply"])
+    )
+
+    assert metadata["mesh_info"]["faces"] == 24
+    for fmt, data in outputs.items():
+        mesh = trimesh.load(io.BytesIO(data), file_type=fmt, force="mesh")
+        assert len(mesh.faces) == 24, fmt
+
+
+def test_obj_loads_as_mesh(box):
+    mesh = mesh_service.load_mesh(box.export(file_type="obj").encode(), "box.obj")
+
+    assert isinstance(mesh, trimesh.Trimesh)
+    assert len(mesh.faces) == 12
+
+
+def test_ply_export_is_binary(box):
+    data = mesh_service.export_mesh(box, "ply")
+
+    header = data[:data.index(b"end_header")]
+    assert b"format binary_little_endian 1.0" in header
+    reloaded = trimesh.load(io.BytesIO(data), file_type="ply")
+    assert len(reloaded.faces) == 12
+    np.testing.assert_allclose(reloaded.vertices, box.vertices)
+
+
+def test_stl_export_is_binary(box):
+    data = mesh_service.export_mesh(box, "stl")
+
+    # 80-byte header, face count, then 50 bytes per face
+    assert struct.unpack("<I", data[80:84])[0] == 12
+    assert len(data) == 84 + 50 * 12
+
+
+def test_glb_export_is_binary_gltf(box):
+    data = mesh_service.export_mesh(box, "glb")
+
+    assert data[:4] == b"glTF"
+    assert len(trimesh.load(io.BytesIO(data), file_type="glb", force="mesh").faces) == 12
+
+
+def test_unsupported_export_format(box):
+    with pytest.raises(ValueError):
+        mesh_service.export_mesh(box, "fbx")
@@ -0,0 +1,193 @@
+"""
+Pipeline stages: bounded queues, error propagation and trace context in workers
+"""
+
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+
+import pytest
+
+from app.services.pipeline import Stage
+from app.services.tracing import current_trace, span, start_trace
+
+request_id: ContextVar[str] = ContextVar("request_id", default="unset")
+
+
+@pytest.fixture
+def make_stage():
+    stages = []
+
+    def make(workers=1, queue_size=1, blocking=True):
+        stage = Stage("test", workers, queue_size, blocking)
+        stages.append(stage)
+        return stage
+
+    yield make
+    for stage in stages:
+        stage.shutdown()
+
+
+async def until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_submissions_wait_when_the_queue_is_full(make_stage):
+    stage = make_stage(workers=1, queue_size=1)
+    release = threading.Event()
+    order = []
+
+    def work(name):
+        release.wait(5)
+        order.append(name)
+        return name
+
+    async def run():
+        running = asyncio.create_task(stage.run(work, "running"))
+        await until(lambda: stage.busy == 1)
+        queued = asyncio.create_task(stage.run(work, "queued"))
+        await until(lambda: stage.get_status()["queued"] == 1)
+
+        # The queue holds one item, so the next submitter is held in put()
+        blocked = asyncio.create_task(stage.run(work, "blocked"))
+        await asyncio.sleep(0.05)
+        assert stage.get_status()["queued"] == 1
+        assert not blocked.done()
+
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(running, queued, blocked), timeout=5)
+
+    assert asyncio.run(run()) == ["running", "queued", "blocked"]
+    assert order == ["running", "queued", "blocked"]
+    assert stage.get_status()["processed"] == 3
+
+
+def test_stage_error_reaches_the_caller(make_stage):
+    stage = make_stage()
+
+    def fail():
+        raise ValueError("bad input")
+
+    async def run():
+        with pytest.raises(ValueError, match="bad input"):
+            await stage.run(fail)
+        # The worker survives the failure
+        return await stage.run(lambda: "next")
+
+    assert asyncio.run(run()) == "next"
+    assert stage.failed == 1
+    assert stage.processed == 2
+
+
+def test_async_stage_error_reaches_the_caller(make_stage):
+    stage = make_stage(blocking=False)
+
+    async def fail():
+        raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(stage.run(fail))
+
+    assert stage.failed == 1
+
+
+def test_context_is_carried_into_worker_threads(make_stage):
+    stage = make_stage(workers=2, queue_size=4)
+
+    def read(_):
+        return request_id.get(), threading.current_thread().name
+
+    async def submit(value):
+        request_id.set(value)
+        return await stage.run(read, value)
+
+    async def run():
+        return await asyncio.gather(*(submit(f"request-{i}") for i in range(4)))
+
+    results = asyncio.run(run())
+
+    assert [value for value, _ in results] == [f"request-{i}" for i in range(4)]
+    assert all(thread.startswith("stage-test") for _, thread in results)
+
+
+def test_context_is_carried_into_async_stages(make_stage):
+    stage = make_stage(blocking=False)
+
+    async def read():
+        await asyncio.sleep(0)
+        return request_id.get()
+
+    async def run():
+        request_id.set("async-request")
+        return await stage.run(read)
+
+    assert asyncio.run(run()) == "async-request"
+
+
+def test_spans_and_wait_time_land_in_the_callers_trace(make_stage):
+    stage = make_stage(workers=1, queue_size=2)
+    release = threading.Event()
+
+    def work(name):
+        release.wait(5)
+        with span(f"{name}_work"):
+            return current_trace().job_id
+
+    async def job(name):
+        start_trace(name)
+        result = await stage.run(work, name)
+        return result, current_trace()
+
+    async def run():
+        first = asyncio.create_task(job("first"))
+        await until(lambda: stage.busy == 1)
+        second = asyncio.create_task(job("second"))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    (first_id, first), (second_id, second) = asyncio.run(run())
+
+    assert (first_id, second_id) == ("first", "second")
+    assert [entry["name"] for entry in first.spans] == ["first_work", "test_wait"]
+    assert [entry["name"] for entry in second.spans] == ["second_work", "test_wait"]
+    # Work spans are recorded from the worker thread, wait spans from the caller
+    assert first.spans[0]["tid"] != first.spans[1]["tid"]
+    # The second job queued behind the first one
+    assert second.timings["test_wait"] >= 0.04
+    assert second.timings["test_wait"] > first.timings["test_wait"]
+
+
+def test_cancelled_callers_are_skipped(make_stage):
+    stage = make_stage(workers=1, queue_size=2)
+    release = threading.Event()
+    calls = []
+
+    def work(name):
+        release.wait(5)
+        calls.append(name)
+        return name
+
+    async def run():
+        running = asyncio.create_task(stage.run(work, "running"))
+        await until(lambda: stage.busy == 1)
+        cancelled = asyncio.create_task(stage.run(work, "cancelled"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        release.set()
+        await running
+        return await stage.run(work, "after")
+
+    assert asyncio.run(run()) == "after"
+    assert calls == ["running", "after"]
+
+
+def test_workers_restart_on_a_new_event_loop(make_stage):
+    stage = make_stage()
+
+    assert asyncio.run(stage.run(lambda: 1)) == 1
+    assert asyncio.run(stage.run(lambda: 2)) == 2
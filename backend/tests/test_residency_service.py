@@ -0,0 +1,279 @@
+"""
+Model residency under a device memory budget, with stub models of known footprint
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.inference_backends import StubBackend
+from app.services.residency_service import ModelResidency
+
+MB = 1024 * 1024
+
+
+class SizedStubBackend(StubBackend):
+    """Stub models with a footprint per model and loads that can be made to fail"""
+
+    def __init__(self, sizes_mb):
+        super().__init__(load_time=0.0)
+        self.sizes_mb = sizes_mb
+        self.failing = set()
+
+    @property
+    def model_ids(self):
+        return {name: f"stub/{name}" for name in self.sizes_mb}
+
+    def load_model(self, name):
+        if name in self.failing:
+            raise RuntimeError(f"cannot load {name}")
+        super().load_model(name)
+
+    def restore_model(self, name):
+        if name in self.failing:
+            raise RuntimeError(f"cannot restore {name}")
+        super().restore_model(name)
+
+    def footprint(self, name):
+        return int(self.sizes_mb[name] * MB) if self.is_loaded(name) else 0
+
+
+def make_residency(budget_mb, sizes_mb=None, **kwargs):
+    backend = SizedStubBackend(sizes_mb or {"a": 100, "b": 100, "c": 100})
+
+    async def load(name):
+        await asyncio.to_thread(backend.load_model, name)
+
+    return ModelResidency(backend, load, budget_mb=budget_mb, **kwargs)
+
+
+def states(residency):
+    return {name: entry.state for name, entry in residency.entries.items()}
+
+
+async def settle():
+    """Let evictions started in the background finish"""
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def test_evicts_lowest_usage_score_first():
+    residency = make_residency(250)
+
+    async def run():
+        for _ in range(3):
+            async with residency.use("a"):
+                pass
+        async with residency.use("b"):
+            pass
+        async with residency.use("c"):
+            pass
+        await settle()
+
+    asyncio.run(run())
+
+    assert states(residency) == {"a": "resident", "b": "offloaded", "c": "resident"}
+    assert residency.entries["b"].evictions == 1
+
+
+def test_usage_score_decays_with_age():
+    residency = make_residency(250, half_life=60.0)
+
+    async def run():
+        for _ in range(3):
+            async with residency.use("a"):
+                pass
+        async with residency.use("b"):
+            pass
+        # Three uses ten half-lives ago are worth less than one use now
+        residency.entries["a"].last_used = time.time() - 600
+        async with residency.use("c"):
+            pass
+        await settle()
+
+    asyncio.run(run())
+
+    assert states(residency) == {"a": "offloaded", "b": "resident", "c": "resident"}
+
+
+def test_unload_policy_drops_the_model():
+    residency = make_residency(150, policy="unload")
+
+    async def run():
+        await residency.ensure("a")
+        await residency.ensure("b")
+        await settle()
+
+    asyncio.run(run())
+
+    assert states(residency)["a"] == "unloaded"
+    assert not residency.backend.is_loaded("a")
+
+
+def test_pinned_model_is_never_evicted():
+    residency = make_residency(150)
+
+    async def run():
+        await residency.pin("a")
+        await residency.ensure("b")
+        await settle()
+
+    asyncio.run(run())
+
+    # Nothing evictable: the load goes over budget instead of evicting the pinned model
+    assert states(residency) == {"a": "resident", "b": "resident", "c": "unloaded"}
+    assert residency.get_status()["used"] == 200 * MB
+
+
+def test_unpin_enforces_budget():
+    residency = make_residency(150)
+
+    async def run():
+        await residency.pin("a")
+        await residency.ensure("b")
+        async with residency.use("b"):
+            pass
+        await residency.unpin("a")
+        await settle()
+
+    asyncio.run(run())
+
+    assert not residency.entries["a"].pinned
+    assert states(residency)["a"] == "offloaded"
+    assert states(residency)["b"] == "resident"
+
+
+def test_waits_for_busy_victim_instead_of_evicting_it():
+    residency = make_residency(150)
+    order = []
+
+    async def hold_a(started, release):
+        async with residency.use("a"):
+            started.set()
+            await release.wait()
+            order.append("a released")
+
+    async def use_b():
+        async with residency.use("b"):
+            order.append("b resident")
+
+    async def run():
+        # Measure both footprints first: a model of unknown size loads without waiting
+        await residency.ensure("b")
+        await residency.ensure("a")
+        await settle()
+        assert states(residency)["b"] == "offloaded"
+
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold_a(started, release))
+        await started.wait()
+
+        waiter = asyncio.create_task(use_b())
+        await settle()
+        assert not waiter.done()
+        assert states(residency)["a"] == "resident"
+        assert residency.entries["b"].waiting == 1
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(holder, waiter), timeout=5)
+        await settle()
+
+    asyncio.run(run())
+
+    assert order == ["a released", "b resident"]
+    assert states(residency) == {"a": "offloaded", "b": "resident", "c": "unloaded"}
+
+
+def test_first_load_of_unknown_size_evicts_down_to_budget():
+    residency = make_residency(150)
+
+    async def run():
+        async with residency.use("a"):
+            pass
+        # b's footprint is only known once loaded; the overshoot is then corrected
+        await residency.ensure("b")
+        await settle()
+
+    asyncio.run(run())
+
+    assert residency.entries["b"].footprint == 100 * MB
+    assert states(residency) == {"a": "offloaded", "b": "resident", "c": "unloaded"}
+
+
+def test_failed_load_leaves_model_unloaded_and_retryable():
+    residency = make_residency(250)
+    residency.backend.failing.add("a")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await residency.ensure("a")
+        assert states(residency)["a"] == "unloaded"
+
+        residency.backend.failing.clear()
+        await asyncio.wait_for(residency.ensure("a"), timeout=5)
+
+    asyncio.run(run())
+
+    assert states(residency)["a"] == "resident"
+    assert residency.entries["a"].loads == 1
+
+
+def test_failed_restore_keeps_model_offloaded():
+    residency = make_residency(150)
+
+    async def run():
+        await residency.ensure("a")
+        await residency.ensure("b")
+        await settle()
+        assert states(residency)["a"] == "offloaded"
+
+        residency.backend.failing.add("a")
+        with pytest.raises(RuntimeError):
+            await residency.ensure("a")
+
+    asyncio.run(run())
+
+    # b was evicted to make room before the restore failed; a stays restorable
+    assert states(residency)["a"] == "offloaded"
+    assert residency.entries["a"].active == 0
+    assert residency.entries["a"].waiting == 0
+
+
+def test_preload_makes_model_resident_in_background():
+    residency = make_residency(250)
+
+    async def run():
+        residency.preload("a")
+        assert "a" in residency._preloads
+        await asyncio.wait_for(asyncio.gather(*residency._preloads.values()), timeout=5)
+
+    asyncio.run(run())
+
+    assert states(residency)["a"] == "resident"
+    # A preload is not a use
+    assert residency.entries["a"].last_used is None
+
+
+def test_preload_skips_model_that_needs_a_busy_victim():
+    residency = make_residency(150)
+
+    async def run():
+        await residency.ensure("b")
+        async with residency.use("a"):
+            residency.preload("b")
+            assert "b" not in residency._preloads
+
+    asyncio.run(run())
+
+
+def test_no_budget_never_evicts():
+    residency = make_residency(0)
+
+    async def run():
+        for name in ("a", "b", "c"):
+            await residency.ensure(name)
+
+    asyncio.run(run())
+
+    assert set(states(residency).values()) == {"resident"}
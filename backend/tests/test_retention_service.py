@@ -0,0 +1,177 @@
+"""
+Output retention: quota eviction, age expiry and temp and job sweeping
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from app.services import retention_service as retention_module
+from app.services.retention_service import retention_service
+
+MB = 1024 * 1024
+HOUR = 3600
+
+
+@pytest.fixture
+def retention(storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 0)
+    monkeypatch.setattr(retention_module.settings, "output_max_age_hours", 0.0)
+    monkeypatch.setattr(retention_module.settings, "temp_max_age_minutes", 60.0)
+    monkeypatch.setattr(retention_service, "totals", dict.fromkeys(retention_service.totals, 0))
+    monkeypatch.setattr(retention_service, "last_run", {})
+    for directory in (storage.models_dir, storage.temp_dir, storage.jobs_dir):
+        directory.mkdir(parents=True)
+    return retention_service
+
+
+def make_file(path, size_mb, age=0.0):
+    """A sparse file of the given logical size, last modified ``age`` seconds ago"""
+    with open(path, "wb") as f:
+        f.truncate(int(size_mb * MB))
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+    return path
+
+
+def names(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+
+def write_job(storage, job_id, files, age=0.0, **info):
+    updated = time.time() - age
+    manifest = {"job_id": job_id, "created": updated, "updated": updated, "files": files, **info}
+    storage._write_job_file(job_id, "manifest.json", json.dumps(manifest))
+
+
+def test_quota_evicts_least_recently_downloaded_first(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 2)
+    # Oldest by mtime, but downloaded just now
+    make_file(storage.output_path("a.obj"), 1, age=3 * HOUR)
+    make_file(storage.output_path("b.obj"), 1, age=2 * HOUR)
+    make_file(storage.output_path("c.obj"), 1, age=1 * HOUR)
+    retention.touch("a.obj")
+
+    report = retention._enforce()
+
+    assert [item["filename"] for item in report["evicted"]] == ["b.obj"]
+    assert report["evicted"][0]["reason"] == "quota"
+    assert names(storage.models_dir) == ["a.obj", "c.obj"]
+    assert report["usage_bytes"] == 2 * MB
+
+
+def test_quota_evicts_until_under_quota(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 1)
+    for i, name in enumerate(("a.obj", "b.obj", "c.obj")):
+        make_file(storage.output_path(name), 1, age=(3 - i) * HOUR)
+
+    report = retention._enforce()
+
+    assert [item["filename"] for item in report["evicted"]] == ["a.obj", "b.obj"]
+    assert names(storage.models_dir) == ["c.obj"]
+
+
+def test_sidecars_count_and_go_with_their_output(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 3)
+    make_file(storage.output_path("a.obj"), 1, age=2 * HOUR)
+    make_file(storage.output_path("a.obj.gz"), 0.5, age=2 * HOUR)
+    make_file(storage.output_path("a.obj.zst"), 0.5, age=2 * HOUR)
+    make_file(storage.output_path("b.obj"), 1.5, age=1 * HOUR)
+
+    report = retention._enforce()
+
+    # 1.5 MB of sidecars push a.obj's group to 2 MB and the total over the quota
+    assert report["evicted"] == [{"filename": "a.obj", "size": 2 * MB, "reason": "quota"}]
+    assert report["reclaimed_bytes"] == 2 * MB
+    assert names(storage.models_dir) == ["b.obj"]
+
+
+def test_outputs_compressed_at_rest_are_tracked_by_logical_name(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 1)
+    make_file(storage.output_path("a.obj.zst"), 1, age=2 * HOUR)
+    make_file(storage.output_path("b.obj.zst"), 1, age=1 * HOUR)
+    retention.touch("a.obj")
+
+    report = retention._enforce()
+
+    assert [item["filename"] for item in report["evicted"]] == ["b.obj"]
+    assert names(storage.models_dir) == ["a.obj.zst"]
+
+
+def test_no_quota_keeps_everything(retention, storage):
+    make_file(storage.output_path("a.obj"), 1, age=100 * HOUR)
+
+    assert retention._enforce()["evicted"] == []
+
+
+def test_age_expiry(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_max_age_hours", 24.0)
+    make_file(storage.output_path("old.obj"), 0.1, age=48 * HOUR)
+    make_file(storage.output_path("old.obj.br"), 0.1, age=48 * HOUR)
+    make_file(storage.output_path("new.obj"), 0.1, age=1 * HOUR)
+
+    report = retention._enforce()
+
+    assert [(item["filename"], item["reason"]) for item in report["evicted"]] == [("old.obj", "age")]
+    assert names(storage.models_dir) == ["new.obj"]
+
+
+def test_temp_sweep_keeps_recent_files_and_placeholders(retention, storage):
+    make_file(storage.temp_dir / "abc_box.obj.partial", 0.1, age=2 * HOUR)
+    make_file(storage.temp_dir / "def_box.obj.partial", 0.1, age=60)
+    make_file(storage.temp_dir / ".gitkeep", 0, age=2 * HOUR)
+
+    report = retention._enforce()
+
+    assert report["temp_files_removed"] == 1
+    assert names(storage.temp_dir) == [".gitkeep", "def_box.obj.partial"]
+
+
+def test_job_sweep_removes_jobs_whose_outputs_are_gone(retention, storage):
+    make_file(storage.output_path("kept.obj"), 0.1)
+    write_job(storage, "a" * 32, ["gone.obj"], age=2 * HOUR, status="completed")
+    write_job(storage, "b" * 32, ["gone.obj", "kept.obj"], age=2 * HOUR)
+
+    assert retention._enforce()["jobs_removed"] == 1
+    assert names(storage.jobs_dir) == ["b" * 32]
+
+
+def test_job_sweep_skips_running_and_recent_jobs(retention, storage):
+    # A batch records its manifest before any item has written an output
+    write_job(storage, "a" * 32, [], age=2 * HOUR, status="running")
+    write_job(storage, "b" * 32, ["gone.obj"], age=60, status="completed")
+
+    assert retention._enforce()["jobs_removed"] == 0
+    assert names(storage.jobs_dir) == ["a" * 32, "b" * 32]
+
+
+def test_download_times_survive_restarts(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 1)
+    make_file(storage.output_path("a.obj"), 1, age=2 * HOUR)
+    make_file(storage.output_path("b.obj"), 1, age=1 * HOUR)
+    retention.touch("a.obj")
+    retention._save_index()
+
+    # A fresh process only has the persisted index to go by
+    monkeypatch.setattr(retention, "_last_access", {})
+    monkeypatch.setattr(retention, "_index_loaded", False)
+    report = retention._enforce()
+
+    assert [item["filename"] for item in report["evicted"]] == ["b.obj"]
+    assert "b.obj" not in json.loads(retention.index_path.read_text())
+
+
+def test_run_once_updates_totals(retention, storage, monkeypatch):
+    monkeypatch.setattr(retention_module.settings, "output_quota_mb", 1)
+    make_file(storage.output_path("a.obj"), 1, age=2 * HOUR)
+    make_file(storage.output_path("b.obj"), 1, age=1 * HOUR)
+
+    report = asyncio.run(retention.run_once())
+
+    assert retention.last_run is report
+    assert retention.totals["runs"] == 1
+    assert retention.totals["evicted_files"] == 1
+    assert retention.totals["reclaimed_bytes"] == MB
@@ -0,0 +1,160 @@
+"""
+Inference slot order under the fifo and sjf policies
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.scheduler import InferenceScheduler
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def run_queued(scheduler, costs, before_release=None):
+    """Queue one job per cost behind a held slot and return the order they ran in"""
+    order = []
+    release = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(10.0):
+            await release.wait()
+
+    async def job(name, cost):
+        async with scheduler.slot(cost):
+            order.append(name)
+
+    holder = asyncio.create_task(hold())
+    await settle()
+    jobs = []
+    for name, cost in costs:
+        jobs.append(asyncio.create_task(job(name, cost)))
+        await settle()
+
+    if before_release:
+        before_release()
+    release.set()
+    await asyncio.wait_for(asyncio.gather(holder, *jobs), timeout=5)
+    return order
+
+
+COSTS = [("slow", 5.0), ("fast", 1.0), ("medium", 3.0)]
+
+
+def test_fifo_serves_in_arrival_order():
+    scheduler = InferenceScheduler(1, "fifo")
+
+    assert asyncio.run(run_queued(scheduler, COSTS)) == ["slow", "fast", "medium"]
+
+
+def test_sjf_serves_shortest_first():
+    scheduler = InferenceScheduler(1, "sjf")
+
+    assert asyncio.run(run_queued(scheduler, COSTS)) == ["fast", "medium", "slow"]
+
+
+def test_sjf_aging_prevents_starvation():
+    scheduler = InferenceScheduler(1, "sjf", aging=1.0)
+
+    def age_slow_job():
+        # The slow job has waited longer than the gap in predicted time
+        slow = next(waiter for waiter in scheduler._waiters if waiter.cost == 5.0)
+        slow.queued_at = time.monotonic() - 10.0
+
+    order = asyncio.run(run_queued(scheduler, COSTS, before_release=age_slow_job))
+
+    assert order == ["slow", "fast", "medium"]
+
+
+def test_equal_costs_keep_arrival_order():
+    scheduler = InferenceScheduler(1, "sjf", aging=0.0)
+
+    order = asyncio.run(run_queued(scheduler, [("a", 2.0), ("b", 2.0), ("c", 2.0)]))
+
+    assert order == ["a", "b", "c"]
+
+
+def test_free_slots_do_not_queue():
+    scheduler = InferenceScheduler(2, "sjf")
+
+    async def run():
+        async with scheduler.slot(1.0):
+            async with scheduler.slot(1.0):
+                assert scheduler.get_status()["running"] == 2
+                assert scheduler.get_status()["queued"] == 0
+
+    asyncio.run(run())
+
+    assert scheduler.get_status()["running"] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = InferenceScheduler(1, "sjf")
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(1.0):
+                await release.wait()
+
+        async def wait_for_slot():
+            async with scheduler.slot(1.0):
+                pass
+
+        holder = asyncio.create_task(hold())
+        await settle()
+        waiter = asyncio.create_task(wait_for_slot())
+        await settle()
+        assert scheduler.get_status()["queued"] == 1
+
+        waiter.cancel()
+        await settle()
+        assert scheduler.get_status()["queued"] == 0
+
+        release.set()
+        await holder
+        async with scheduler.slot(1.0):
+            assert scheduler.get_status()["running"] == 1
+
+    asyncio.run(run())
+
+
+def test_expected_wait_counts_shorter_queued_jobs_for_sjf():
+    scheduler = InferenceScheduler(1, "sjf")
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot(4.0):
+                await release.wait()
+
+        async def queued(cost):
+            async with scheduler.slot(cost):
+                pass
+
+        holder = asyncio.create_task(hold())
+        await settle()
+        jobs = [asyncio.create_task(queued(cost)) for cost in (1.0, 6.0)]
+        await settle()
+
+        waits = scheduler.expected_wait(2.0), scheduler.expected_wait(10.0), scheduler.drain_time()
+        release.set()
+        await asyncio.gather(holder, *jobs)
+        return waits
+
+    short, long, drain = asyncio.run(run())
+
+    assert short == pytest.approx(5.0, abs=0.1)
+    assert long == pytest.approx(11.0, abs=0.1)
+    assert drain == pytest.approx(11.0, abs=0.1)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        InferenceScheduler(1, "lifo")
@@ -0,0 +1,135 @@
+"""
+Atomic output writes, at-rest compression, precompressed sidecars and their lookup
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.services import storage_service as storage_module
+from app.services.storage_service import storage_service
+
+OBJ = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n" * 200
+
+
+def write(filename, data=OBJ):
+    async def run():
+        info = await storage_service.write_output(filename, data)
+        await asyncio.gather(*storage_service._background_tasks)
+        return info
+
+    return asyncio.run(run())
+
+
+def names(directory):
+    return sorted(path.name for path in directory.iterdir()) if directory.exists() else []
+
+
+@pytest.mark.parametrize("policy,syncs", [("none", 0), ("file", 1), ("always", 2)])
+def test_fsync_policy(storage, monkeypatch, policy, syncs):
+    calls = []
+    real_fsync = storage_module.os.fsync
+    monkeypatch.setattr(storage_module.os, "fsync", lambda fd: (calls.append(fd), real_fsync(fd)))
+    monkeypatch.setattr(storage_module.settings, "output_fsync_policy", policy)
+
+    info = write("box.obj")
+
+    assert len(calls) == syncs
+    assert info["path"].read_bytes() == OBJ
+    assert info["size"] == info["stored_size"] == len(OBJ)
+    assert names(storage.temp_dir) == []
+
+
+def test_invalid_fsync_policy_is_rejected(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_fsync_policy", "sometimes")
+
+    with pytest.raises(ValueError):
+        write("box.obj")
+
+    assert names(storage.models_dir) == []
+
+
+def test_failed_write_leaves_no_partial_file(storage, monkeypatch):
+    async def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage_module.aiofiles.os, "replace", failing_replace)
+
+    with pytest.raises(OSError):
+        write("box.obj")
+
+    assert names(storage.models_dir) == []
+    assert names(storage.temp_dir) == []
+
+
+def test_compressed_at_rest(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_compress_at_rest", True)
+    monkeypatch.setattr(storage_module.settings, "output_compress_formats", "obj")
+
+    info = write("box.obj")
+
+    assert info["encoding"] == "zstd"
+    assert info["size"] == len(OBJ)
+    assert info["stored_size"] < len(OBJ)
+    assert names(storage.models_dir) == ["box.obj.zst"]
+
+    path, encoding = storage.locate("box.obj")
+    assert (path.name, encoding) == ("box.obj.zst", "zstd")
+    assert b"".join(storage.iter_decompressed(path, encoding)) == OBJ
+
+    [entry] = storage.list_outputs()
+    assert entry["filename"] == "box.obj"
+    assert entry["size"] == len(OBJ)
+    assert entry["stored_size"] == info["stored_size"]
+    assert entry["encoding"] == "zstd"
+
+
+def test_formats_not_listed_are_stored_raw(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_compress_at_rest", True)
+    monkeypatch.setattr(storage_module.settings, "output_compress_formats", "obj")
+
+    write("mesh.ply")
+
+    assert storage.locate("mesh.ply") == (storage.output_path("mesh.ply"), None)
+
+
+def test_sidecars_are_hidden_from_listing(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_precompress", True)
+
+    write("box.obj")
+
+    assert names(storage.models_dir) == ["box.obj", "box.obj.br", "box.obj.gz", "box.obj.zst"]
+    assert storage.locate("box.obj") == (storage.output_path("box.obj"), None)
+    [entry] = storage.list_outputs()
+    assert (entry["filename"], entry["encoding"], entry["size"]) == ("box.obj", None, len(OBJ))
+    assert storage.find_sidecar("box.obj", "gzip")[1] == "gzip"
+
+
+def test_missing_output(storage):
+    assert storage.locate("missing.obj") is None
+    assert storage.list_outputs() == []
+
+
+def test_delete_removes_sidecars(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_precompress", True)
+    write("box.obj")
+    write("other.obj")
+
+    response = TestClient(main.app).delete("/api/v1/files/box.obj")
+
+    assert response.status_code == 200
+    assert names(storage.models_dir) == ["other.obj", "other.obj.br", "other.obj.gz", "other.obj.zst"]
+    assert TestClient(main.app).delete("/api/v1/files/box.obj").status_code == 404
+
+
+def test_delete_compressed_at_rest(storage, monkeypatch):
+    monkeypatch.setattr(storage_module.settings, "output_compress_at_rest", True)
+    monkeypatch.setattr(storage_module.settings, "output_compress_formats", "obj")
+    write("box.obj")
+
+    response = TestClient(main.app).delete("/api/v1/files/box.obj")
+
+    assert response.status_code == 200
+    assert names(storage.models_dir) == []
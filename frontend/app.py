@@ -164,32 +164,53 @@ def display_backend_status():
                 st.error(f"Error: {status['error']}")
 
 
-def generate_text_to_image(prompt: str, **kwargs) -> Optional[Dict[str, Any]]:
-    """Generate image from text prompt"""
+def generate_text_to_3d(prompt: str, save_image: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+    """Generate a 3D model from a text prompt in one request, showing progress of both stages"""
+    stage_labels = {"text-to-image": "Generating image", "generate-3d": "Generating 3D model"}
     try:
-        with st.spinner("Generating image from prompt..."):
-            response = requests.post(
-                f"{BACKEND_URL}/api/v1/text-to-image",
-                data={
-                    "prompt": prompt,
-                    "width": kwargs.get("width", 1024),
-                    "height": kwargs.get("height", 1024),
-                    "num_inference_steps": kwargs.get("num_inference_steps", 20),
-                    "guidance_scale": kwargs.get("guidance_scale", 7.5),
-                    "seed": kwargs.get("seed")
-                },
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result
-            else:
-                st.error(f"Image generation failed: {response.text}")
+        data = {
+            "prompt": prompt,
+            "mode": kwargs.get("mode", "geometry"),
+            "guidance_scale": kwargs.get("guidance_scale", 7.5),
+            "num_steps": kwargs.get("num_steps", 50),
+            "seed": kwargs.get("seed", 2025),
+            "save_image": save_image,
+            "stream": True
+        }
+        
+        progress_bar = st.progress(0.0, text="Queued...")
+        with requests.post(f"{BACKEND_URL}/api/v1/text-to-3d", data=data, stream=True, timeout=420) as response:
+            if response.status_code != 200:
+                st.error(f"Text-to-3D generation failed: {response.text}")
                 return None
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                
+                if event["event"] == "step":
+                    # The image stage fills the first third of the bar, the 3D stage the rest
+                    offset, share = (0.0, 1 / 3) if event["stage"] == "text-to-image" else (1 / 3, 2 / 3)
+                    progress_bar.progress(
+                        offset + share * event["step"] / event["total"],
+                        text=f"{stage_labels[event['stage']]}: step {event['step']}/{event['total']}"
+                    )
+                elif event["event"] == "started":
+                    offset = 0.0 if event["stage"] == "text-to-image" else 1 / 3
+                    progress_bar.progress(offset, text=f"{stage_labels[event['stage']]}...")
+                elif event["event"] == "result":
+                    progress_bar.progress(1.0, text="Done")
+                    return event["result"]
+                elif event["event"] == "error":
+                    st.error(f"Text-to-3D generation failed: {event['detail']}")
+                    return None
+        
+        st.error("Text-to-3D generation ended without a result")
+        return None
                 
     except Exception as e:
-        st.error(f"Error generating image: {str(e)}")
+        st.error(f"Error generating 3D model: {str(e)}")
         return None
 
 
@@ -380,50 +401,54 @@ def main():
                 height=100
             )
             
-            if st.button("🎨 Generate Image from Prompt", use_container_width=True):
+            save_image = st.checkbox(
+                "Keep intermediate image",
+                help="Also save the image generated from the prompt"
+            )
+            
+            if st.button("🚀 Generate 3D from Prompt", use_container_width=True):
                 if prompt:
-                    result = generate_text_to_image(prompt)
+                    result = generate_text_to_3d(
+                        prompt,
+                        save_image=save_image,
+                        mode=mode,
+                        guidance_scale=guidance_scale,
+                        num_steps=num_steps,
+                        seed=seed
+                    )
                     if result:
-                        st.session_state['generated_image'] = result
-                        st.success("✅ Image generated!")
+                        st.session_state['prompt_model'] = result
+                        st.success("✅ 3D model generated!")
                 else:
                     st.warning("Please enter a prompt")
         
         with col2:
             st.subheader("📥 Generated 3D Model")
             
-            if 'generated_image' in st.session_state:
-                result = st.session_state['generated_image']
-                st.success("✅ Image ready! Generate 3D →")
+            if 'prompt_model' in st.session_state:
+                model_result = st.session_state['prompt_model']
                 
-                if st.button("🚀 Generate 3D from This Image", use_container_width=True):
-                    # Download the generated image
-                    img_response = requests.get(f"{BACKEND_URL}/api/v1/download/{result['filename']}")
-                    
-                    # Generate 3D model
-                    model_result = generate_3d_model(
-                        image_bytes=img_response.content,
-                        filename=result['filename'],
-                        mode=mode,
-                        guidance_scale=guidance_scale,
-                        num_steps=num_steps,
-                        seed=seed
+                if model_result.get('image_filename'):
+                    st.image(
+                        requests.get(f"{BACKEND_URL}/api/v1/download/{model_result['image_filename']}").content,
+                        caption="Intermediate image",
+                        use_column_width=True
                     )
-                    
-                    if model_result:
-                        st.success("✅ 3D model generated!")
-                        
-                        # Download button
-                        download_url = f"{BACKEND_URL}/api/v1/download/{model_result['filename']}"
-                        st.download_button(
-                            label="📥 Download 3D Model",
-                            data=requests.get(download_url).content,
-                            file_name=model_result['filename'],
-                            mime="model/gltf-binary",
-                            use_container_width=True
-                        )
+                
+                # Download button
+                download_url = f"{BACKEND_URL}/api/v1/download/{model_result['filename']}"
+                st.download_button(
+                    label="📥 Download 3D Model",
+                    data=requests.get(download_url).content,
+                    file_name=model_result['filename'],
+                    mime="model/gltf-binary",
+                    use_container_width=True
+                )
+                
+                with st.expander("Generation Details"):
+                    st.json(model_result['metadata'])
             else:
-                st.info("👈 Generate an image first")
+                st.info("👈 Describe a model to get started")
     
     # Tab 3: Modify 3D Model
     with tab3:
@@ -530,7 +555,7 @@ def main():
         
         # Get detailed system info
         try:
-            response = requests.get(f"{BACKEND_URL}/health/")
+            response = requests.get(f"{BACKEND_URL}/health/verbose")
             if response.status_code == 200:
                 data = response.json()
                 